@@ -7,6 +7,9 @@ interface WebSocketMessage {
   data?: any;
   timestamp: string;
   message?: string;
+  seq?: number;
+  resume_token?: string;
+  events?: WebSocketMessage[];
 }
 
 interface UseWebSocketOptions {
@@ -34,6 +37,8 @@ export const useWebSocket = (options: UseWebSocketOptions = {}) => {
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const reconnectAttempts = useRef(0);
+  // Resume token of the last event seen, so a reconnect backfills what was missed
+  const resumeTokenRef = useRef<string | null>(null);
   const maxReconnectAttempts = 5;
   const queryClient = useQueryClient();
 
@@ -43,7 +48,10 @@ export const useWebSocket = (options: UseWebSocketOptions = {}) => {
     }
 
     try {
-      const ws = new WebSocket(url);
+      const resumeUrl = resumeTokenRef.current
+        ? `${url}${url.includes('?') ? '&' : '?'}resume=${encodeURIComponent(resumeTokenRef.current)}`
+        : url;
+      const ws = new WebSocket(resumeUrl);
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -62,37 +70,53 @@ export const useWebSocket = (options: UseWebSocketOptions = {}) => {
       ws.onmessage = (event) => {
         try {
           const message: WebSocketMessage = JSON.parse(event.data);
-          setLastMessage(message);
-          onMessage?.(message);
-
-          // Handle different message types
-          switch (message.type) {
-            case 'scaling_event':
-              handleScalingEvent(message);
-              break;
-            case 'system_metrics':
-              handleSystemMetrics(message);
-              break;
-            case 'alert':
-              handleAlert(message);
-              break;
-            case 'health_status':
-              handleHealthStatus(message);
-              break;
-            case 'connection_established':
-              console.log('WebSocket connected:', message.message);
-              break;
-            case 'pong':
-              // Handle ping-pong for connection health
-              break;
-            default:
-              console.log('Unknown WebSocket message type:', message.type);
+          const messages = message.type === 'replay' ? message.events ?? [] : [message];
+          if (message.resume_token) {
+            resumeTokenRef.current = message.resume_token;
           }
+          messages.forEach(handleMessage);
         } catch (err) {
           console.error('Error parsing WebSocket message:', err);
         }
       };
 
+      const handleMessage = (message: WebSocketMessage) => {
+        if (message.seq !== undefined && message.type !== 'heartbeat' && resumeTokenRef.current) {
+          const streamId = resumeTokenRef.current.split(':')[0];
+          resumeTokenRef.current = `${streamId}:${message.seq}`;
+        }
+        setLastMessage(message);
+        onMessage?.(message);
+
+        // Handle different message types
+        switch (message.type) {
+          case 'scaling_event':
+            handleScalingEvent(message);
+            break;
+          case 'system_metrics':
+            handleSystemMetrics(message);
+            break;
+          case 'alert':
+            handleAlert(message);
+            break;
+          case 'health_status':
+            handleHealthStatus(message);
+            break;
+          case 'connection_established':
+            console.log('WebSocket connected:', message.message);
+            break;
+          case 'heartbeat':
+            // Answer server heartbeats, or the server closes the connection as idle
+            ws.send(JSON.stringify({ type: 'pong', seq: message.seq }));
+            break;
+          case 'pong':
+            // Handle ping-pong for connection health
+            break;
+          default:
+            console.log('Unknown WebSocket message type:', message.type);
+        }
+      };
+
       ws.onclose = (event) => {
         setIsConnected(false);
         onDisconnect?.();
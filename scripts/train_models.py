@@ -93,8 +93,8 @@ def train_secondary_model():
             'sequence_length': secondary_model.sequence_length
         }
         
-        with open(models_dir / "enhanced_secondary_model.pkl", 'wb') as f:
-            pickle.dump(model_data, f)
+        # Uncompressed joblib so the API can memory-map the arrays
+        joblib.dump(model_data, models_dir / "enhanced_secondary_model.pkl")
         
         logger.info("✅ Secondary model training completed")
         return True
@@ -0,0 +1,46 @@
+"""
+Shared FastAPI dependencies
+
+Services are created once by the application lifespan and stored on
+``app.state``. When the lifespan has not run (e.g. a bare ``TestClient``),
+they are created lazily on first use and cached in the same place.
+"""
+
+from fastapi import Request
+
+from src.services.model_registry import ModelRegistry, get_model_registry
+from src.services.scaling_service import ScalingService
+from src.services.monitoring_service import MonitoringService
+from src.services.decision_batcher import DecisionBatcher
+
+def get_registry(request: Request) -> ModelRegistry:
+    """Get the shared model registry"""
+    registry = getattr(request.app.state, "model_registry", None)
+    if registry is None:
+        registry = get_model_registry()
+        request.app.state.model_registry = registry
+    return registry
+
+def get_scaling_service(request: Request) -> ScalingService:
+    """Get the shared scaling service"""
+    service = getattr(request.app.state, "scaling_service", None)
+    if service is None:
+        service = ScalingService(registry=get_registry(request))
+        request.app.state.scaling_service = service
+    return service
+
+def get_monitoring_service(request: Request) -> MonitoringService:
+    """Get the shared monitoring service"""
+    service = getattr(request.app.state, "monitoring_service", None)
+    if service is None:
+        service = MonitoringService()
+        request.app.state.monitoring_service = service
+    return service
+
+def get_decision_batcher(request: Request) -> DecisionBatcher:
+    """Get the shared scaling decision micro-batcher"""
+    batcher = getattr(request.app.state, "decision_batcher", None)
+    if batcher is None:
+        batcher = DecisionBatcher(get_scaling_service(request))
+        request.app.state.decision_batcher = batcher
+    return batcher
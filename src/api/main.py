@@ -1,15 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-import uvicorn
+import asyncio
 import logging
 
-from src.api.routes import health, predictions, scaling, websocket
+from src.api.routes import health, predictions, scaling, monitoring, websocket, metrics
 from src.config.settings import settings
-from src.services.monitoring_service import MonitoringService
+from src.services.monitoring_service import MonitoringService, MetricsCollector
+from src.services.model_registry import get_model_registry, ModelWatcher
+from src.services.scaling_service import ScalingService
+from src.services.decision_batcher import DecisionBatcher
+from src.services.forecast_cache import ForecastRefresher
+from src.services.event_bus import create_event_bus
+from src.api.websocket import manager as websocket_manager, MetricsBroadcaster, HeartbeatMonitor
+from src.api.middleware import setup_logging, AccessLog, record_request_metrics, RequestTimingMiddleware
 
-# Configure logging
-logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
+# Configure logging (handlers write from a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
@@ -17,14 +24,60 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting up AI-Powered Auto-Scaling API")
     
+    # Load models once for the whole process, off the event loop
+    # (already done by the master when workers were preforked)
+    registry = get_model_registry()
+    if not registry.loaded:
+        await asyncio.to_thread(registry.load)
+    app.state.model_registry = registry
+    app.state.scaling_service = ScalingService(registry=registry)
+    
+    # Hot-reload retrained artifacts from MODEL_PATH
+    model_watcher = ModelWatcher(registry)
+    if settings.MODEL_RELOAD_ENABLED:
+        await model_watcher.start()
+    
+    # Precompute forecasts before their time bucket is needed
+    forecast_refresher = ForecastRefresher(app.state.scaling_service)
+    await forecast_refresher.start()
+    
+    # Coalesce concurrent /scaling/decide calls into batched model passes
+    app.state.decision_batcher = DecisionBatcher(app.state.scaling_service)
+    if settings.DECISION_BATCHING_ENABLED:
+        await app.state.decision_batcher.start()
+    
+    # Receive WebSocket broadcasts made by the other workers
+    await websocket_manager.attach_bus(create_event_bus())
+    
     # Initialize services
     monitoring = MonitoringService()
     await monitoring.initialize()
+    app.state.monitoring_service = monitoring
+    
+    # Sample system metrics in the background; requests read the latest snapshot
+    metrics_collector = MetricsCollector(monitoring)
+    await metrics_collector.start()
+    
+    # Push the latest sample to WebSocket dashboards instead of having them poll
+    metrics_broadcaster = MetricsBroadcaster(lambda: monitoring.latest_metrics)
+    await metrics_broadcaster.start()
+    
+    # Detect dead WebSocket clients and measure round-trip times
+    heartbeat_monitor = HeartbeatMonitor()
+    await heartbeat_monitor.start()
     
     yield
     
     # Shutdown
     logger.info(" Shutting down AI-Powered Auto-Scaling API")
+    await app.state.decision_batcher.stop()
+    await model_watcher.stop()
+    await forecast_refresher.stop()
+    await heartbeat_monitor.stop()
+    await metrics_broadcaster.stop()
+    await metrics_collector.stop()
+    await websocket_manager.detach_bus()
+    monitoring.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -43,11 +96,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One timing pass per request feeds the sampled access log and /metrics
+app.add_middleware(RequestTimingMiddleware, observers=[AccessLog(), record_request_metrics])
+
 # Include routers
 app.include_router(health.router)
 app.include_router(predictions.router)
 app.include_router(scaling.router)
+app.include_router(monitoring.router)
 app.include_router(websocket.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -59,14 +117,12 @@ async def root():
             "health": "/health",
             "predictions": "/predictions",
             "scaling": "/scaling",
-            "websocket": "/ws"
+            "monitoring": "/monitoring",
+            "websocket": "/ws",
+            "metrics": "/metrics"
         }
     }
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "src.api.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG
-    )
+    from src.api.server import serve
+    serve()
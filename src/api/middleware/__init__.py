@@ -1,5 +1,7 @@
 # src/api/middleware/__init__.py
 from .cors import setup_cors
-from .logging import setup_logging, LoggingMiddleware
+from .logging import setup_logging, AccessLog
+from .metrics import record_request_metrics
+from .timing import RequestTimingMiddleware
 
-__all__ = ["setup_cors", "setup_logging", "LoggingMiddleware"]
\ No newline at end of file
+__all__ = ["setup_cors", "setup_logging", "AccessLog", "record_request_metrics", "RequestTimingMiddleware"]
@@ -1,26 +1,41 @@
+import random
 import logging
-import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request
-        logging.info(f"Request: {request.method} {request.url}")
-        
-        response = await call_next(request)
-        
-        # Log response
-        process_time = time.time() - start_time
-        logging.info(f"Response: {response.status_code} - {process_time:.4f}s")
-        
-        return response
-
-def setup_logging():
-    """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+from typing import Dict, Optional
+
+from src.config.settings import settings
+from src.config.logging_config import setup_logging
+
+access_logger = logging.getLogger("src.api.access")
+
+class AccessLog:
+    """Sampled access log, as a RequestTimingMiddleware observer.
+
+    Logs method, route template, status and latency. ``sample_rates`` maps a
+    route template prefix to the fraction of its requests that are logged
+    (the longest matching prefix wins), which keeps health probes and other
+    high-volume routes from flooding the log. Server errors are always logged.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None):
+        self.sample_rates = settings.ACCESS_LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+        self._route_rates: Dict[str, float] = {}
+
+    def __call__(self, method: str, route: str, status_code: int, elapsed: float):
+        if status_code < 500:
+            rate = self.sample_rate(route)
+            if rate <= 0 or (rate < 1 and random.random() >= rate):
+                return
+        access_logger.info("%s %s %d %.2fms", method, route, status_code, elapsed * 1000)
+
+    def sample_rate(self, template: str) -> float:
+        """Fraction of requests to ``template`` that are logged"""
+        rate = self._route_rates.get(template)
+        if rate is None:
+            rate, matched = 1.0, -1
+            for prefix, prefix_rate in self.sample_rates.items():
+                if len(prefix) > matched and (template == prefix or template.startswith(prefix.rstrip("/") + "/")):
+                    rate, matched = prefix_rate, len(prefix)
+            self._route_rates[template] = rate
+        return rate
+
+__all__ = ["AccessLog", "setup_logging"]
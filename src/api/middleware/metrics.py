@@ -0,0 +1,6 @@
+from src.utils.instrumentation import HTTP_REQUESTS, HTTP_REQUEST_DURATION
+
+def record_request_metrics(method: str, route: str, status_code: int, elapsed: float):
+    """RequestTimingMiddleware observer counting requests and their latency by route template"""
+    HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+    HTTP_REQUESTS.labels(method, route, status_code).inc()
@@ -0,0 +1,42 @@
+import time
+from typing import Callable, Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Called with method, route template, status code and latency in seconds
+RequestObserver = Callable[[str, str, int, float], None]
+
+class RequestTimingMiddleware:
+    """Times HTTP requests once and reports each to every observer, as a pure ASGI middleware.
+
+    The route is the matched route template (``/items/{item_id}``) or
+    ``unmatched``, never the raw path, so client input cannot grow the
+    number of distinct routes observers see. A request that raises is
+    reported with status 500.
+    """
+
+    def __init__(self, app: ASGIApp, observers: Sequence[RequestObserver] = ()):
+        self.app = app
+        self.observers = list(observers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            for observer in self.observers:
+                observer(scope["method"], route, status_code, elapsed)
@@ -2,5 +2,6 @@
 from .health import router as health_router
 from .predictions import router as predictions_router
 from .scaling import router as scaling_router
+from .monitoring import router as monitoring_router
 
-__all__ = ["health_router", "predictions_router", "scaling_router"]
\ No newline at end of file
+__all__ = ["health_router", "predictions_router", "scaling_router", "monitoring_router"]
\ No newline at end of file
@@ -1,27 +1,68 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from src.api.models.schemas import HealthResponse
 from src.services.monitoring_service import MonitoringService
+from src.services.model_registry import ModelRegistry
+from src.services.scaling_service import ScalingService
+from src.api.dependencies import get_monitoring_service, get_registry, get_scaling_service
+from src.config.settings import settings
 from datetime import datetime
+from typing import Optional
+from pydantic import ConfigDict
 
 router = APIRouter(prefix="/health", tags=["Health"])
 
-@router.get("/", response_model=HealthResponse)
-async def health_check():
+class ModelHealthResponse(HealthResponse):
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_version: int
+    model_fingerprint: Optional[str] = None
+
+@router.get("/", response_model=ModelHealthResponse)
+async def health_check(monitoring: MonitoringService = Depends(get_monitoring_service),
+                       registry: ModelRegistry = Depends(get_registry),
+                       scaling: ScalingService = Depends(get_scaling_service)):
     """Health check endpoint"""
     try:
-        monitoring = MonitoringService()
         models_loaded = monitoring.check_models_status()
-        active_instances = monitoring.get_active_instances()
+        # The count every worker shares, as reported by /scaling/status
+        active_instances = await scaling.get_active_instances()
         
-        return HealthResponse(
+        return ModelHealthResponse(
             status="healthy",
             timestamp=datetime.now().isoformat(),
             models_loaded=models_loaded,
-            active_instances=active_instances
+            active_instances=active_instances,
+            model_version=registry.version,
+            model_fingerprint=registry.bundle.fingerprint
         )
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Health check failed: {str(e)}")
 
+@router.get("/models")
+async def models_status(registry: ModelRegistry = Depends(get_registry)):
+    """Model registry status including load and warm-up times"""
+    return registry.status()
+
+@router.get("/memory")
+async def memory_status(monitoring: MonitoringService = Depends(get_monitoring_service),
+                        registry: ModelRegistry = Depends(get_registry)):
+    """Resident memory of the worker serving this request"""
+    return {
+        **monitoring.get_process_memory(),
+        "workers": settings.WORKERS,
+        "models_preloaded": settings.WORKERS > 1 and settings.PRELOAD_MODELS,
+        "model_mmap_mode": settings.MODEL_MMAP_MODE,
+        "model_version": registry.version
+    }
+
+@router.get("/metrics")
+async def latest_metrics(monitoring: MonitoringService = Depends(get_monitoring_service)):
+    """Latest system metrics sampled by the background collector"""
+    try:
+        return monitoring.get_latest_metrics()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Metrics unavailable: {str(e)}")
+
 @router.get("/ready")
 async def readiness_check():
     """Readiness check endpoint"""
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils.instrumentation import registry
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """This worker's instrumentation in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
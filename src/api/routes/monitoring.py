@@ -0,0 +1,41 @@
+# ai-autoscaling-system/src/api/routes/monitoring.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from src.services.monitoring_service import MonitoringService
+from src.api.dependencies import get_monitoring_service
+from src.config.settings import settings
+from typing import Optional
+import logging
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+logger = logging.getLogger(__name__)
+
+# The hourly rollups have the longest retention; nothing older is kept
+MAX_HISTORY_HOURS = settings.METRICS_ROLLUP_HOUR_RETENTION
+
+@router.get("/aggregates")
+async def get_aggregates(window: float = 300,
+                         monitoring: MonitoringService = Depends(get_monitoring_service)):
+    """Rolling mean/std/min/max over a window and EWMAs for every metric"""
+    try:
+        return monitoring.get_aggregates(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Aggregates error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/history")
+async def get_metrics_history(hours: float = Query(1, gt=0, le=MAX_HISTORY_HOURS),
+                              resolution: Optional[float] = Query(None, gt=0),
+                              monitoring: MonitoringService = Depends(get_monitoring_service)):
+    """Metrics history from the coarsest rollup tier meeting the requested resolution"""
+    try:
+        return monitoring.query_metrics_history(hours, resolution)
+    except Exception as e:
+        logger.error(f"Metrics history error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tiers")
+async def get_rollup_tiers(monitoring: MonitoringService = Depends(get_monitoring_service)):
+    """Resolution, retention and fill level of each metrics tier"""
+    return monitoring.rollups.status()
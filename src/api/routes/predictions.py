@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from src.api.models.schemas import SystemMetrics, ScalingDecision, ForecastResponse
 from src.services.scaling_service import ScalingService
+from src.api.dependencies import get_scaling_service
+from src.config.settings import settings
+from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Dict, Any
 import logging
@@ -8,12 +11,15 @@ import logging
 router = APIRouter(prefix="/predictions", tags=["Predictions"])
 logger = logging.getLogger(__name__)
 
+class AnomalyBatchRequest(BaseModel):
+    metrics: List[SystemMetrics]
+
 @router.post("/forecast", response_model=ForecastResponse)
-async def get_forecast(metrics: SystemMetrics, forecast_hours: int = 2):
+async def get_forecast(metrics: SystemMetrics, forecast_hours: int = 2,
+                       service: ScalingService = Depends(get_scaling_service)):
     """Get load forecast"""
     try:
-        service = ScalingService()
-        predictions = service.get_forecast(metrics, forecast_hours)
+        predictions = await service.get_forecast(metrics, forecast_hours)
         
         return ForecastResponse(
             forecast_hours=forecast_hours,
@@ -24,19 +30,54 @@ async def get_forecast(metrics: SystemMetrics, forecast_hours: int = 2):
         logger.error(f"Forecast error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/forecast/cache")
+async def get_forecast_cache_stats(service: ScalingService = Depends(get_scaling_service)):
+    """Forecast cache statistics"""
+    return service.forecast_cache.get_stats()
+
 @router.post("/anomaly")
-async def detect_anomaly(metrics: SystemMetrics):
+async def detect_anomaly(metrics: SystemMetrics,
+                         service: ScalingService = Depends(get_scaling_service)):
     """Detect anomalies"""
     try:
-        service = ScalingService()
         anomaly_score = service.detect_anomaly(metrics)
         
         return {
             "timestamp": datetime.now().isoformat(),
-            "anomaly_detected": anomaly_score > 0.95,
+            "anomaly_detected": anomaly_score > settings.ANOMALY_THRESHOLD,
             "anomaly_score": anomaly_score,
             "model_used": "isolation_forest"
         }
     except Exception as e:
         logger.error(f"Anomaly detection error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/anomaly/batch")
+async def detect_anomaly_batch(request: AnomalyBatchRequest,
+                               service: ScalingService = Depends(get_scaling_service)):
+    """Detect anomalies for many metric rows in one model pass"""
+    if len(request.metrics) > settings.MAX_ANOMALY_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size {len(request.metrics)} exceeds limit of {settings.MAX_ANOMALY_BATCH_SIZE}"
+        )
+    
+    try:
+        anomaly_scores = service.detect_anomaly_batch(request.metrics)
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "count": len(anomaly_scores),
+            "model_used": "isolation_forest",
+            "results": [
+                {
+                    "anomaly_detected": score > settings.ANOMALY_THRESHOLD,
+                    "anomaly_score": score
+                }
+                for score in anomaly_scores
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Batch anomaly detection error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,19 +1,24 @@
 # ai-autoscaling-system/src/api/routes/scaling.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
 from src.api.models.schemas import SystemMetrics, ScalingDecision
 from src.services.scaling_service import ScalingService
+from src.services.decision_batcher import DecisionBatcher
+from src.api.dependencies import get_scaling_service, get_decision_batcher
+from src.config.settings import settings
 from datetime import datetime
+from typing import Optional
+import asyncio
 import logging
 
 router = APIRouter(prefix="/scaling", tags=["Scaling"])
 logger = logging.getLogger(__name__)
 
 @router.post("/decide", response_model=ScalingDecision)
-async def get_scaling_decision(metrics: SystemMetrics):
+async def get_scaling_decision(metrics: SystemMetrics,
+                               batcher: DecisionBatcher = Depends(get_decision_batcher)):
     """Get scaling decision"""
     try:
-        service = ScalingService()
-        decision = await service.get_scaling_decision(metrics)
+        decision = await batcher.submit(metrics)
         
         return decision
     except Exception as e:
@@ -21,10 +26,10 @@ async def get_scaling_decision(metrics: SystemMetrics):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/execute")
-async def execute_scaling(decision: ScalingDecision):
+async def execute_scaling(decision: ScalingDecision,
+                          service: ScalingService = Depends(get_scaling_service)):
     """Execute scaling decision"""
     try:
-        service = ScalingService()
         result = await service.execute_scaling(decision)
         
         return {
@@ -38,18 +43,39 @@ async def execute_scaling(decision: ScalingDecision):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status")
-async def get_scaling_status():
+async def get_scaling_status(service: ScalingService = Depends(get_scaling_service)):
     """Get current scaling status"""
     try:
-        service = ScalingService()
-        status = service.get_status()
+        # Store reads may wait on another worker's write lock
+        status = await asyncio.to_thread(service.get_status)
         
         return {
             "timestamp": datetime.now().isoformat(),
             "active_instances": status["active_instances"],
-            "scaling_history": status["scaling_history"][-10:],  # Last 10 actions
+            "scaling_history": status["scaling_history"],  # Last 10 actions
             "current_load": status["current_load"]
         }
     except Exception as e:
         logger.error(f"Status error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/history")
+async def get_scaling_history(limit: int = Query(10, ge=1, le=settings.STATE_HISTORY_PAGE_LIMIT),
+                              cursor: Optional[int] = Query(None, ge=1),
+                              action: Optional[str] = None,
+                              service_name: Optional[str] = None,
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None,
+                              service: ScalingService = Depends(get_scaling_service)):
+    """Get one page of scaling history, newest first"""
+    try:
+        page = await asyncio.to_thread(service.get_history, limit, cursor=cursor, action=action,
+                                       service=service_name, since=since, until=until)
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            **page
+        }
+    except Exception as e:
+        logger.error(f"History error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -17,7 +17,9 @@ router = APIRouter()
 @router.websocket("/ws")
 async def websocket_route(
     websocket: WebSocket,
-    client_id: Optional[str] = Query(None, description="Optional client identifier")
+    client_id: Optional[str] = Query(None, description="Optional client identifier"),
+    encoding: Optional[str] = Query(None, description="Frame encoding: json (default) or msgpack"),
+    resume: Optional[str] = Query(None, description="Resume token of the last event received")
 ):
     """
     WebSocket endpoint for real-time communication.
@@ -27,13 +29,17 @@ async def websocket_route(
     - System metrics updates
     - Alert broadcasts
     - Health status updates
+    
+    Messages to the client are JSON text frames, or binary msgpack frames
+    when ``encoding=msgpack`` is requested and msgpack is installed. With
+    ``resume``, the events missed since that token are sent in one frame.
     """
-    await websocket_endpoint(websocket, client_id)
+    await websocket_endpoint(websocket, client_id, encoding, resume)
 
 @router.get("/ws/connections")
 async def get_connections():
-    """Get information about active WebSocket connections."""
+    """Get information about active WebSocket connections, with queue and latency stats."""
     return {
-        "active_connections": manager.get_connection_count(),
+        **manager.stats(),
         "connections": manager.get_connection_info()
     }
@@ -0,0 +1,156 @@
+"""
+API Server Runner
+
+Runs the API with a single uvicorn process, or in pre-fork mode: models are
+loaded once in the master, then N workers are forked and serve from a shared
+listening socket. The workers inherit the loaded model pages copy-on-write,
+so they share one physical copy of the tree arrays instead of unpickling
+their own. The master restarts workers that die and, on SIGINT or SIGTERM,
+asks every worker to shut down gracefully.
+"""
+
+import gc
+import os
+import time
+import signal
+import socket
+import logging
+from typing import Dict
+
+import uvicorn
+
+from src.config.settings import settings
+from src.config.logging_config import stop_logging
+from src.services.model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+STOP_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+RESTART_BACKOFF = 1.0  # seconds to wait before replacing a worker that died right after starting
+
+def _bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.HOST, settings.PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(app, sock: socket.socket):
+    """Serve the app from an inherited socket (runs in a forked child)"""
+    # While serving, uvicorn's own handlers turn SIGINT/SIGTERM into a graceful
+    # shutdown (lifespan included). This one covers the time before that, and
+    # is what uvicorn re-raises the signal into afterwards: exiting through
+    # the caller's finally flushes the logs instead of dying on SIG_DFL.
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, _exit_worker)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+
+    config = uvicorn.Config(app, log_level=settings.LOG_LEVEL.lower(),
+                            ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def _exit_worker(signum, frame):
+    raise SystemExit(0)
+
+def _spawn_worker(app, sock: socket.socket) -> int:
+    """Fork one worker, returning its pid"""
+    # Block stop signals across the fork so the child never runs the
+    # master's handler before installing its own
+    signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # Own process group: a terminal Ctrl-C reaches only the master,
+            # which then stops each worker exactly once
+            os.setpgid(0, 0)
+            _run_worker(app, sock)
+        finally:
+            # os._exit skips atexit: write out the worker's queued logs first
+            stop_logging()
+            os._exit(0)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+    return pid
+
+def serve_preforked(workers: int, app=None):
+    """Preload models, then fork workers that share them copy-on-write"""
+    if settings.PRELOAD_MODELS:
+        logger.info("📦 Preloading models before forking workers")
+        get_model_registry().load()
+
+    if app is None:
+        # Import the app in the master so its module pages are shared as well
+        from src.api.main import app
+
+    # Keep the preloaded objects out of the GC's reach so collections in the
+    # workers don't touch (and therefore copy) their pages
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind_socket()
+    children: Dict[int, int] = {}  # pid -> worker index
+    started: Dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def _terminate(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _start(index: int) -> int:
+        pid = _spawn_worker(app, sock)
+        children[pid] = index
+        started[pid] = time.monotonic()
+        if stopping:
+            # Asked to stop while this one was being forked
+            os.kill(pid, signal.SIGTERM)
+        return pid
+
+    signal.signal(signal.SIGTERM, _terminate)
+    signal.signal(signal.SIGINT, _terminate)
+
+    for index in range(workers):
+        if stopping:
+            break
+        pid = _start(index)
+        logger.info(f"Started worker {index + 1}/{workers} (pid {pid})")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        lifetime = time.monotonic() - started.pop(pid)
+        if stopping:
+            continue
+
+        logger.warning(f"⚠️ Worker {index + 1} (pid {pid}) exited with code "
+                       f"{os.waitstatus_to_exitcode(status)}, restarting it")
+        if lifetime < RESTART_BACKOFF:
+            # Don't spin if workers die during startup
+            time.sleep(RESTART_BACKOFF)
+            if stopping:
+                continue
+        _start(index)
+    sock.close()
+    logger.info("All workers stopped")
+
+def serve():
+    """Run the API using the configured server mode"""
+    if settings.WORKERS > 1 and hasattr(os, "fork"):
+        serve_preforked(settings.WORKERS)
+    else:
+        uvicorn.run(
+            "src.api.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.DEBUG,
+            ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
+        )
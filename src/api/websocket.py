@@ -6,76 +6,599 @@ Handles WebSocket connections and broadcasts scaling events to connected clients
 
 import asyncio
 import json
+import time
+import uuid
+import heapq
 import logging
-from typing import Dict, List, Set
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 
+from src.config.settings import settings
+from src.services.event_bus import EventBus
+from src.utils.instrumentation import registry, WS_FANOUT_DURATION
+
+try:
+    import msgpack
+except ImportError:  # optional; clients fall back to JSON
+    msgpack = None
+
 logger = logging.getLogger(__name__)
 
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+ENCODINGS = ("json", "msgpack")
+SEVERITY_LEVELS = {"info": 0, "warning": 1, "critical": 2}
+ALL_TOPICS = "*"
+METRICS_MESSAGE = {'type': 'system_metrics'}
+
+def message_topics(message: dict) -> List[str]:
+    """Event topics a message is published under: its type and, for scaling events, the event type"""
+    return [topic for topic in (message.get('type'), message.get('event_type')) if topic]
+
+def negotiate_encoding(requested: Optional[str]) -> str:
+    """Wire encoding for a client: msgpack if requested and installed, else JSON"""
+    if requested == "msgpack" and msgpack is not None:
+        return "msgpack"
+    return "json"
+
+def encode_message(message: dict, encoding: str) -> Union[str, bytes]:
+    if encoding == "msgpack":
+        return msgpack.packb(message, default=str)
+    return json.dumps(message, separators=(',', ':'), default=str)
+
+class Frame:
+    """A message encoded at most once per wire encoding.
+    
+    A broadcast wraps its message in one Frame that is queued for every
+    client, so the payload is serialized once per encoding in use rather
+    than once per recipient.
+    """
+    
+    __slots__ = ('message', '_encoded')
+    
+    def __init__(self, message: dict):
+        self.message = message
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+    
+    def encode(self, encoding: str) -> Union[str, bytes]:
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = encode_message(self.message, encoding)
+        return data
+
+def _changed(old, new, epsilon: float) -> bool:
+    """Whether a metric moved by more than ``epsilon`` relative to its previous value"""
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return abs(new - old) > epsilon * max(abs(old), 1.0)
+    return old != new
+
+class MetricsStream:
+    """Conflated, delta-encoded system metrics channel.
+    
+    Only the latest published snapshot is kept; a client that falls behind
+    skips straight to it instead of receiving every intermediate one. Each
+    frame carries only the fields that moved by more than ``epsilon``
+    (relative) since the values the client last received, with a full
+    snapshot on connect and every ``snapshot_every`` frames. Clients that
+    are in step hold the same known-values object, so each distinct frame
+    is built and encoded once.
+    """
+    
+    def __init__(self, epsilon: Optional[float] = None, snapshot_every: Optional[int] = None):
+        self.epsilon = settings.WS_METRICS_EPSILON if epsilon is None else epsilon
+        self.snapshot_every = snapshot_every or settings.WS_METRICS_SNAPSHOT_EVERY
+        self.latest: Optional[dict] = None
+        self.timestamp: Optional[str] = None
+        self.version = 0
+        # (known values id, full) -> (known values, frame or None, new known values)
+        self._frames: Dict[tuple, tuple] = {}
+    
+    def publish(self, metrics: dict):
+        self.latest = dict(metrics)
+        self.timestamp = datetime.now().isoformat()
+        self.version += 1
+        self._frames.clear()
+    
+    def frame_for(self, known: Optional[dict], full: bool) -> Tuple[Optional[Frame], dict]:
+        """Frame bringing a client from ``known`` to the latest values (None if nothing moved)"""
+        full = full or known is None
+        key = (None if full else id(known), full)
+        cached = self._frames.get(key)
+        if cached is not None and (full or cached[0] is known):
+            return cached[1], cached[2]
+        
+        if full:
+            changed, new_known = self.latest, self.latest
+        else:
+            changed = {field: value for field, value in self.latest.items()
+                       if field not in known or _changed(known[field], value, self.epsilon)}
+            new_known = {**known, **changed} if changed else known
+        frame = Frame({
+            'type': 'system_metrics',
+            'snapshot': full,
+            'data': changed,
+            'timestamp': self.timestamp
+        }) if changed or full else None
+        
+        # Keep ``known`` referenced so its id cannot be reused while cached
+        self._frames[key] = (known, frame, new_known)
+        return frame, new_known
+
+class ReplayBuffer:
+    """Recent events per topic, replayed to clients that resume after a reconnect.
+    
+    Every event delivered by this worker is stamped with a sequence number.
+    A resume token ``<stream id>:<seq>`` names the last event a client saw;
+    the stream id changes when the worker restarts, so a token from another
+    stream cannot be resumed exactly. Each topic keeps its last ``size``
+    events, so a burst on one topic does not evict the others.
+    """
+    
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or settings.WS_REPLAY_BUFFER_SIZE
+        self.stream_id = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._topics: Dict[tuple, Deque[dict]] = {}
+        self._evicted: Dict[tuple, int] = {}  # topic -> newest seq no longer buffered
+    
+    def record(self, message: dict) -> dict:
+        """Stamp a message with the next sequence number and buffer it"""
+        self.seq += 1
+        message = {**message, 'seq': self.seq}
+        topic = tuple(message_topics(message))
+        events = self._topics.get(topic)
+        if events is None:
+            events = self._topics[topic] = deque(maxlen=self.size)
+        if len(events) == self.size:
+            self._evicted[topic] = events[0]['seq']
+        events.append(message)
+        return message
+    
+    def token(self) -> str:
+        return f"{self.stream_id}:{self.seq}"
+    
+    def events_since(self, seq: int, client: "ClientConnection") -> Tuple[List[dict], bool]:
+        """Buffered events after ``seq`` that ``client`` subscribes to, and
+        whether that is all of them (False if some were already evicted)"""
+        complete = True
+        streams = []
+        for topic, events in self._topics.items():
+            if not client.wants_topic(topic):
+                continue
+            if self._evicted.get(topic, 0) > seq:
+                complete = False
+            streams.append([event for event in events if event['seq'] > seq and client.wants(event)])
+        return list(heapq.merge(*streams, key=lambda event: event['seq'])), complete
+
+def parse_resume_token(token: str) -> Tuple[str, int]:
+    stream_id, _, seq = str(token).rpartition(':')
+    if not stream_id or not seq.isdigit():
+        raise ValueError(f"Invalid resume token: {token}")
+    return stream_id, int(seq)
+
+def _coalesce_key(frame: Frame) -> tuple:
+    """Messages with the same key supersede each other (e.g. two metrics snapshots)"""
+    return (frame.message.get('type'), frame.message.get('event_type'))
+
+class ClientConnection:
+    """A WebSocket client with its own bounded send queue and writer task.
+    
+    Messages are queued without waiting and written by the client's writer
+    task, so a slow client only delays itself. When the queue is full the
+    slow-consumer policy decides what happens: ``drop_oldest`` discards the
+    oldest queued message, ``coalesce`` replaces a queued message of the same
+    kind (falling back to the oldest) and ``disconnect`` closes the client.
+    """
+    
+    def __init__(self, websocket: WebSocket, client_id: str,
+                 on_error: Callable[[WebSocket], None],
+                 queue_size: Optional[int] = None, policy: Optional[str] = None,
+                 send_timeout: Optional[float] = None, encoding: str = "json",
+                 metrics_stream: Optional[MetricsStream] = None):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.encoding = encoding
+        # Subscription: event topics, service names and minimum alert severity
+        self.events: Set[str] = {ALL_TOPICS}
+        self.services: Set[str] = {ALL_TOPICS}
+        self.min_severity = 0
+        self.connected_at = datetime.now().isoformat()
+        self.last_activity = self.connected_at
+        # Heartbeat: when the client was last heard from, and round-trip times
+        self.last_received = time.monotonic()
+        self.rtt_ms: Optional[float] = None
+        self.avg_rtt_ms: Optional[float] = None
+        self._heartbeat: Optional[tuple] = None  # (seq, monotonic send time) awaiting a pong
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.policy = policy or settings.WS_SLOW_CONSUMER_POLICY
+        if self.policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {self.policy}")
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT
+        self.queue: Deque[Frame] = deque()
+        self.max_queue_depth = 0
+        self.sent_messages = 0
+        self.dropped_messages = 0
+        # Conflated metrics: a pending flag rather than queued messages
+        self.metrics_stream = metrics_stream
+        self.metrics_pending = False
+        self.metrics_known: Optional[dict] = None
+        self.metrics_frames = 0
+        self.closed = False
+        self._on_error = on_error
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+    
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+    
+    def enqueue(self, frame: Frame) -> bool:
+        """Queue a message; False if the client is too slow and must be disconnected"""
+        if self.closed:
+            return False
+        if len(self.queue) >= self.queue_size:
+            if self.policy == "disconnect":
+                return False
+            self.dropped_messages += 1
+            if self.policy == "coalesce":
+                self._coalesce(frame)
+            else:
+                self.queue.popleft()
+        
+        self.queue.append(frame)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+        self._ready.set()
+        return True
+    
+    def wants_topic(self, topics: tuple) -> bool:
+        return ALL_TOPICS in self.events or any(topic in self.events for topic in topics)
+    
+    def wants(self, message: dict) -> bool:
+        """Whether a message matches this client's subscription"""
+        if not self.wants_topic(message_topics(message)):
+            return False
+        data = message.get('data')
+        if not isinstance(data, dict):
+            return True
+        service = data.get('service_name')
+        if service is not None and ALL_TOPICS not in self.services and service not in self.services:
+            return False
+        severity = SEVERITY_LEVELS.get(data.get('severity'))
+        return severity is None or self.min_severity <= severity
+    
+    def touch(self):
+        """The client sent something, so it is still alive"""
+        self.last_received = time.monotonic()
+    
+    def idle_seconds(self, now: Optional[float] = None) -> float:
+        return (now or time.monotonic()) - self.last_received
+    
+    def send_heartbeat(self, seq: int, frame: Frame) -> bool:
+        self._heartbeat = (seq, time.monotonic())
+        return self.enqueue(frame)
+    
+    def record_pong(self, seq) -> Optional[float]:
+        """Round-trip time of the heartbeat ``seq`` answers, in milliseconds"""
+        if self._heartbeat is None or self._heartbeat[0] != seq:
+            return None
+        self.rtt_ms = (time.monotonic() - self._heartbeat[1]) * 1000.0
+        self.avg_rtt_ms = self.rtt_ms if self.avg_rtt_ms is None else 0.8 * self.avg_rtt_ms + 0.2 * self.rtt_ms
+        self._heartbeat = None
+        return self.rtt_ms
+    
+    def notify_metrics(self):
+        """New metrics were published; the writer sends them when it gets to them"""
+        if not self.closed:
+            self.metrics_pending = True
+            self._ready.set()
+    
+    def _next_metrics_frame(self) -> Optional[Frame]:
+        self.metrics_pending = False
+        stream = self.metrics_stream
+        if stream is None or stream.latest is None:
+            return None
+        full = self.metrics_known is None or self.metrics_frames >= stream.snapshot_every
+        frame, self.metrics_known = stream.frame_for(self.metrics_known, full)
+        if frame is not None:
+            self.metrics_frames = 0 if full else self.metrics_frames + 1
+        return frame
+    
+    def _coalesce(self, frame: Frame):
+        """Make room by removing the queued message this one supersedes"""
+        key = _coalesce_key(frame)
+        for i, queued in enumerate(self.queue):
+            if _coalesce_key(queued) == key:
+                del self.queue[i]
+                return
+        self.queue.popleft()
+    
+    async def _write_loop(self):
+        try:
+            # Also checks ``closed``: wait_for can swallow a cancellation that
+            # arrives as a send completes
+            while not self.closed:
+                while not self.queue and not self.metrics_pending and not self.closed:
+                    self._ready.clear()
+                    await self._ready.wait()
+                if self.closed:
+                    break
+                # Events first; metrics only ever need the latest values
+                frame = self.queue.popleft() if self.queue else self._next_metrics_frame()
+                if frame is None:
+                    continue
+                data = frame.encode(self.encoding)
+                if isinstance(data, bytes):
+                    send = self.websocket.send_bytes(data)
+                else:
+                    send = self.websocket.send_text(data)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+                self.sent_messages += 1
+                self.last_activity = datetime.now().isoformat()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to WebSocket client {self.client_id}: {e}")
+            self._on_error(self.websocket)
+    
+    def stop(self, close_code: Optional[int] = None):
+        """Stop the writer, closing the socket with ``close_code`` if given"""
+        self.closed = True
+        self.queue.clear()
+        self._ready.set()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if close_code is not None:
+            self._closer = asyncio.create_task(self._close(close_code))
+    
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+    
+    def subscription(self) -> Dict:
+        return {
+            'events': sorted(self.events),
+            'services': sorted(self.services),
+            'severity': next(name for name, level in SEVERITY_LEVELS.items() if level == self.min_severity)
+        }
+    
+    def info(self) -> Dict:
+        return {
+            'client_id': self.client_id,
+            'encoding': self.encoding,
+            'subscription': self.subscription(),
+            'connected_at': self.connected_at,
+            'last_activity': self.last_activity,
+            'idle_seconds': round(self.idle_seconds(), 3),
+            'rtt_ms': self.rtt_ms,
+            'avg_rtt_ms': self.avg_rtt_ms,
+            'queue_depth': len(self.queue),
+            'metrics_pending': self.metrics_pending,
+            'max_queue_depth': self.max_queue_depth,
+            'sent_messages': self.sent_messages,
+            'dropped_messages': self.dropped_messages
+        }
+
 class ConnectionManager:
-    """Manages WebSocket connections and broadcasts messages to clients."""
+    """Manages WebSocket connections and broadcasts messages to clients.
+    
+    Clients are indexed by the event topics and services they subscribed to
+    (``*`` for all), so a broadcast only visits its recipients. At most
+    ``max_connections`` clients are accepted by each worker.
+    """
     
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
-        self.connection_metadata: Dict[WebSocket, Dict] = {}
+    def __init__(self, max_connections: Optional[int] = None):
+        self.max_connections = max_connections or settings.WS_MAX_CONNECTIONS
+        self.rejected_connections = 0
+        self.reaped_connections = 0
+        self.heartbeat_seq = 0
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self._event_index: Dict[str, Set[ClientConnection]] = defaultdict(set)
+        self._service_index: Dict[str, Set[ClientConnection]] = defaultdict(set)
+        self.metrics_stream = MetricsStream()
+        self.replay = ReplayBuffer()
+        self.bus: Optional[EventBus] = None
     
-    async def connect(self, websocket: WebSocket, client_id: str = None):
-        """Accept a new WebSocket connection."""
+    @property
+    def active_connections(self):
+        return self.clients.keys()
+    
+    async def connect(self, websocket: WebSocket, client_id: str = None, encoding: str = None) -> bool:
+        """Accept a new WebSocket connection; False if the worker is full."""
         await websocket.accept()
-        self.active_connections.add(websocket)
-        self.connection_metadata[websocket] = {
-            'client_id': client_id or f"client_{len(self.active_connections)}",
-            'connected_at': datetime.now().isoformat(),
-            'last_activity': datetime.now().isoformat()
-        }
-        logger.info(f"WebSocket client connected: {self.connection_metadata[websocket]['client_id']}")
+        if len(self.clients) >= self.max_connections:
+            self.rejected_connections += 1
+            logger.warning(f"Rejecting WebSocket client: {len(self.clients)} connections open")
+            # 1013: try again later
+            await websocket.close(code=1013)
+            return False
+        
+        client = ClientConnection(websocket, client_id or f"client_{len(self.clients) + 1}",
+                                  on_error=self.disconnect, encoding=negotiate_encoding(encoding),
+                                  metrics_stream=self.metrics_stream)
+        self.clients[websocket] = client
+        self._index(client)
+        client.start()
+        logger.info(f"WebSocket client connected: {client.client_id}")
         
         # Send welcome message
         await self.send_personal_message({
             'type': 'connection_established',
-            'client_id': self.connection_metadata[websocket]['client_id'],
+            'client_id': client.client_id,
+            'encoding': client.encoding,
+            'resume_token': self.replay.token(),
             'timestamp': datetime.now().isoformat(),
             'message': 'Connected to AI Auto-Scaling System'
         }, websocket)
+        self._send_metrics_snapshot(client)
+        return True
     
-    def disconnect(self, websocket: WebSocket):
+    def disconnect(self, websocket: WebSocket, close_code: Optional[int] = None):
         """Remove a WebSocket connection."""
-        if websocket in self.active_connections:
-            client_id = self.connection_metadata.get(websocket, {}).get('client_id', 'unknown')
-            self.active_connections.remove(websocket)
-            if websocket in self.connection_metadata:
-                del self.connection_metadata[websocket]
-            logger.info(f"WebSocket client disconnected: {client_id}")
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            self._unindex(client)
+            client.stop(close_code)
+            logger.info(f"WebSocket client disconnected: {client.client_id}")
     
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Send a message to a specific WebSocket client."""
-        try:
-            await websocket.send_text(json.dumps(message))
-            if websocket in self.connection_metadata:
-                self.connection_metadata[websocket]['last_activity'] = datetime.now().isoformat()
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
-            self.disconnect(websocket)
+    def _index(self, client: ClientConnection):
+        for topic in client.events:
+            self._event_index[topic].add(client)
+        for service in client.services:
+            self._service_index[service].add(client)
     
-    async def broadcast(self, message: dict):
-        """Broadcast a message to all connected WebSocket clients."""
-        if not self.active_connections:
+    def _unindex(self, client: ClientConnection):
+        for index, keys in ((self._event_index, client.events), (self._service_index, client.services)):
+            for key in keys:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(client)
+                    if not subscribers:
+                        del index[key]
+    
+    def subscribe(self, websocket: WebSocket, events: Optional[Iterable[str]] = None,
+                  services: Optional[Iterable[str]] = None, severity: Optional[str] = None) -> Dict:
+        """Replace a client's subscription; empty or missing filters match everything"""
+        if severity is not None and severity not in SEVERITY_LEVELS:
+            raise ValueError(f"Unknown severity: {severity}")
+        events, services = ([values] if isinstance(values, str) else values
+                            for values in (events, services))
+        client = self.clients[websocket]
+        self._unindex(client)
+        client.events = set(events or ()) or {ALL_TOPICS}
+        client.services = set(services or ()) or {ALL_TOPICS}
+        client.min_severity = SEVERITY_LEVELS[severity or "info"]
+        self._index(client)
+        self._send_metrics_snapshot(client)
+        return client.subscription()
+    
+    async def resume(self, websocket: WebSocket, token: Optional[str] = None,
+                     since: Optional[int] = None):
+        """Send the events a client missed since ``token`` (or sequence ``since``) in one frame"""
+        client = self.clients.get(websocket)
+        if client is None:
             return
+        complete = True
+        if token is not None:
+            stream_id, since = parse_resume_token(token)
+            if stream_id != self.replay.stream_id:
+                # Another worker or an earlier process: replay everything still buffered
+                since, complete = 0, False
+        events, buffered = self.replay.events_since(int(since or 0), client)
+        await self.send_personal_message({
+            'type': 'replay',
+            'events': events,
+            'complete': complete and buffered,
+            'resume_token': self.replay.token(),
+            'timestamp': datetime.now().isoformat()
+        }, websocket)
+    
+    def touch(self, websocket: WebSocket):
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.touch()
+    
+    def record_pong(self, websocket: WebSocket, seq) -> Optional[float]:
+        client = self.clients.get(websocket)
+        return client.record_pong(seq) if client is not None else None
+    
+    def send_heartbeats(self):
+        """Queue one shared heartbeat for every client; clients answer with a pong"""
+        self.heartbeat_seq += 1
+        frame = Frame({
+            'type': 'heartbeat',
+            'seq': self.heartbeat_seq,
+            'timestamp': datetime.now().isoformat()
+        })
+        slow = [client for client in list(self.clients.values())
+                if not client.send_heartbeat(self.heartbeat_seq, frame)]
+        for client in slow:
+            self._disconnect_slow(client)
+    
+    def reap_idle(self, timeout: float) -> int:
+        """Close clients not heard from in ``timeout`` seconds (dead or half-open sockets)"""
+        now = time.monotonic()
+        idle = [client for client in self.clients.values() if client.idle_seconds(now) > timeout]
+        for client in idle:
+            logger.info(f"Reaping idle WebSocket client {client.client_id} "
+                        f"({client.idle_seconds(now):.0f}s without a message)")
+            # 1001: going away
+            self.disconnect(client.websocket, close_code=1001)
+        self.reaped_connections += len(idle)
+        return len(idle)
+    
+    def stats(self) -> Dict:
+        return {
+            'active_connections': len(self.clients),
+            'max_connections': self.max_connections,
+            'rejected_connections': self.rejected_connections,
+            'reaped_connections': self.reaped_connections
+        }
+    
+    def metrics_subscribers(self) -> Set[ClientConnection]:
+        return self._recipients(METRICS_MESSAGE)
+    
+    def _send_metrics_snapshot(self, client: ClientConnection):
+        """Start a (re)subscribed client's metrics stream with a full snapshot"""
+        client.metrics_known = None
+        if self.metrics_stream.latest is not None and client in self.metrics_subscribers():
+            client.notify_metrics()
+    
+    def _recipients(self, message: dict) -> Set[ClientConnection]:
+        """Clients subscribed to a message's topics, service and severity"""
+        recipients = set()
+        for topic in message_topics(message) + [ALL_TOPICS]:
+            recipients |= self._event_index.get(topic, set())
         
-        disconnected = set()
-        for websocket in self.active_connections:
-            try:
-                await websocket.send_text(json.dumps(message))
-                if websocket in self.connection_metadata:
-                    self.connection_metadata[websocket]['last_activity'] = datetime.now().isoformat()
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-                disconnected.add(websocket)
-        
-        # Clean up disconnected clients
-        for websocket in disconnected:
-            self.disconnect(websocket)
+        data = message.get('data')
+        if not isinstance(data, dict):
+            return recipients
+        service = data.get('service_name')
+        if service is not None:
+            recipients &= self._service_index.get(service, set()) | self._service_index.get(ALL_TOPICS, set())
+        severity = SEVERITY_LEVELS.get(data.get('severity'))
+        if severity is not None:
+            recipients = {client for client in recipients if client.min_severity <= severity}
+        return recipients
+    
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """Queue a message for a specific WebSocket client."""
+        client = self.clients.get(websocket)
+        if client is not None and not client.enqueue(Frame(message)):
+            self._disconnect_slow(client)
+    
+    async def attach_bus(self, bus: EventBus):
+        """Share broadcasts with the other workers through ``bus``"""
+        self.bus = bus
+        await bus.start(self.deliver)
+    
+    async def detach_bus(self):
+        if self.bus is not None:
+            await self.bus.stop()
+            self.bus = None
+    
+    async def broadcast(self, message: dict):
+        """Queue a message for every subscribed client, on this and every other worker."""
+        self.deliver(message)
+        if self.bus is not None:
+            self.bus.publish(message)
+    
+    def deliver(self, message: dict):
+        """Queue a message for this worker's subscribed clients without waiting for the sends."""
+        with WS_FANOUT_DURATION.labels("events").time():
+            message = self.replay.record(message)
+            frame = Frame(message)
+            slow = [client for client in self._recipients(message) if not client.enqueue(frame)]
+        for client in slow:
+            self._disconnect_slow(client)
+    
+    def _disconnect_slow(self, client: ClientConnection):
+        logger.warning(f"Disconnecting slow WebSocket client {client.client_id} "
+                       f"({len(client.queue)} messages queued)")
+        # 1008: policy violation
+        self.disconnect(client.websocket, close_code=1008)
     
     async def broadcast_scaling_event(self, event_type: str, data: dict):
         """Broadcast a scaling event to all connected clients."""
@@ -89,13 +612,11 @@ class ConnectionManager:
         logger.info(f"Broadcasted scaling event: {event_type}")
     
     async def broadcast_system_metrics(self, metrics: dict):
-        """Broadcast system metrics to all connected clients."""
-        message = {
-            'type': 'system_metrics',
-            'data': metrics,
-            'timestamp': datetime.now().isoformat()
-        }
-        await self.broadcast(message)
+        """Publish system metrics; subscribed clients receive the changes when they are ready."""
+        with WS_FANOUT_DURATION.labels("metrics").time():
+            self.metrics_stream.publish(metrics)
+            for client in self.metrics_subscribers():
+                client.notify_metrics()
     
     async def broadcast_alert(self, alert: dict):
         """Broadcast an alert to all connected clients."""
@@ -109,46 +630,186 @@ class ConnectionManager:
     
     def get_connection_count(self) -> int:
         """Get the number of active connections."""
-        return len(self.active_connections)
+        return len(self.clients)
+    
+    def queue_depths(self) -> List[int]:
+        """Messages waiting in each client's send queue"""
+        return [len(client.queue) for client in self.clients.values()]
     
     def get_connection_info(self) -> List[Dict]:
-        """Get information about all active connections."""
-        return [
-            {
-                'client_id': metadata['client_id'],
-                'connected_at': metadata['connected_at'],
-                'last_activity': metadata['last_activity']
-            }
-            for metadata in self.connection_metadata.values()
-        ]
+        """Get information about all active connections, including send queue depth."""
+        return [client.info() for client in self.clients.values()]
 
 # Global connection manager instance
 manager = ConnectionManager()
 
-async def websocket_endpoint(websocket: WebSocket, client_id: str = None):
+registry.gauge("ws_connections", "Open WebSocket connections on this worker").set_function(
+    manager.get_connection_count)
+registry.gauge("ws_client_queue_depth_max", "Deepest WebSocket client send queue").set_function(
+    lambda: max(manager.queue_depths(), default=0))
+registry.gauge("ws_queued_messages", "Messages queued across all WebSocket client send queues").set_function(
+    lambda: sum(manager.queue_depths()))
+
+class MetricsBroadcaster:
+    """Background task streaming the latest metrics snapshot to WebSocket clients.
+    
+    Every ``interval`` it publishes the snapshot from ``get_metrics`` (e.g.
+    the MetricsCollector's latest sample), so one collection feeds every
+    viewer. A tick is skipped when there are no metrics subscribers, when
+    the snapshot has not changed, or while every subscriber is still sending
+    the previous one.
+    """
+    
+    def __init__(self, get_metrics: Callable[[], Optional[object]],
+                 connections: Optional[ConnectionManager] = None,
+                 interval: Optional[float] = None):
+        self.get_metrics = get_metrics
+        self.connections = connections or manager
+        self.interval = interval or settings.WS_METRICS_BROADCAST_INTERVAL
+        self.published = 0
+        self.skipped = 0
+        self._last = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def tick(self) -> bool:
+        """Publish the latest snapshot if anyone can use it; True if published"""
+        subscribers = self.connections.metrics_subscribers()
+        if not subscribers:
+            return False
+        metrics = self.get_metrics()
+        if metrics is None or metrics is self._last:
+            return False
+        if all(client.metrics_pending for client in subscribers):
+            self.skipped += 1
+            return False
+        
+        self._last = metrics
+        await self.connections.broadcast_system_metrics(
+            metrics.model_dump() if hasattr(metrics, 'model_dump') else dict(metrics))
+        self.published += 1
+        return True
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Metrics broadcast error: {e}")
+            await asyncio.sleep(self.interval)
+
+class HeartbeatMonitor:
+    """Background task sending heartbeats and reaping idle WebSocket clients.
+    
+    Every ``interval`` each client is sent a ``heartbeat`` message, which it
+    answers with a ``pong`` carrying the same ``seq`` (used for round-trip
+    times). Clients that have sent nothing, pongs included, for
+    ``idle_timeout`` seconds are closed; 0 disables reaping.
+    """
+    
+    def __init__(self, connections: Optional[ConnectionManager] = None,
+                 interval: Optional[float] = None, idle_timeout: Optional[float] = None):
+        self.connections = connections or manager
+        self.interval = interval or settings.WS_HEARTBEAT_INTERVAL
+        self.idle_timeout = settings.WS_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def tick(self):
+        if self.idle_timeout:
+            self.connections.reap_idle(self.idle_timeout)
+        self.connections.send_heartbeats()
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"WebSocket heartbeat error: {e}")
+
+async def websocket_endpoint(websocket: WebSocket, client_id: str = None, encoding: str = None,
+                             resume: str = None):
     """WebSocket endpoint for client connections."""
-    await manager.connect(websocket, client_id)
+    if not await manager.connect(websocket, client_id, encoding):
+        return
     try:
+        if resume:
+            try:
+                await manager.resume(websocket, token=resume)
+            except ValueError as e:
+                await manager.send_personal_message({
+                    'type': 'error',
+                    'message': str(e),
+                    'timestamp': datetime.now().isoformat()
+                }, websocket)
+        
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
+            manager.touch(websocket)
             try:
                 message = json.loads(data)
-                logger.info(f"Received message from {manager.connection_metadata[websocket]['client_id']}: {message}")
+                logger.debug(f"Received WebSocket message: {message}")
                 
                 # Handle different message types
-                if message.get('type') == 'ping':
+                if message.get('type') == 'pong':
+                    manager.record_pong(websocket, message.get('seq'))
+                elif message.get('type') == 'ping':
                     await manager.send_personal_message({
                         'type': 'pong',
                         'timestamp': datetime.now().isoformat()
                     }, websocket)
+                elif message.get('type') == 'resume':
+                    # Backfill the events missed while disconnected
+                    try:
+                        await manager.resume(websocket, message.get('token'), message.get('since'))
+                    except ValueError as e:
+                        await manager.send_personal_message({
+                            'type': 'error',
+                            'message': str(e),
+                            'timestamp': datetime.now().isoformat()
+                        }, websocket)
                 elif message.get('type') == 'subscribe':
-                    # Handle subscription to specific events
-                    await manager.send_personal_message({
-                        'type': 'subscription_confirmed',
-                        'events': message.get('events', []),
-                        'timestamp': datetime.now().isoformat()
-                    }, websocket)
+                    # Only receive the requested event types, services and alert severities
+                    try:
+                        subscription = manager.subscribe(websocket, message.get('events'),
+                                                         message.get('services'), message.get('severity'))
+                        await manager.send_personal_message({
+                            'type': 'subscription_confirmed',
+                            **subscription,
+                            'timestamp': datetime.now().isoformat()
+                        }, websocket)
+                    except ValueError as e:
+                        await manager.send_personal_message({
+                            'type': 'error',
+                            'message': str(e),
+                            'timestamp': datetime.now().isoformat()
+                        }, websocket)
                 
             except json.JSONDecodeError:
                 logger.warning(f"Received invalid JSON from client")
@@ -1,10 +1,34 @@
 # src/config/logging_config.py
+import os
+import queue
+import atexit
 import logging
 import logging.config
-from typing import Dict, Any
+import logging.handlers
+from typing import Dict, Any, List, Optional
+
+from src.config.settings import settings
 
 def get_logging_config() -> Dict[str, Any]:
     """Get logging configuration dictionary"""
+    handlers = {
+        "console": {
+            "class": "logging.StreamHandler",
+            "level": settings.LOG_LEVEL,
+            "formatter": "default",
+            "stream": "ext://sys.stdout",
+        },
+    }
+    if settings.LOG_FILE:
+        handlers["file"] = {
+            "class": "logging.handlers.RotatingFileHandler",
+            "level": "DEBUG",
+            "formatter": "detailed",
+            "filename": settings.LOG_FILE,
+            "maxBytes": 10485760,  # 10MB
+            "backupCount": 5,
+        }
+
     return {
         "version": 1,
         "disable_existing_loggers": False,
@@ -18,31 +42,16 @@ def get_logging_config() -> Dict[str, Any]:
                 "datefmt": "%Y-%m-%d %H:%M:%S",
             },
         },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": "INFO",
-                "formatter": "default",
-                "stream": "ext://sys.stdout",
-            },
-            "file": {
-                "class": "logging.handlers.RotatingFileHandler",
-                "level": "DEBUG",
-                "formatter": "detailed",
-                "filename": "logs/app.log",
-                "maxBytes": 10485760,  # 10MB
-                "backupCount": 5,
-            },
-        },
+        "handlers": handlers,
         "loggers": {
             "": {
-                "level": "INFO",
-                "handlers": ["console", "file"],
+                "level": settings.LOG_LEVEL,
+                "handlers": list(handlers),
                 "propagate": False,
             },
             "src": {
                 "level": "DEBUG",
-                "handlers": ["console", "file"],
+                "handlers": list(handlers),
                 "propagate": False,
             },
             "uvicorn": {
@@ -53,7 +62,72 @@ def get_logging_config() -> Dict[str, Any]:
         },
     }
 
-def setup_logging():
-    """Setup logging configuration"""
-    config = get_logging_config()
-    logging.config.dictConfig(config)
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_handlers: List[logging.Handler] = []
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Setup logging configuration.
+
+    The configured handlers are moved onto a QueueListener thread and the
+    loggers only put records on a bounded queue, so console and file I/O
+    never run on the event loop. Records are dropped when the queue is full.
+    Forked workers start their own listener (see ``_after_fork_in_child``).
+    """
+    global _queue_handler, _handlers
+    stop_logging()
+    if settings.LOG_FILE:
+        directory = os.path.dirname(settings.LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    logging.config.dictConfig(get_logging_config())
+
+    # Root and "src" share the same handlers; both now log through the queue
+    loggers = [logging.getLogger(""), logging.getLogger("src")]
+    _handlers = list(loggers[0].handlers)
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    for logger in loggers:
+        logger.handlers = [_queue_handler]
+    return _start_listener()
+
+def _start_listener() -> logging.handlers.QueueListener:
+    global _listener
+    # A fresh queue: one inherited across fork may hold a lock taken by a
+    # thread that no longer exists
+    _queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def _after_fork_in_child():
+    """Threads do not survive fork: give the child its own listener thread.
+
+    Records the parent had queued but not yet written stay with the parent.
+    """
+    global _listener
+    if _listener is not None:
+        _listener = None
+        _start_listener()
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_after_fork_in_child)
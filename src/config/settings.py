@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings  # Changed from pydantic import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,11 +7,18 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = True
+    WORKERS: int = 1
+    PRELOAD_MODELS: bool = True  # load models before forking workers
     
     # Model Configuration
     MODEL_PATH: str = "models/"
     PRIMARY_MODEL_FILE: str = "prophet_model.pkl"
     SECONDARY_MODEL_FILE: str = "enhanced_secondary_model.pkl"
+    MAX_ANOMALY_BATCH_SIZE: int = 1000
+    SECONDARY_MODEL_COMPILED: bool = True  # array-based Isolation Forest scorer
+    MODEL_RELOAD_ENABLED: bool = True
+    MODEL_RELOAD_INTERVAL: float = 30.0  # seconds
+    MODEL_MMAP_MODE: Optional[str] = "r"  # None disables memory-mapping
     
     # Security
     SECRET_KEY: str = "your-secret-key-here"
@@ -19,13 +26,75 @@ class Settings(BaseSettings):
     
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "logs/app.log"  # empty disables the rotating file handler
+    LOG_QUEUE_SIZE: int = 10000  # records waiting for the log writer thread; extra ones are dropped
+    ACCESS_LOG_SAMPLE_RATES: Dict[str, float] = {"/health": 0.01}  # route template -> fraction logged
     
     # Scaling Configuration
     MIN_INSTANCES: int = 2
     MAX_INSTANCES: int = 20
     SCALE_UP_THRESHOLD: float = 0.8
     SCALE_DOWN_THRESHOLD: float = 0.3
-    ANOMALY_THRESHOLD: float = 0.95
+    ANOMALY_THRESHOLD: float = 0.0  # negated Isolation Forest decision_function; > 0 is an outlier
+    INITIAL_INSTANCES: int = 4
+    
+    # Shared scaling state (instance count and history) across workers
+    STATE_BACKEND: str = "sqlite"  # "sqlite" or "memory"
+    STATE_DB_PATH: str = "data/state.db"
+    STATE_DB_TIMEOUT: float = 5.0  # seconds to wait for another worker's write lock
+    STATE_HISTORY_MAX_ENTRIES: int = 100000  # older scaling history entries are compacted away
+    STATE_HISTORY_RETENTION_DAYS: float = 90.0  # 0 keeps entries regardless of age
+    STATE_HISTORY_PAGE_LIMIT: int = 500  # largest page /scaling/history returns
+    
+    # Metrics collection
+    METRICS_COLLECTION_INTERVAL: float = 30.0  # seconds
+    METRICS_BUFFER_CAPACITY: int = 2880  # raw samples, 1 day at 30s
+    METRICS_ROLLUP_MINUTE_RETENTION: int = 10080  # 1m buckets, 7 days
+    METRICS_ROLLUP_HOUR_RETENTION: int = 2160  # 1h buckets, 90 days
+    METRICS_HISTORY_MAX_POINTS: int = 1000
+    METRICS_PERSISTENCE_ENABLED: bool = True
+    METRICS_SEGMENT_PATH: str = "data/metrics/"
+    METRICS_SEGMENT_ROTATE_SECONDS: float = 3600.0
+    METRICS_SEGMENT_FSYNC_INTERVAL: float = 10.0
+    METRICS_SEGMENT_RETENTION_HOURS: float = 168.0  # 7 days, same as the 1m rollups
+    METRICS_AGGREGATE_WINDOWS: List[float] = [60.0, 300.0, 900.0]  # seconds
+    METRICS_EWMA_HALF_LIVES: List[float] = [60.0, 300.0, 900.0]  # seconds
+    
+    # Forecast engine
+    FORECAST_PROPHET_WEIGHT: float = 0.5  # Random Forest gets the remainder
+    FORECAST_CAPACITY: float = 1000.0  # active users handled at 100% load
+    
+    # Forecast cache
+    FORECAST_BUCKET_SECONDS: int = 3600  # forecasts change when the hour changes
+    FORECAST_CACHE_TTL: float = 3600.0
+    FORECAST_CACHE_MAX_ENTRIES: int = 256
+    FORECAST_REFRESH_INTERVAL: float = 60.0
+    FORECAST_PREFETCH_SECONDS: float = 300.0
+    
+    # Decision micro-batching
+    DECISION_BATCHING_ENABLED: bool = True
+    DECISION_BATCH_MAX_SIZE: int = 64
+    DECISION_BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # WebSocket fan-out
+    WS_SEND_QUEUE_SIZE: int = 256  # outbound messages buffered per client
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # "drop_oldest", "coalesce" or "disconnect"
+    WS_SEND_TIMEOUT: float = 10.0  # seconds one send may take before the client is dropped
+    WS_PER_MESSAGE_DEFLATE: bool = True  # offer permessage-deflate compression to clients
+    WS_METRICS_EPSILON: float = 0.01  # relative change before a metric is resent
+    WS_METRICS_SNAPSHOT_EVERY: int = 20  # full metrics snapshot every N frames
+    WS_METRICS_BROADCAST_INTERVAL: float = 5.0  # seconds between metrics pushes
+    WS_MAX_CONNECTIONS: int = 1000  # per worker; further clients are closed with 1013
+    WS_HEARTBEAT_INTERVAL: float = 30.0  # seconds
+    WS_IDLE_TIMEOUT: float = 90.0  # close clients silent for this long; 0 disables
+    WS_REPLAY_BUFFER_SIZE: int = 100  # recent events kept per topic for resuming clients
+    
+    # Cross-worker event bus for WebSocket broadcasts
+    EVENT_BUS_BACKEND: str = "unix"  # "unix", "redis" or "memory" (this process only)
+    EVENT_BUS_SOCKET: str = "data/events.sock"
+    EVENT_BUS_REDIS_URL: str = "redis://localhost:6379/0"
+    EVENT_BUS_CHANNEL: str = "autoscaling:events"
+    EVENT_BUS_MAX_BUFFER: int = 1048576  # bytes unsent to a slow worker before frames are dropped
     
     class Config:
         env_file = ".env"
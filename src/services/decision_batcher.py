@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from src.api.models.schemas import SystemMetrics, ScalingDecision
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class DecisionBatcher:
+    """Micro-batcher in front of ScalingService.get_scaling_decision.
+
+    Requests arriving within ``max_wait_ms`` of the first queued request (up to
+    ``max_batch_size``) are decided together with one vectorized model pass,
+    and each caller receives its own ScalingDecision.
+    """
+
+    def __init__(self, service, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        self.service = service
+        self.max_batch_size = max_batch_size or settings.DECISION_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.DECISION_BATCH_MAX_WAIT_MS) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Tuple[SystemMetrics, asyncio.Future]] = []
+        self.batches_processed = 0
+        self.requests_processed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the batching worker on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Decision batcher started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.1f})")
+
+    async def stop(self):
+        """Stop the worker, deciding any requests still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        pending = self._drain()
+        if pending:
+            await self._process(pending)
+
+    async def submit(self, metrics: SystemMetrics) -> ScalingDecision:
+        """Queue metrics for the next batch and wait for the decision"""
+        if not self.running:
+            # No worker on this loop (e.g. lifespan not run), decide inline
+            return await self.service.get_scaling_decision(metrics)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((metrics, future))
+        return await future
+
+    def _drain(self) -> List[Tuple[SystemMetrics, asyncio.Future]]:
+        items, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _collect(self) -> List[Tuple[SystemMetrics, asyncio.Future]]:
+        """Wait for one request, then gather more until the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = self._batch
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if len(batch) >= self.max_batch_size:
+                break
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _process(self, batch: List[Tuple[SystemMetrics, asyncio.Future]]):
+        try:
+            decisions = await self.service.get_scaling_decisions([metrics for metrics, _ in batch])
+            for (_, future), decision in zip(batch, decisions):
+                if not future.done():
+                    future.set_result(decision)
+        except Exception as e:
+            logger.error(f"Batched scaling decision error: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        self.batches_processed += 1
+        self.requests_processed += len(batch)
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self._batch = []
+            # Shielded so a stop() mid-batch still resolves every caller
+            await asyncio.shield(self._process(batch))
+
+    def get_stats(self) -> dict:
+        """Get batching statistics"""
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches_processed": self.batches_processed,
+            "requests_processed": self.requests_processed,
+            "average_batch_size": (self.requests_processed / self.batches_processed
+                                   if self.batches_processed else 0.0)
+        }
@@ -0,0 +1,328 @@
+import os
+import json
+import uuid
+import fcntl
+import struct
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Set
+
+from src.config.settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional; only needed for the redis backend
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!I")  # payload length
+
+Handler = Callable[[dict], None]
+
+class EventBus(ABC):
+    """Pub/sub backplane carrying WebSocket broadcasts between API workers.
+
+    Every worker publishes the events it broadcasts and receives the events
+    published by the others, which it fans out to its own sockets. Messages
+    are tagged with the publishing worker's id so a worker never receives
+    its own events back. ``publish`` never waits: it is called from the
+    broadcast path.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handler: Optional[Handler] = None
+        self.published = 0
+        self.received = 0
+
+    @abstractmethod
+    async def start(self, handler: Handler):
+        """Start receiving other workers' events into ``handler``"""
+        self._handler = handler
+
+    @abstractmethod
+    async def stop(self):
+        """Stop receiving and release the transport"""
+
+    @abstractmethod
+    def publish(self, message: dict):
+        """Send an event to the other workers without waiting"""
+
+    def _envelope(self, message: dict) -> bytes:
+        self.published += 1
+        return json.dumps({'origin': self.worker_id, 'message': message},
+                          separators=(',', ':'), default=str).encode()
+
+    def _receive(self, payload: bytes):
+        """Hand one frame to the handler.
+
+        A malformed frame or a failing handler is logged and skipped, so one
+        bad event never stops the receive loop.
+        """
+        try:
+            envelope = json.loads(payload)
+            origin, message = envelope.get('origin'), envelope['message']
+        except (ValueError, TypeError, KeyError, AttributeError):
+            logger.warning("Dropping malformed event bus message")
+            return
+        if origin == self.worker_id or self._handler is None:
+            return
+        self.received += 1
+        try:
+            self._handler(message)
+        except Exception as e:
+            logger.error(f"Event bus handler error: {e}")
+
+class MemoryBroker:
+    """Shared channel for in-process buses (tests and single-worker deployments)"""
+
+    def __init__(self):
+        self.buses: Set["MemoryEventBus"] = set()
+
+class MemoryEventBus(EventBus):
+    """Delivers to the other buses on the same broker within this process"""
+
+    def __init__(self, broker: Optional[MemoryBroker] = None):
+        super().__init__()
+        self.broker = broker or MemoryBroker()
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        self.broker.buses.add(self)
+
+    async def stop(self):
+        self.broker.buses.discard(self)
+
+    def publish(self, message: dict):
+        payload = self._envelope(message)
+        for bus in list(self.broker.buses):
+            if bus is not self:
+                bus._receive(payload)
+
+class UnixSocketEventBus(EventBus):
+    """Event bus for the workers of one host, over a Unix domain socket.
+
+    One worker runs the hub, which relays every frame to the other workers.
+    The hub is elected with an exclusive lock on ``<path>.lock``: the lock is
+    released when the hub process exits, and the next worker to notice the
+    lost connection takes over. Frames are length-prefixed JSON. A peer that
+    cannot keep up (more than ``max_buffer`` bytes unsent) misses frames
+    rather than slowing everyone down.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_buffer: Optional[int] = None,
+                 reconnect_delay: float = 1.0):
+        super().__init__()
+        self.path = path or settings.EVENT_BUS_SOCKET
+        self.max_buffer = max_buffer or settings.EVENT_BUS_MAX_BUFFER
+        self.reconnect_delay = reconnect_delay
+        self.is_hub = False
+        self.dropped = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._lock_file = None
+        self._connected = asyncio.Event()
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def wait_connected(self, timeout: float = 5.0):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_writer()
+        if self._server is not None:
+            self._server.close()
+            for peer in list(self._peers):
+                peer.close()
+            await self._server.wait_closed()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_hub = False
+
+    def publish(self, message: dict):
+        payload = self._envelope(message)
+        if self._writer is None:
+            self.dropped += 1
+            return
+        _write_frame(self._writer, payload, self.max_buffer)
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                if not await self._become_hub():
+                    await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self._writer = writer
+            self._connected.set()
+            logger.info(f"📡 Connected to event bus at {self.path}")
+            try:
+                while True:
+                    self._receive(await _read_frame(reader))
+            except (asyncio.IncompleteReadError, OSError):
+                logger.warning("Event bus connection lost, reconnecting")
+            finally:
+                self._connected.clear()
+                self._close_writer()
+
+    async def _become_hub(self) -> bool:
+        """Start the hub unless another worker holds the hub lock"""
+        if self._server is not None:
+            return False
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # Holding the lock means any socket file left behind is stale
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        try:
+            self._server = await asyncio.start_unix_server(self._serve_peer, self.path)
+        except OSError as e:
+            logger.error(f"Could not start event bus hub: {e}")
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.is_hub = True
+        logger.info(f"📡 Event bus hub listening on {self.path}")
+        return True
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        try:
+            while True:
+                payload = await _read_frame(reader)
+                for peer in list(self._peers):
+                    if peer is not writer:
+                        if not _write_frame(peer, payload, self.max_buffer):
+                            self.dropped += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+class RedisEventBus(EventBus):
+    """Event bus over Redis pub/sub, for workers on different hosts or replicas.
+
+    The subscription is re-established with exponential backoff (from
+    ``reconnect_delay`` up to ``max_reconnect_delay``) whenever the Redis
+    connection drops.
+    """
+
+    def __init__(self, url: Optional[str] = None, channel: Optional[str] = None,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        if aioredis is None:
+            raise RuntimeError("The redis event bus backend requires the 'redis' package")
+        super().__init__()
+        self.url = url or settings.EVENT_BUS_REDIS_URL
+        self.channel = channel or settings.EVENT_BUS_CHANNEL
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        self._redis = aioredis.from_url(self.url)
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        delay = self.reconnect_delay
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info(f"📡 Subscribed to event bus channel {self.channel}")
+                delay = self.reconnect_delay
+                async for item in pubsub.listen():
+                    if item.get('type') == 'message':
+                        self._receive(item['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event bus subscription lost ({e}), retrying in {delay:.1f}s")
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._redis is not None:
+            await self._redis.close()
+
+    def publish(self, message: dict):
+        task = asyncio.create_task(self._redis.publish(self.channel, self._envelope(message)))
+        self._pending.add(task)
+        task.add_done_callback(self._published)
+
+    def _published(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to publish to event bus: {task.exception()}")
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    return await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+
+def _write_frame(writer: asyncio.StreamWriter, payload: bytes, max_buffer: int) -> bool:
+    """Write one frame unless the peer already has ``max_buffer`` bytes unsent"""
+    if writer.is_closing() or writer.transport.get_write_buffer_size() > max_buffer:
+        return False
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+    return True
+
+def create_event_bus(backend: Optional[str] = None) -> EventBus:
+    """Event bus for the configured EVENT_BUS_BACKEND"""
+    backend = backend or settings.EVENT_BUS_BACKEND
+    if backend == "memory":
+        return MemoryEventBus()
+    if backend == "unix":
+        return UnixSocketEventBus()
+    if backend == "redis":
+        return RedisEventBus()
+    raise ValueError(f"Unknown event bus backend: {backend}")
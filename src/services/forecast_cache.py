@@ -0,0 +1,220 @@
+import time
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class ForecastCache:
+    """LRU + TTL cache of forecasts keyed by (service, horizon, time bucket, model version).
+
+    The Prophet + RF forecast only changes when the time bucket rolls over or
+    a new model version is swapped in, so every request inside a bucket can
+    share one computed table. Misses are single-flight: while one caller
+    computes a key, concurrent callers for the same key wait for its result
+    instead of running the forecast again. Coroutines use
+    ``get_or_compute_async``, which computes in a worker thread and waits
+    without blocking the event loop.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 bucket_seconds: Optional[int] = None):
+        self.max_entries = max_entries or settings.FORECAST_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.FORECAST_CACHE_TTL
+        self.bucket_seconds = bucket_seconds or settings.FORECAST_BUCKET_SECONDS
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        # (service, horizon) pairs requested recently, refreshed in the background
+        self._hot_keys: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def bucket(self, now: Optional[datetime] = None) -> int:
+        """Time bucket index for a moment in time"""
+        now = now or datetime.now()
+        return int(now.timestamp() // self.bucket_seconds)
+
+    def bucket_start(self, bucket: int) -> datetime:
+        return datetime.fromtimestamp(bucket * self.bucket_seconds)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def get_or_compute(self, service: str, horizon: int, model_version: int,
+                       compute: Callable[[datetime], List[Dict[str, Any]]],
+                       now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Return the cached forecast for the current bucket, computing it on a miss"""
+        bucket = self.bucket(now)
+        self._mark_hot(service, horizon)
+
+        key = (service, horizon, bucket, model_version)
+        return self.compute_once(key, lambda: compute(self.bucket_start(bucket)))
+
+    async def get_or_compute_async(self, service: str, horizon: int, model_version: int,
+                                   compute: Callable[[datetime], List[Dict[str, Any]]],
+                                   now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """``get_or_compute`` for coroutines: a miss is computed in a worker thread"""
+        bucket = self.bucket(now)
+        self._mark_hot(service, horizon)
+
+        key = (service, horizon, bucket, model_version)
+        forecast, pending, leader = self._claim(key)
+        if forecast is not None:
+            return forecast
+        if not leader:
+            return await asyncio.wrap_future(pending)
+        return await asyncio.to_thread(self._compute_claimed, key, pending,
+                                       lambda: compute(self.bucket_start(bucket)))
+
+    def compute_once(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, or compute and cache it.
+
+        Only one caller at a time computes a given key; the others block until
+        its result (or exception) is available.
+        """
+        forecast, pending, leader = self._claim(key)
+        if forecast is not None:
+            return forecast
+        if not leader:
+            return pending.result()
+        return self._compute_claimed(key, pending, compute)
+
+    def _claim(self, key: Hashable) -> Tuple[Optional[Any], Optional[Future], bool]:
+        """Look ``key`` up, returning (cached value, in-flight future, whether the caller computes it)"""
+        with self._lock:
+            forecast = self._get(key)
+            if forecast is not None:
+                return forecast, None, False
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return None, pending, False
+            pending = self._in_flight[key] = Future()
+            # Running futures cannot be cancelled, so a waiter that gives up
+            # (e.g. a cancelled request) does not cancel it for everyone else
+            pending.set_running_or_notify_cancel()
+            return None, pending, True
+
+    def _compute_claimed(self, key: Hashable, pending: Future, compute: Callable[[], Any]) -> Any:
+        try:
+            forecast = compute()
+            self.put(key, forecast)
+            pending.set_result(forecast)
+            return forecast
+        except BaseException as e:
+            # Waiters see the failure too; the next caller tries again
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _mark_hot(self, service: str, horizon: int):
+        with self._lock:
+            self._hot_keys[(service, horizon)] = time.monotonic()
+            self._hot_keys.move_to_end((service, horizon))
+            while len(self._hot_keys) > self.max_entries:
+                self._hot_keys.popitem(last=False)
+
+    def hot_keys(self) -> List[Tuple[str, int]]:
+        """(service, horizon) pairs requested within the cache TTL"""
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            return [key for key, seen in self._hot_keys.items() if seen >= cutoff]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "bucket_seconds": self.bucket_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "hot_keys": len(self._hot_keys)
+        }
+
+class ForecastRefresher:
+    """Background task precomputing forecasts before their bucket is needed.
+
+    For every recently requested (service, horizon) it fills the current
+    bucket if missing (e.g. after a model reload) and, shortly before the
+    bucket boundary, the next one.
+    """
+
+    def __init__(self, service, interval: Optional[float] = None,
+                 prefetch_seconds: Optional[float] = None):
+        self.service = service
+        self.interval = interval or settings.FORECAST_REFRESH_INTERVAL
+        self.prefetch_seconds = prefetch_seconds if prefetch_seconds is not None else settings.FORECAST_PREFETCH_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self, now: Optional[datetime] = None) -> int:
+        """Precompute missing forecasts off the event loop, returning how many"""
+        return await asyncio.to_thread(self.service.prefetch_forecasts, self.prefetch_seconds, now)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Forecast refresh error: {e}")
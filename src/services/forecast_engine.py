@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Random Forest features, in the order the primary model is trained on
+RF_FEATURES = [
+    'day_of_week', 'hour_of_day', 'hour_sin', 'hour_cos',
+    'Lagged_Features', 'is_payday', 'is_month_end', 'is_fiscal_year_end'
+]
+LAG_FEATURE = 'Lagged_Features'
+PAYDAY = 15  # mid-month payday, the other one is the last day of the month
+FISCAL_YEAR_END_MONTH = 12
+
+def build_future_frame(start: datetime, periods: int,
+                       step: timedelta = timedelta(hours=1)) -> pd.DataFrame:
+    """Calendar and cyclical features for ``periods`` steps starting at ``start``"""
+    ds = pd.date_range(start=start, periods=periods, freq=step)
+    hour = np.asarray(ds.hour)
+    is_month_end = np.asarray(ds.is_month_end)
+
+    return pd.DataFrame({
+        'ds': ds,
+        'day_of_week': np.asarray(ds.dayofweek),
+        'hour_of_day': hour,
+        'hour_sin': np.sin(2 * np.pi * hour / 24),
+        'hour_cos': np.cos(2 * np.pi * hour / 24),
+        'is_payday': ((np.asarray(ds.day) == PAYDAY) | is_month_end).astype(int),
+        'is_month_end': is_month_end.astype(int),
+        'is_fiscal_year_end': (is_month_end & (np.asarray(ds.month) == FISCAL_YEAR_END_MONTH)).astype(int)
+    })
+
+class ForecastEngine:
+    """Prophet + Random Forest ensemble forecast over a whole horizon.
+
+    The future frame is built once per call and each model predicts every
+    step in a single vectorised pass. Prophet's prediction for the previous
+    step stands in for the lagged load the Random Forest was trained with.
+    """
+
+    def __init__(self, prophet_weight: Optional[float] = None,
+                 capacity: Optional[float] = None):
+        self.prophet_weight = settings.FORECAST_PROPHET_WEIGHT if prophet_weight is None else prophet_weight
+        self.capacity = capacity or settings.FORECAST_CAPACITY
+
+    def forecast(self, primary_model: Dict[str, Any], start: datetime,
+                 hours: int) -> List[Dict[str, Any]]:
+        """Forecast ``hours`` hourly steps after ``start``"""
+        prophet_model = primary_model.get('prophet')
+        rf_model = primary_model.get('random_forest')
+        for name, model in (("Prophet", prophet_model), ("Random Forest", rf_model)):
+            if not hasattr(model, 'predict'):
+                raise ValueError(f"{name} model is not a fitted model")
+
+        # Row 0 is the current step, only used to seed the lag of the first point
+        frame = build_future_frame(start, hours + 1)
+
+        prophet_pred = prophet_model.predict(self._prophet_frame(prophet_model, frame))
+        yhat_prophet = prophet_pred['yhat'].to_numpy(dtype=float)
+
+        frame[LAG_FEATURE] = np.concatenate(([yhat_prophet[0]], yhat_prophet[:-1]))
+        yhat_rf = np.asarray(rf_model.predict(self._rf_matrix(rf_model, frame)), dtype=float)
+
+        weight = self.prophet_weight
+        yhat = weight * yhat_prophet + (1 - weight) * yhat_rf
+        confidence = self._confidence(yhat, yhat_prophet, yhat_rf, prophet_pred)
+
+        forecast = []
+        for i in range(1, hours + 1):
+            point = {
+                "timestamp": frame['ds'].iloc[i].isoformat(),
+                "predicted_load": max(0.0, float(yhat[i]) / self.capacity),
+                "predicted_active_users": max(0.0, float(yhat[i])),
+                "confidence": float(confidence[i]),
+                "model_used": "prophet_rf_ensemble"
+            }
+            if 'yhat_lower' in prophet_pred:
+                point["yhat_lower"] = float(prophet_pred['yhat_lower'].iloc[i])
+                point["yhat_upper"] = float(prophet_pred['yhat_upper'].iloc[i])
+            forecast.append(point)
+
+        return forecast
+
+    def _prophet_frame(self, prophet_model, frame: pd.DataFrame) -> pd.DataFrame:
+        """Future frame with every regressor Prophet was fitted with"""
+        regressors = getattr(prophet_model, 'extra_regressors', None) or {}
+        prophet_frame = frame[['ds'] + [name for name in regressors if name in frame]].copy()
+
+        # Regressors unknown ahead of time (e.g. the lag) get their training mean
+        for name, params in regressors.items():
+            if name not in prophet_frame:
+                prophet_frame[name] = params.get('mu', 0.0)
+        return prophet_frame
+
+    def _rf_matrix(self, rf_model, frame: pd.DataFrame) -> Union[pd.DataFrame, np.ndarray]:
+        """Features in the column order the Random Forest was fitted with.
+
+        A DataFrame if the model was fitted on one (so it sees the names it
+        expects), else a plain matrix.
+        """
+        names = getattr(rf_model, 'feature_names_in_', None)
+        fitted_with_names = names is not None
+        if not fitted_with_names:
+            names = RF_FEATURES[:getattr(rf_model, 'n_features_in_', len(RF_FEATURES))]
+
+        missing = [name for name in names if name not in frame]
+        if missing:
+            raise ValueError(f"Unknown Random Forest features: {missing}")
+        features = frame[list(names)].astype(float)
+        return features if fitted_with_names else features.to_numpy()
+
+    def _confidence(self, yhat: np.ndarray, yhat_prophet: np.ndarray,
+                    yhat_rf: np.ndarray, prophet_pred: pd.DataFrame) -> np.ndarray:
+        """Confidence from model agreement and Prophet's interval width"""
+        scale = np.maximum(np.abs(yhat), 1e-9)
+        spread = np.abs(yhat_prophet - yhat_rf) / scale
+
+        if 'yhat_lower' in prophet_pred and 'yhat_upper' in prophet_pred:
+            interval = (prophet_pred['yhat_upper'].to_numpy(dtype=float)
+                        - prophet_pred['yhat_lower'].to_numpy(dtype=float)) / (2 * scale)
+            spread = (spread + interval) / 2
+
+        return np.clip(1.0 - spread, 0.0, 1.0)
@@ -0,0 +1,187 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from src.api.models.schemas import SystemMetrics
+from src.config.settings import settings
+from src.services.metrics_store import METRIC_FIELDS, MetricsRingBuffer, RingIndex, build_metrics
+
+ROLLUP_STATS = ('count', 'sum', 'min', 'max', 'last')
+
+class RollupTier(RingIndex):
+    """Fixed-size ring of time buckets holding count, sum, min, max and last per field.
+
+    Samples are folded into the bucket they fall in, so a tier keeps
+    ``capacity`` buckets of history however many raw samples arrive.
+    """
+
+    def __init__(self, name: str, bucket_seconds: float, capacity: int,
+                 fields: Optional[List[str]] = None):
+        super().__init__(capacity)
+        self.name = name
+        self.bucket_seconds = bucket_seconds
+        self.fields = list(fields or METRIC_FIELDS)
+        shape = (capacity, len(self.fields))
+        self.stats = {
+            'count': np.zeros(shape, dtype=np.int64),
+            'sum': np.zeros(shape),
+            'min': np.full(shape, np.inf),
+            'max': np.full(shape, -np.inf),
+            'last': np.full(shape, np.nan)
+        }
+
+    @property
+    def retention_seconds(self) -> float:
+        return self.capacity * self.bucket_seconds
+
+    def add(self, timestamp: float, row: np.ndarray):
+        """Fold one sample (a value per field, NaN if missing) into its bucket"""
+        bucket_start = timestamp - timestamp % self.bucket_seconds
+        with self._lock:
+            # Late samples are folded into the newest bucket to keep order
+            if self._size and bucket_start <= self.timestamps[self._last_slot()]:
+                index = self._last_slot()
+            else:
+                index = self._next_slot()
+                self.timestamps[index] = bucket_start
+                self.stats['count'][index] = 0
+                self.stats['sum'][index] = 0.0
+                self.stats['min'][index] = np.inf
+                self.stats['max'][index] = -np.inf
+                self.stats['last'][index] = np.nan
+
+            valid = ~np.isnan(row)
+            self.stats['count'][index] += valid
+            self.stats['sum'][index] += np.where(valid, row, 0.0)
+            self.stats['min'][index] = np.fmin(self.stats['min'][index], row)
+            self.stats['max'][index] = np.fmax(self.stats['max'][index], row)
+            self.stats['last'][index] = np.where(valid, row, self.stats['last'][index])
+
+    def extend(self, timestamps: np.ndarray, matrix: np.ndarray):
+        """Fold many time-ordered samples (an (n, n_fields) matrix) into their buckets"""
+        if not len(timestamps):
+            return
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        matrix = np.asarray(matrix, dtype=np.float64)
+        buckets = np.maximum.accumulate(timestamps - timestamps % self.bucket_seconds)
+
+        # One group of consecutive samples per bucket
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        ends = np.concatenate((starts[1:], [len(buckets)])) - 1
+        valid = ~np.isnan(matrix)
+
+        count = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        total = np.add.reduceat(np.where(valid, matrix, 0.0), starts, axis=0)
+        low = np.where(count > 0, np.fmin.reduceat(matrix, starts, axis=0), np.inf)
+        high = np.where(count > 0, np.fmax.reduceat(matrix, starts, axis=0), -np.inf)
+
+        # Last valid value of each field within each group
+        positions = np.maximum.accumulate(
+            np.where(valid, np.arange(len(matrix))[:, None], -1), axis=0)[ends]
+        last = np.where(positions >= starts[:, None],
+                        matrix[positions.clip(0), np.arange(matrix.shape[1])], np.nan)
+
+        group_buckets = buckets[starts]
+        with self._lock:
+            if self._size and group_buckets[0] <= self.timestamps[self._last_slot()]:
+                # The first group continues the newest bucket
+                index = self._last_slot()
+                self.stats['count'][index] += count[0]
+                self.stats['sum'][index] += total[0]
+                self.stats['min'][index] = np.fmin(self.stats['min'][index], low[0])
+                self.stats['max'][index] = np.fmax(self.stats['max'][index], high[0])
+                self.stats['last'][index] = np.where(np.isnan(last[0]), self.stats['last'][index], last[0])
+                group_buckets, count, total, low, high, last = (
+                    values[1:] for values in (group_buckets, count, total, low, high, last))
+
+            keep = slice(-self.capacity, None)
+            group_buckets = group_buckets[keep]
+            if not len(group_buckets):
+                return
+            slots = self._claim_slots(len(group_buckets))
+            self.timestamps[slots] = group_buckets
+            for stat, values in zip(ROLLUP_STATS, (count, total, low, high, last)):
+                self.stats[stat][slots] = values[keep]
+
+    def window(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Bucket starts and per-field stats (n_buckets x n_fields) in a time window"""
+        with self._lock:
+            indices = self._indices(*self._bounds(since, until))
+            result = {'timestamp': self.timestamps[indices]}
+            for stat, values in self.stats.items():
+                result[stat] = values[indices]
+            return result
+
+    def rows(self, since: Optional[float] = None) -> List[SystemMetrics]:
+        """One SystemMetrics per bucket holding the bucket means"""
+        window = self.window(since)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = window['sum'] / window['count']
+        return [
+            build_metrics(timestamp, dict(zip(self.fields, means[i])))
+            for i, timestamp in enumerate(window['timestamp'])
+        ]
+
+class MetricsRollups:
+    """Raw samples plus downsampled tiers, each with its own retention.
+
+    Queries pick the coarsest tier whose bucket still meets the requested
+    resolution and whose retention covers the requested lookback.
+    """
+
+    def __init__(self, raw: MetricsRingBuffer, raw_interval: float,
+                 tiers: Optional[List[RollupTier]] = None):
+        self.raw = raw
+        self.raw_interval = raw_interval
+        self.tiers = tiers if tiers is not None else [
+            RollupTier("1m", 60, settings.METRICS_ROLLUP_MINUTE_RETENTION, raw.fields),
+            RollupTier("1h", 3600, settings.METRICS_ROLLUP_HOUR_RETENTION, raw.fields)
+        ]
+
+    def add(self, timestamp: float, values: Dict[str, Optional[float]]):
+        """Store a sample in the raw buffer and every rollup tier"""
+        self.raw.append_values(timestamp, values)
+        row = np.array([np.nan if values.get(field) is None else values[field]
+                        for field in self.raw.fields], dtype=np.float64)
+        for tier in self.tiers:
+            tier.add(timestamp, row)
+
+    def extend(self, timestamps: np.ndarray, matrix: np.ndarray):
+        """Bulk-load time-ordered samples (an (n, n_fields) matrix) into every tier"""
+        self.raw.extend_values(timestamps, matrix)
+        for tier in self.tiers:
+            tier.extend(timestamps, matrix)
+
+    def select(self, lookback_seconds: float, resolution_seconds: float):
+        """Coarsest tier meeting ``resolution_seconds`` that covers the lookback"""
+        raw_retention = self.raw.capacity * self.raw_interval
+        candidates = [(self.raw_interval, raw_retention, self.raw)] + [
+            (tier.bucket_seconds, tier.retention_seconds, tier) for tier in self.tiers
+        ]
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        fine_enough = [c for c in candidates if c[0] <= resolution_seconds] or candidates[:1]
+        coarsest = fine_enough[-1]
+        if coarsest[1] >= lookback_seconds:
+            return coarsest[2]
+
+        # Nothing at this resolution reaches back far enough: use the finest tier that does
+        covering = [c for c in candidates if c[1] >= lookback_seconds]
+        return covering[0][2] if covering else candidates[-1][2]
+
+    def tier_name(self, tier) -> str:
+        return "raw" if tier is self.raw else tier.name
+
+    def tier_resolution(self, tier) -> float:
+        return self.raw_interval if tier is self.raw else tier.bucket_seconds
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Resolution, retention and fill level of every tier"""
+        return [
+            {
+                "tier": self.tier_name(tier),
+                "resolution_seconds": self.tier_resolution(tier),
+                "retention_seconds": tier.capacity * self.tier_resolution(tier),
+                "entries": len(tier)
+            }
+            for tier in [self.raw] + self.tiers
+        ]
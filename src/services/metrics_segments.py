@@ -0,0 +1,195 @@
+import os
+import re
+import glob
+import time
+import fcntl
+import struct
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from src.config.settings import settings
+from src.services.metrics_store import METRIC_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"AMSEG001"
+HEADER = struct.Struct("<8sII")  # magic, record size, field count
+# metrics-<start>[-<writer>].seg, or a retired segment with a .old suffix
+SEGMENT_NAME = re.compile(r"^metrics-(\d+)(?:-\w+)?\.seg((?:\.\d+)?\.old)?$")
+
+def record_dtype(fields: List[str]) -> np.dtype:
+    """Fixed-width little-endian record: epoch timestamp then one float64 per field"""
+    return np.dtype([('timestamp', '<f8')] + [(field, '<f8') for field in fields])
+
+class MetricsSegmentStore:
+    """Append-only on-disk log of metric samples.
+
+    Samples are written as fixed-width binary records to segment files named
+    after the epoch second they start at and the writing process. A new
+    segment is started every ``rotate_seconds`` and segments older than the
+    retention are deleted. Writes are fsynced at most every ``fsync_interval``
+    seconds, so a crash loses at most that much data; a torn trailing record
+    is ignored on replay.
+
+    Workers all sample the same host, so only one of them persists: the one
+    holding an exclusive lock on ``writer.lock``. The others skip their
+    appends and take over when the writer exits. Each record is one
+    unbuffered ``O_APPEND`` write to a file no other process writes to.
+    """
+
+    def __init__(self, path: Optional[str] = None, fields: Optional[List[str]] = None,
+                 rotate_seconds: Optional[float] = None, fsync_interval: Optional[float] = None,
+                 retention_seconds: Optional[float] = None):
+        self.path = path or settings.METRICS_SEGMENT_PATH
+        self.fields = list(fields or METRIC_FIELDS)
+        self.dtype = record_dtype(self.fields)
+        self.rotate_seconds = rotate_seconds or settings.METRICS_SEGMENT_ROTATE_SECONDS
+        self.fsync_interval = settings.METRICS_SEGMENT_FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        self.retention_seconds = retention_seconds or settings.METRICS_SEGMENT_RETENTION_HOURS * 3600
+        self._fd: Optional[int] = None
+        self._lock_file = None
+        self._segment_start: Optional[float] = None
+        self._last_fsync = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def segment_files(self, include_retired: bool = False) -> List[Tuple[float, str]]:
+        """(start epoch, path) of every segment, oldest first"""
+        segments = []
+        for path in glob.glob(os.path.join(self.path, "metrics-*")):
+            match = SEGMENT_NAME.match(os.path.basename(path))
+            if match is None or (match.group(2) and not include_retired):
+                continue
+            segments.append((float(match.group(1)), path))
+        return sorted(segments)
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_file is not None
+
+    def _acquire_writer(self) -> bool:
+        """Become the persisting process unless another one holds the writer lock"""
+        lock_file = open(os.path.join(self.path, "writer.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"💾 Persisting metric samples to {self.path}")
+        return True
+
+    def append(self, timestamp: float, values: Dict[str, Optional[float]]):
+        """Append one sample"""
+        record = np.zeros(1, dtype=self.dtype)
+        record['timestamp'] = timestamp
+        for field in self.fields:
+            value = values.get(field)
+            record[field] = np.nan if value is None else value
+
+        with self._lock:
+            if not self.is_writer and not self._acquire_writer():
+                return
+            if self._fd is None or timestamp >= self._segment_start + self.rotate_seconds:
+                self._rotate(timestamp)
+            os.write(self._fd, record.tobytes())
+
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+
+    def _rotate(self, timestamp: float):
+        """Close the current segment and start one aligned to ``rotate_seconds``"""
+        self._close_segment()
+        self._segment_start = timestamp - timestamp % self.rotate_seconds
+        path = os.path.join(self.path, f"metrics-{int(self._segment_start)}-{os.getpid()}.seg")
+
+        if os.path.exists(path) and not self._valid_header(path):
+            # Layout changed (e.g. new fields): retire it instead of mixing records
+            os.replace(path, f"{path}.{time.time_ns()}.old")
+
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            os.write(self._fd, HEADER.pack(SEGMENT_MAGIC, self.dtype.itemsize, len(self.fields)))
+        elif (size - HEADER.size) % self.dtype.itemsize:
+            # A reused pid reopened a segment ending in a torn record
+            os.ftruncate(self._fd, size - (size - HEADER.size) % self.dtype.itemsize)
+
+        self._prune(timestamp)
+
+    def _prune(self, now: float):
+        """Delete segments, retired ones included, that ended before the retention window"""
+        for start, path in self.segment_files(include_retired=True):
+            if start + self.rotate_seconds <= now - self.retention_seconds:
+                try:
+                    os.remove(path)
+                    logger.debug(f"Removed expired metrics segment {path}")
+                except OSError as e:
+                    logger.warning(f"Could not remove metrics segment {path}: {e}")
+
+    def _sync(self):
+        os.fsync(self._fd)
+        self._last_fsync = time.monotonic()
+
+    def _close_segment(self):
+        if self._fd is not None:
+            self._sync()
+            os.close(self._fd)
+            self._fd = None
+
+    def flush(self):
+        """Fsync the open segment"""
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+
+    def close(self):
+        """Close the open segment and hand the writer lock to another process"""
+        with self._lock:
+            self._close_segment()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _valid_header(self, path: str) -> bool:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return False
+        magic, record_size, n_fields = HEADER.unpack(header)
+        return magic == SEGMENT_MAGIC and record_size == self.dtype.itemsize and n_fields == len(self.fields)
+
+    def _map(self, path: str) -> Optional[np.ndarray]:
+        """Memory-map the complete records of one segment"""
+        if not self._valid_header(path):
+            logger.warning(f"Skipping metrics segment with unknown layout: {path}")
+            return None
+        n_records = (os.path.getsize(path) - HEADER.size) // self.dtype.itemsize
+        if n_records <= 0:
+            return None
+        return np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER.size, shape=(n_records,))
+
+    def load(self, since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and an (n, n_fields) value matrix of samples after ``since``"""
+        self.flush()
+        timestamps, matrices = [], []
+
+        for start, path in self.segment_files():
+            if since is not None and start + self.rotate_seconds <= since:
+                continue
+            records = self._map(path)
+            if records is None:
+                continue
+            if since is not None:
+                records = records[records['timestamp'] > since]
+            timestamps.append(np.asarray(records['timestamp']))
+            matrices.append(np.column_stack([records[field] for field in self.fields]))
+
+        if not timestamps:
+            return np.empty(0), np.empty((0, len(self.fields)))
+        # Segments of successive writers can share a start time
+        timestamps, matrix = np.concatenate(timestamps), np.concatenate(matrices)
+        order = np.argsort(timestamps, kind="stable")
+        return timestamps[order], matrix[order]
@@ -0,0 +1,192 @@
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.api.models.schemas import SystemMetrics
+from src.config.settings import settings
+
+# Numeric SystemMetrics fields, one column each
+METRIC_FIELDS = [
+    'load_1m', 'load_5m', 'load_15m',
+    'cpu_user', 'cpu_system', 'cpu_iowait',
+    'sys_mem_available', 'sys_mem_total',
+    'disk_io_time', 'disk_io_read', 'disk_io_write',
+    'requests_per_ip', 'source_variety'
+]
+OPTIONAL_FIELDS = {'requests_per_ip', 'source_variety'}
+
+def to_epoch(timestamp: Any) -> float:
+    """Epoch seconds of an ISO string or datetime timestamp"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return timestamp.timestamp()
+
+def build_metrics(timestamp: float, values: Dict[str, float]) -> SystemMetrics:
+    """SystemMetrics from epoch seconds and field values, NaN meaning missing"""
+    fields = {}
+    for field, value in values.items():
+        value = float(value)
+        if np.isnan(value):
+            value = None if field in OPTIONAL_FIELDS else 0.0
+        fields[field] = value
+    return SystemMetrics(timestamp=datetime.fromtimestamp(timestamp).isoformat(), **fields)
+
+class RingIndex:
+    """Time-ordered slots in fixed-size arrays, overwriting the oldest when full.
+
+    Subclasses keep their data in arrays indexed by slot; this class tracks
+    which slots are live and locates time windows with binary searches.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _last_slot(self) -> int:
+        return (self._start + self._size - 1) % self.capacity
+
+    def _next_slot(self) -> int:
+        """Claim the slot for a new entry, evicting the oldest when full"""
+        if self._size < self.capacity:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+        return index
+
+    def _claim_slots(self, n: int) -> np.ndarray:
+        """Claim slots for ``n <= capacity`` new entries, evicting the oldest when full"""
+        slots = (self._start + self._size + np.arange(n)) % self.capacity
+        overflow = max(0, self._size + n - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._size = min(self.capacity, self._size + n)
+        return slots
+
+    def _segments(self):
+        """Physical slices holding the entries, oldest first"""
+        end = self._start + self._size
+        if end <= self.capacity:
+            return [slice(self._start, end)]
+        return [slice(self._start, self.capacity), slice(0, end - self.capacity)]
+
+    def _search(self, timestamp: float, side: str) -> int:
+        """Logical index of ``timestamp`` via binary search over both segments"""
+        offset = 0
+        for segment in self._segments():
+            times = self.timestamps[segment]
+            index = int(np.searchsorted(times, timestamp, side=side))
+            if index < len(times):
+                return offset + index
+            offset += len(times)
+        return offset
+
+    def _bounds(self, since: Optional[float], until: Optional[float]):
+        """Logical range [lo, hi) of entries with ``since < timestamp <= until``"""
+        lo = 0 if since is None else self._search(since, 'right')
+        hi = self._size if until is None else self._search(until, 'right')
+        return lo, max(lo, hi)
+
+    def _indices(self, lo: int, hi: int) -> np.ndarray:
+        """Physical slots of logical range [lo, hi)"""
+        return (self._start + np.arange(lo, hi)) % self.capacity
+
+    def count(self, since: Optional[float] = None, until: Optional[float] = None) -> int:
+        """Number of entries in a time window"""
+        with self._lock:
+            lo, hi = self._bounds(since, until)
+            return hi - lo
+
+    def clear(self):
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+class MetricsRingBuffer(RingIndex):
+    """Fixed-size columnar store of metric samples.
+
+    Each metric lives in its own preallocated float64 array next to an
+    epoch-seconds timestamp array. Samples are kept in time order, so a
+    time window is located with two binary searches and aggregated with
+    vectorised NumPy calls. Once full, the oldest sample is overwritten.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, fields: Optional[List[str]] = None):
+        super().__init__(capacity or settings.METRICS_BUFFER_CAPACITY)
+        self.fields = list(fields or METRIC_FIELDS)
+        self.columns = {field: np.full(self.capacity, np.nan) for field in self.fields}
+
+    def append(self, metrics: SystemMetrics):
+        """Store one SystemMetrics sample"""
+        self.append_values(to_epoch(metrics.timestamp),
+                           {field: getattr(metrics, field, None) for field in self.fields})
+
+    def append_values(self, timestamp: float, values: Dict[str, Optional[float]]):
+        """Store one sample given as epoch seconds and a field -> value mapping"""
+        with self._lock:
+            if self._size:
+                # Keep the buffer sorted even if the clock steps backwards
+                timestamp = max(timestamp, self.timestamps[self._last_slot()])
+
+            index = self._next_slot()
+            self.timestamps[index] = timestamp
+            for field, column in self.columns.items():
+                value = values.get(field)
+                column[index] = np.nan if value is None else value
+
+    def extend_values(self, timestamps: np.ndarray, matrix: np.ndarray):
+        """Store many time-ordered samples at once (an (n, n_fields) matrix)"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)[-self.capacity:]
+        matrix = np.asarray(matrix, dtype=np.float64)[-self.capacity:]
+        if not len(timestamps):
+            return
+
+        with self._lock:
+            if self._size:
+                timestamps = np.maximum(timestamps, self.timestamps[self._last_slot()])
+            slots = self._claim_slots(len(timestamps))
+            self.timestamps[slots] = np.maximum.accumulate(timestamps)
+            for i, column in enumerate(self.columns.values()):
+                column[slots] = matrix[:, i]
+
+    def window(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Columns of the samples with ``since < timestamp <= until``"""
+        with self._lock:
+            indices = self._indices(*self._bounds(since, until))
+            result = {'timestamp': self.timestamps[indices]}
+            for field, column in self.columns.items():
+                result[field] = column[indices]
+            return result
+
+    def mean(self, since: Optional[float] = None, fields: Optional[List[str]] = None) -> Dict[str, float]:
+        """Per-field mean over a time window, ignoring missing values"""
+        window = self.window(since)
+        if not len(window['timestamp']):
+            return {}
+
+        result = {}
+        for field in fields or self.fields:
+            values = window[field]
+            values = values[~np.isnan(values)]
+            if len(values):
+                result[field] = float(values.mean())
+        return result
+
+    def rows(self, since: Optional[float] = None) -> List[SystemMetrics]:
+        """Rebuild SystemMetrics objects for a time window"""
+        window = self.window(since)
+        return [
+            build_metrics(timestamp, {field: window[field][i] for field in self.fields})
+            for i, timestamp in enumerate(window['timestamp'])
+        ]
+
+    def memory_bytes(self) -> int:
+        """Bytes preallocated for the buffer"""
+        return self.timestamps.nbytes + sum(column.nbytes for column in self.columns.values())
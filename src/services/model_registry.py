@@ -0,0 +1,398 @@
+import os
+import joblib
+import pickle
+import time
+import asyncio
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import logging
+
+from src.config.settings import settings
+from src.utils.forest_compiler import compile_isolation_forest, compile_scaler
+from src.utils.instrumentation import ANOMALY_SCORE_DURATION, MODEL_LOAD_DURATION
+
+logger = logging.getLogger(__name__)
+
+def zeros_input(estimator, n_rows: int = 1):
+    """All-zero input for test inferences, as a DataFrame if the estimator was fitted on one"""
+    names = getattr(estimator, 'feature_names_in_', None)
+    if names is not None:
+        return pd.DataFrame(np.zeros((n_rows, len(names))), columns=names)
+    return np.zeros((n_rows, estimator.n_features_in_))
+
+class APISecondaryModel:
+    """Simplified API wrapper around the trained secondary model"""
+
+    def __init__(self, model_data):
+        self.metrics_scaler = model_data['metrics_scaler']
+        self.resid_scaler = model_data['resid_scaler']
+        self.iso_forest = model_data['iso_forest']
+        self.available_features = model_data['available_features']
+        self.sequence_length = model_data.get('sequence_length', 12)
+        self.window_resid = []
+        # SystemMetrics attribute for each feature, in model column order
+        self.feature_fields = [feature.replace('-', '_') for feature in self.available_features]
+
+        # Array-based scorer replacing sklearn's per-call overhead on the hot path
+        self.compiled_forest = None
+        self.compiled_scaler = None
+        if settings.SECONDARY_MODEL_COMPILED and self.iso_forest is not None:
+            self.compiled_forest = compile_isolation_forest(self.iso_forest)
+            self.compiled_scaler = compile_scaler(self.metrics_scaler)
+            if self.compiled_forest is not None:
+                logger.info(f"⚡ Compiled Isolation Forest "
+                            f"({len(self.compiled_forest.feature)} nodes, depth {self.compiled_forest.max_depth})")
+
+    def build_matrix(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Build the feature matrix for feature-keyed dicts in model column order"""
+        matrix = np.zeros((len(rows), len(self.available_features)), dtype=np.float64)
+        for i, row in enumerate(rows):
+            for j, feature in enumerate(self.available_features):
+                value = row.get(feature)
+                if value is not None:
+                    matrix[i, j] = value
+        np.nan_to_num(matrix, copy=False, nan=0.0)
+        return matrix
+
+    def build_matrix_from_metrics(self, metrics_list: List[Any]) -> np.ndarray:
+        """Build the feature matrix directly from SystemMetrics objects"""
+        matrix = np.zeros((len(metrics_list), len(self.feature_fields)), dtype=np.float64)
+        for i, metrics in enumerate(metrics_list):
+            for j, field in enumerate(self.feature_fields):
+                value = getattr(metrics, field, None)
+                if value is not None:
+                    matrix[i, j] = value
+        np.nan_to_num(matrix, copy=False, nan=0.0)
+        return matrix
+
+    def score_batch(self, matrix: np.ndarray) -> np.ndarray:
+        """Score a feature matrix in one pass, returning raw Isolation Forest scores"""
+        with ANOMALY_SCORE_DURATION.time():
+            if self.compiled_scaler is not None:
+                input_scaled = self.compiled_scaler(matrix)
+            elif hasattr(self.metrics_scaler, 'feature_names_in_'):
+                # Fitted on a DataFrame: score one too, so the column names are checked
+                input_scaled = self.metrics_scaler.transform(
+                    pd.DataFrame(matrix, columns=self.available_features))
+            else:
+                input_scaled = self.metrics_scaler.transform(matrix)
+
+            if self.compiled_forest is not None:
+                return self.compiled_forest.decision_function(input_scaled)
+            return self.iso_forest.decision_function(input_scaled)
+
+    def predict(self, input_data, source_ip=None):
+        try:
+            iso_score_raw = float(self.score_batch(self.build_matrix([input_data]))[0])
+            iso_anom_score = -iso_score_raw
+
+            # Decision logic
+            action = 'normal'
+            confidence = 0.85
+            reason = "No significant anomaly detected"
+
+            if iso_anom_score > settings.ANOMALY_THRESHOLD:
+                action = 'security_alert'
+                confidence = 0.9
+                reason = "Isolation Forest detected anomaly"
+            elif input_data.get('load-1m', 0) > 0.8:
+                action = 'scale_up'
+                confidence = 0.88
+                reason = "High system load detected"
+            elif input_data.get('load-1m', 0) < 0.2:
+                action = 'scale_down'
+                confidence = 0.75
+                reason = "Low system load detected"
+
+            return {
+                'action': action,
+                'confidence': confidence,
+                'reason': reason,
+                'source': 'isolation_forest',
+                'scores': {
+                    'iso_score_raw': iso_score_raw,
+                    'iso_anom_score': iso_anom_score
+                }
+            }
+        except Exception as e:
+            logger.error(f"Prediction error: {e}")
+            return {
+                'action': 'normal',
+                'confidence': 0.5,
+                'reason': f"Error in prediction: {e}",
+                'source': 'error_fallback',
+                'scores': {}
+            }
+
+class ModelBundle:
+    """One immutable generation of loaded models.
+
+    Requests take a reference to the current bundle once and use it for the
+    whole computation, so a hot reload never changes models mid-request.
+    """
+
+    def __init__(self, primary_model: Optional[Dict[str, Any]] = None,
+                 secondary_model: Optional[APISecondaryModel] = None,
+                 version: int = 0, fingerprint: Optional[str] = None,
+                 load_times: Optional[Dict[str, float]] = None):
+        self.primary_model = primary_model
+        self.secondary_model = secondary_model
+        self.version = version
+        self.fingerprint = fingerprint
+        self.load_times = load_times or {}
+        self.loaded_at = datetime.now().isoformat()
+
+class ModelRegistry:
+    """Process-wide holder for the loaded ML models.
+
+    Models are unpickled once (normally from the API lifespan hook) and then
+    shared by every request instead of being reloaded per ScalingService.
+    Retrained artifacts are picked up by ``reload_if_changed``, which loads and
+    validates a new bundle before swapping it in with a single assignment.
+    """
+
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path or settings.MODEL_PATH
+        self.bundle = ModelBundle()
+        self.warmup_time: Optional[float] = None
+        self.last_reload_error: Optional[str] = None
+        self._rejected_fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def primary_model(self) -> Optional[Dict[str, Any]]:
+        return self.bundle.primary_model
+
+    @property
+    def secondary_model(self) -> Optional[APISecondaryModel]:
+        return self.bundle.secondary_model
+
+    @property
+    def version(self) -> int:
+        return self.bundle.version
+
+    @property
+    def loaded(self) -> bool:
+        """Whether load() has run (e.g. preloaded before forking workers)"""
+        return self.bundle.version > 0
+
+    def artifact_paths(self) -> Dict[str, str]:
+        """Get the on-disk artifacts backing the registry"""
+        return {
+            "prophet": f"{self.model_path}{settings.PRIMARY_MODEL_FILE}",
+            "random_forest": f"{self.model_path}rf_model.pkl",
+            "secondary": f"{self.model_path}{settings.SECONDARY_MODEL_FILE}"
+        }
+
+    def fingerprint(self) -> str:
+        """Fingerprint artifact sizes and modification times (cheap stat calls)"""
+        parts = []
+        for name, path in sorted(self.artifact_paths().items()):
+            try:
+                stat = os.stat(path)
+                parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+            except OSError:
+                parts.append(f"{name}:missing")
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+    def _read_artifact(self, path: str) -> Any:
+        """Read one artifact, memory-mapping its NumPy arrays when possible.
+
+        Uncompressed joblib files are opened with ``mmap_mode`` so their arrays
+        are backed by the OS page cache and shared between processes. Plain
+        pickles (older secondary model files) are read normally.
+        """
+        try:
+            return joblib.load(path, mmap_mode=settings.MODEL_MMAP_MODE)
+        except (ValueError, KeyError, pickle.UnpicklingError):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+    def _read_primary_model(self) -> Dict[str, Any]:
+        paths = self.artifact_paths()
+        return {
+            'prophet': self._read_artifact(paths["prophet"]),
+            'random_forest': self._read_artifact(paths["random_forest"])
+        }
+
+    def _read_secondary_model(self) -> APISecondaryModel:
+        return APISecondaryModel(self._read_artifact(self.artifact_paths()["secondary"]))
+
+    def _build_bundle(self, version: int) -> ModelBundle:
+        """Load every artifact into a new bundle, leaving broken ones unloaded"""
+        fingerprint = self.fingerprint()
+        models: Dict[str, Any] = {}
+        load_times: Dict[str, float] = {}
+
+        for name, reader in (("primary_model", self._read_primary_model),
+                             ("secondary_model", self._read_secondary_model)):
+            try:
+                start = time.perf_counter()
+                models[name] = reader()
+                load_times[name] = time.perf_counter() - start
+                MODEL_LOAD_DURATION.labels(name).observe(load_times[name])
+                logger.info(f"✅ {name} loaded in {load_times[name]:.3f}s")
+            except Exception as e:
+                logger.error(f"❌ Error loading {name}: {e}")
+
+        return ModelBundle(version=version, fingerprint=fingerprint,
+                           load_times=load_times, **models)
+
+    def load(self):
+        """Load all models and run a warm-up inference.
+
+        Missing or broken artifacts are logged and left unloaded so the API can
+        still start and serve fallback responses.
+        """
+        with self._lock:
+            bundle = self._build_bundle(version=self.bundle.version + 1)
+            self.warm_up(bundle)
+            self.bundle = bundle
+
+    def reload_if_changed(self) -> bool:
+        """Load, validate and swap in new artifacts if they changed on disk.
+
+        Runs in a worker thread. The live bundle keeps serving until the new
+        one has passed a test inference; a bundle that fails validation is
+        not retried until the artifacts change again.
+        """
+        fingerprint = self.fingerprint()
+        if fingerprint in (self.bundle.fingerprint, self._rejected_fingerprint):
+            return False
+
+        with self._lock:
+            logger.info(f"🔄 Model artifacts changed, loading version {self.bundle.version + 1}")
+            candidate = self._build_bundle(version=self.bundle.version + 1)
+            try:
+                self._validate(candidate)
+            except Exception as e:
+                self._rejected_fingerprint = fingerprint
+                self.last_reload_error = str(e)
+                logger.error(f"❌ Rejected reloaded models, keeping version {self.bundle.version}: {e}")
+                return False
+
+            self.warm_up(candidate)
+            self.bundle = candidate
+            self._rejected_fingerprint = None
+            self.last_reload_error = None
+
+        logger.info(f"✅ Swapped in model version {candidate.version} ({candidate.fingerprint})")
+        return True
+
+    def _validate(self, bundle: ModelBundle):
+        """Raise if a bundle lost a model or cannot run a test inference"""
+        if self.bundle.primary_model is not None and bundle.primary_model is None:
+            raise ValueError("primary model failed to load")
+        if self.bundle.secondary_model is not None and bundle.secondary_model is None:
+            raise ValueError("secondary model failed to load")
+
+        if bundle.primary_model is not None:
+            rf_model = bundle.primary_model['random_forest']
+            n_features = getattr(rf_model, 'n_features_in_', None)
+            if n_features and not np.all(np.isfinite(rf_model.predict(zeros_input(rf_model)))):
+                raise ValueError("primary model produced non-finite predictions")
+
+        if bundle.secondary_model is not None:
+            model = bundle.secondary_model
+            scores = model.score_batch(np.zeros((1, len(model.available_features))))
+            if not np.all(np.isfinite(scores)):
+                raise ValueError("secondary model produced non-finite scores")
+
+    def warm_up(self, bundle: Optional[ModelBundle] = None):
+        """Run one inference through each loaded model to prime lazy state"""
+        bundle = bundle or self.bundle
+        start = time.perf_counter()
+
+        if bundle.primary_model is not None:
+            try:
+                rf_model = bundle.primary_model['random_forest']
+                n_features = getattr(rf_model, 'n_features_in_', None)
+                if n_features:
+                    rf_model.predict(zeros_input(rf_model))
+            except Exception as e:
+                logger.warning(f"Primary model warm-up failed: {e}")
+
+        if bundle.secondary_model is not None:
+            sample = {feature: 0.0 for feature in bundle.secondary_model.available_features}
+            bundle.secondary_model.predict(sample)
+
+        self.warmup_time = time.perf_counter() - start
+        logger.info(f"🔥 Model warm-up completed in {self.warmup_time:.3f}s")
+
+    def status(self) -> Dict[str, Any]:
+        """Get loaded state, version and timings of the registry"""
+        bundle = self.bundle
+        return {
+            "models_loaded": {
+                "primary_model": bundle.primary_model is not None,
+                "secondary_model": bundle.secondary_model is not None
+            },
+            "model_version": bundle.version,
+            "fingerprint": bundle.fingerprint,
+            "load_time_seconds": dict(bundle.load_times),
+            "warmup_time_seconds": self.warmup_time,
+            "loaded_at": bundle.loaded_at,
+            "last_reload_error": self.last_reload_error
+        }
+
+class ModelWatcher:
+    """Background task polling MODEL_PATH and hot-reloading changed models.
+
+    A change is only acted on once the fingerprint is stable across two polls,
+    so artifacts that are still being written are not loaded half-way.
+    """
+
+    def __init__(self, registry: ModelRegistry, interval: Optional[float] = None):
+        self.registry = registry
+        self.interval = interval or settings.MODEL_RELOAD_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        self._last_seen: Optional[str] = None
+
+    async def start(self):
+        if self._task is None:
+            self._last_seen = self.registry.bundle.fingerprint
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"👀 Watching {self.registry.model_path} for model changes every {self.interval}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def check(self) -> bool:
+        """Poll once, reloading off the event loop if artifacts settled"""
+        fingerprint = await asyncio.to_thread(self.registry.fingerprint)
+        settled = fingerprint == self._last_seen
+        self._last_seen = fingerprint
+        if not settled or fingerprint == self.registry.bundle.fingerprint:
+            return False
+        return await asyncio.to_thread(self.registry.reload_if_changed)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+# Process-wide registry instance
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
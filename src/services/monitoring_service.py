@@ -1,10 +1,16 @@
 import time
 import psutil
+import asyncio
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from src.api.models.schemas import SystemMetrics
 from src.config.settings import settings
+from src.services.metrics_store import MetricsRingBuffer, METRIC_FIELDS, to_epoch
+from src.services.rolling_aggregates import RollingAggregator
+from src.services.metrics_rollups import MetricsRollups
+from src.services.metrics_segments import MetricsSegmentStore
+from src.utils.instrumentation import METRICS_COLLECTION_DURATION
 
 logger = logging.getLogger(__name__)
 
@@ -12,21 +18,61 @@ class MonitoringService:
     """Service for collecting and monitoring system metrics"""
     
     def __init__(self):
-        self.metrics_history = []
         self.anomaly_threshold = settings.ANOMALY_THRESHOLD
-        self.collection_interval = 30  # seconds
-        self.active_instances = settings.MIN_INSTANCES
+        self.collection_interval = settings.METRICS_COLLECTION_INTERVAL  # seconds
+        self.metrics_store = MetricsRingBuffer(settings.METRICS_BUFFER_CAPACITY)
+        self.rollups = MetricsRollups(self.metrics_store, raw_interval=self.collection_interval)
+        self.aggregates = RollingAggregator(METRIC_FIELDS, settings.METRICS_AGGREGATE_WINDOWS,
+                                            settings.METRICS_EWMA_HALF_LIVES)
+        self.latest_metrics: Optional[SystemMetrics] = None
+        self.segments: Optional[MetricsSegmentStore] = None  # opened by initialize()
+        
+        # CPU percentages are deltas since the previous call, so take the
+        # baseline now instead of sleeping inside collect_metrics
+        psutil.cpu_times_percent(interval=None)
+    
+    @property
+    def metrics_history(self) -> List[SystemMetrics]:
+        """All retained samples, oldest first"""
+        return self.metrics_store.rows()
     
     async def initialize(self):
         """Initialize monitoring service"""
         logger.info("Initializing monitoring service...")
-        # Initialize any async resources here
+        if settings.METRICS_PERSISTENCE_ENABLED:
+            self.segments = MetricsSegmentStore()
+            await asyncio.to_thread(self.replay_metrics)
+    
+    def replay_metrics(self) -> int:
+        """Rebuild history, rollups and aggregates from the on-disk segments"""
+        if self.segments is None:
+            return 0
+        start = time.perf_counter()
+        since = time.time() - self.segments.retention_seconds
+        timestamps, matrix = self.segments.load(since=since)
+        if not len(timestamps):
+            return 0
+        
+        self.rollups.extend(timestamps, matrix)
+        
+        # Only the newest samples matter for the rolling windows
+        recent = timestamps > timestamps[-1] - max(self.aggregates.windows, default=0)
+        for timestamp, row in zip(timestamps[recent], matrix[recent]):
+            self.aggregates.update(float(timestamp), dict(zip(METRIC_FIELDS, row.tolist())))
+        
+        logger.info(f"📼 Replayed {len(timestamps)} metric samples in {time.perf_counter() - start:.3f}s")
+        return len(timestamps)
+    
+    def close(self):
+        """Flush and close the on-disk metrics segments"""
+        if self.segments is not None:
+            self.segments.close()
     
     def collect_metrics(self) -> SystemMetrics:
         """Collect current system metrics"""
         try:
-            # Get CPU usage
-            cpu_usage = psutil.cpu_percent(interval=1)
+            # Get CPU usage since the previous sample (never sleeps)
+            cpu = psutil.cpu_times_percent(interval=None)
             
             # Get memory usage
             memory = psutil.virtual_memory()
@@ -52,9 +98,9 @@ class MonitoringService:
                 load_1m=load_1m,
                 load_5m=load_5m,
                 load_15m=load_15m,
-                cpu_user=cpu_usage * 0.7,  # Simulate user CPU
-                cpu_system=cpu_usage * 0.2,  # Simulate system CPU
-                cpu_iowait=cpu_usage * 0.1,  # Simulate IO wait
+                cpu_user=cpu.user,
+                cpu_system=cpu.system,
+                cpu_iowait=getattr(cpu, "iowait", 0.0),  # Linux only
                 sys_mem_available=memory.available,
                 sys_mem_total=memory.total,
                 disk_io_time=disk_io / 1000000,  # Convert to MB
@@ -64,55 +110,98 @@ class MonitoringService:
                 source_variety=source_variety
             )
             
-            # Store in history
-            self.metrics_history.append(metrics)
-            
-            # Keep only last 1000 records
-            if len(self.metrics_history) > 1000:
-                self.metrics_history = self.metrics_history[-1000:]
+            self.record_metrics(metrics)
             
             return metrics
         except Exception as e:
             logger.error(f"Error collecting metrics: {e}")
             raise
     
+    def record_metrics(self, metrics: SystemMetrics):
+        """Publish a sample as the latest snapshot and add it to history and aggregates"""
+        self.latest_metrics = metrics
+        timestamp = to_epoch(metrics.timestamp)
+        values = {field: getattr(metrics, field, None) for field in METRIC_FIELDS}
+        self.rollups.add(timestamp, values)
+        self.aggregates.update(timestamp, values)
+        if self.segments is not None:
+            self.segments.append(timestamp, values)
+    
+    def get_latest_metrics(self) -> SystemMetrics:
+        """Get the most recent sample, collecting one if none exists yet"""
+        return self.latest_metrics or self.collect_metrics()
+    
     def check_models_status(self) -> Dict[str, bool]:
         """Check if models are loaded and available"""
         try:
-            from src.services.scaling_service import ScalingService
-            service = ScalingService()
-            return {
-                "primary_model": service.primary_model is not None,
-                "secondary_model": service.secondary_model is not None
-            }
+            from src.services.model_registry import get_model_registry
+            return get_model_registry().status()["models_loaded"]
         except Exception as e:
             logger.error(f"Error checking models status: {e}")
             return {"primary_model": False, "secondary_model": False}
     
-    def get_active_instances(self) -> int:
-        """Get current number of active instances"""
-        return self.active_instances
+    def get_process_memory(self) -> Dict[str, Any]:
+        """Get resident memory of this worker process.
+
+        USS is memory unique to the worker; PSS splits shared pages (such as
+        models inherited from a preforked master) across the processes using them.
+        """
+        process = psutil.Process()
+        try:
+            memory = process.memory_full_info()
+        except psutil.AccessDenied:
+            memory = process.memory_info()
+        
+        return {
+            "pid": process.pid,
+            "rss_bytes": memory.rss,
+            "uss_bytes": getattr(memory, "uss", None),
+            "pss_bytes": getattr(memory, "pss", None),
+            "shared_bytes": getattr(memory, "shared", None)
+        }
     
-    def get_metrics_history(self, hours: int = 1) -> List[SystemMetrics]:
+    def get_metrics_history(self, hours: int = 1,
+                            resolution: Optional[float] = None) -> List[SystemMetrics]:
         """Get metrics history for the last N hours"""
+        return self.query_metrics_history(hours, resolution)["history"]
+    
+    def query_metrics_history(self, hours: float = 1,
+                              resolution: Optional[float] = None) -> Dict[str, Any]:
+        """Metrics history from the coarsest tier that meets ``resolution`` seconds.
+
+        Without a resolution, aims for at most METRICS_HISTORY_MAX_POINTS points.
+        """
+        lookback = hours * 3600
+        resolution = resolution or lookback / settings.METRICS_HISTORY_MAX_POINTS
+        tier = self.rollups.select(lookback, resolution)
+        
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        return [m for m in self.metrics_history if datetime.fromisoformat(m.timestamp) > cutoff_time]
+        history = tier.rows(since=cutoff_time.timestamp())
+        return {
+            "tier": self.rollups.tier_name(tier),
+            "resolution_seconds": self.rollups.tier_resolution(tier),
+            "count": len(history),
+            "history": history
+        }
     
     def get_average_metrics(self, minutes: int = 5) -> Dict[str, float]:
         """Get average metrics for the last N minutes"""
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        recent_metrics = [m for m in self.metrics_history if datetime.fromisoformat(m.timestamp) > cutoff_time]
+        fields = ["load_1m", "load_5m", "load_15m", "cpu_user", "cpu_system", "cpu_iowait"]
         
-        if not recent_metrics:
-            return {}
+        # Configured windows are maintained incrementally
+        if self.aggregates.has_window(minutes * 60):
+            return self.aggregates.mean(minutes * 60, fields)
         
+        cutoff_time = datetime.now() - timedelta(minutes=minutes)
+        return self.metrics_store.mean(since=cutoff_time.timestamp(), fields=fields)
+    
+    def get_aggregates(self, window_seconds: float) -> Dict[str, Any]:
+        """Windowed mean/std/min/max and EWMAs for every metric field"""
+        if not self.aggregates.has_window(window_seconds):
+            raise ValueError(f"Window must be one of {sorted(self.aggregates.windows)} seconds")
         return {
-            "load_1m": sum(m.load_1m for m in recent_metrics) / len(recent_metrics),
-            "load_5m": sum(m.load_5m for m in recent_metrics) / len(recent_metrics),
-            "load_15m": sum(m.load_15m for m in recent_metrics) / len(recent_metrics),
-            "cpu_user": sum(m.cpu_user for m in recent_metrics) / len(recent_metrics),
-            "cpu_system": sum(m.cpu_system for m in recent_metrics) / len(recent_metrics),
-            "cpu_iowait": sum(m.cpu_iowait for m in recent_metrics) / len(recent_metrics)
+            **self.aggregates.window_stats(window_seconds),
+            "ewma": self.aggregates.ewma_values()
         }
     
     def _simulate_requests_per_ip(self) -> float:
@@ -122,3 +211,42 @@ class MonitoringService:
     def _simulate_source_variety(self) -> float:
         """Simulate source variety"""
         return 5.0 + (datetime.now().minute % 60) * 0.1
+
+
+class MetricsCollector:
+    """Background task sampling system metrics every ``collection_interval``.
+
+    Sampling runs in a worker thread so psutil syscalls never block the
+    event loop; readers use the published ``latest_metrics`` snapshot.
+    """
+    
+    def __init__(self, service: MonitoringService, interval: Optional[float] = None):
+        self.service = service
+        self.interval = interval or service.collection_interval
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def collect(self) -> SystemMetrics:
+        """Take one sample off the event loop"""
+        with METRICS_COLLECTION_DURATION.time():
+            return await asyncio.to_thread(self.service.collect_metrics)
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.collect()
+            except Exception as e:
+                logger.error(f"Metrics collection error: {e}")
+            await asyncio.sleep(self.interval)
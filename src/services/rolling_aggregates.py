@@ -0,0 +1,181 @@
+import math
+import time
+import threading
+import numpy as np
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+class SlidingWindow:
+    """Mean, variance, min and max over the last ``seconds`` of samples.
+
+    Every sample enters and leaves the window once, so updates are O(1)
+    amortised per field. Sums are kept relative to the first value seen for
+    each field (shifted data), which keeps the variance stable for large
+    values such as memory in bytes. Min and max use monotonic deques.
+    """
+
+    def __init__(self, seconds: float, n_fields: int):
+        self.seconds = seconds
+        self.n_fields = n_fields
+        self._samples: deque = deque()
+        self._shift = np.full(n_fields, np.nan)
+        self._count = np.zeros(n_fields, dtype=np.int64)
+        self._sum = np.zeros(n_fields)
+        self._sumsq = np.zeros(n_fields)
+        # Per field, (timestamp, value) pairs with increasing / decreasing values
+        self._min: List[deque] = [deque() for _ in range(n_fields)]
+        self._max: List[deque] = [deque() for _ in range(n_fields)]
+
+    def push(self, timestamp: float, values: np.ndarray):
+        valid = ~np.isnan(values)
+        unset = valid & np.isnan(self._shift)
+        self._shift[unset] = values[unset]
+
+        shifted = np.where(valid, values - self._shift, 0.0)
+        self._samples.append((timestamp, values, valid, shifted))
+        self._count += valid
+        self._sum += shifted
+        self._sumsq += shifted * shifted
+
+        for i in np.flatnonzero(valid):
+            value = values[i]
+            lows, highs = self._min[i], self._max[i]
+            while lows and lows[-1][1] >= value:
+                lows.pop()
+            lows.append((timestamp, value))
+            while highs and highs[-1][1] <= value:
+                highs.pop()
+            highs.append((timestamp, value))
+
+        self.evict(timestamp)
+
+    def evict(self, now: float):
+        """Drop samples at or before ``now - seconds``"""
+        cutoff = now - self.seconds
+        while self._samples and self._samples[0][0] <= cutoff:
+            _, _, valid, shifted = self._samples.popleft()
+            self._count -= valid
+            self._sum -= shifted
+            self._sumsq -= shifted * shifted
+
+        for extremes in (self._min, self._max):
+            for entries in extremes:
+                while entries and entries[0][0] <= cutoff:
+                    entries.popleft()
+
+        if not self._samples:
+            # Reset so rounding errors do not accumulate across idle periods
+            self._sum[:] = 0.0
+            self._sumsq[:] = 0.0
+            self._count[:] = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self._count > 0, self._shift + self._sum / self._count, np.nan)
+
+    def variance(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (self._sumsq - self._sum * self._sum / self._count) / self._count
+        return np.where(self._count > 0, np.maximum(variance, 0.0), np.nan)
+
+    def minimum(self) -> np.ndarray:
+        return np.array([entries[0][1] if entries else np.nan for entries in self._min])
+
+    def maximum(self) -> np.ndarray:
+        return np.array([entries[0][1] if entries else np.nan for entries in self._max])
+
+class EWMA:
+    """Time-aware exponentially weighted moving average with a half-life in seconds"""
+
+    def __init__(self, half_life: float, n_fields: int):
+        self.half_life = half_life
+        self.value = np.full(n_fields, np.nan)
+        self._last: Optional[float] = None
+
+    def push(self, timestamp: float, values: np.ndarray):
+        if self._last is None:
+            alpha = 1.0
+        else:
+            alpha = 1.0 - math.pow(2.0, -max(timestamp - self._last, 0.0) / self.half_life)
+        self._last = timestamp
+
+        valid = ~np.isnan(values)
+        first = valid & np.isnan(self.value)
+        self.value[first] = values[first]
+        update = valid & ~first
+        self.value[update] += alpha * (values[update] - self.value[update])
+
+class RollingAggregator:
+    """Incrementally maintained aggregates for every metric field.
+
+    Keeps one SlidingWindow per configured window and one EWMA per half-life,
+    all updated with each new sample, so reads never scan the history.
+    """
+
+    def __init__(self, fields: Sequence[str], windows: Sequence[float],
+                 half_lives: Sequence[float]):
+        self.fields = list(fields)
+        self.windows = {float(seconds): SlidingWindow(float(seconds), len(self.fields))
+                        for seconds in windows}
+        self.ewmas = {float(half_life): EWMA(float(half_life), len(self.fields))
+                      for half_life in half_lives}
+        self._lock = threading.Lock()
+
+    def update(self, timestamp: float, values: Dict[str, Optional[float]]):
+        """Add one sample given as epoch seconds and a field -> value mapping"""
+        row = np.array([np.nan if values.get(field) is None else values[field]
+                        for field in self.fields], dtype=np.float64)
+        with self._lock:
+            for window in self.windows.values():
+                window.push(timestamp, row)
+            for ewma in self.ewmas.values():
+                ewma.push(timestamp, row)
+
+    def has_window(self, seconds: float) -> bool:
+        return float(seconds) in self.windows
+
+    def mean(self, seconds: float, fields: Optional[List[str]] = None,
+             now: Optional[float] = None) -> Dict[str, float]:
+        """Windowed means, only for fields with samples in the window"""
+        with self._lock:
+            window = self.windows[float(seconds)]
+            window.evict(now or time.time())
+            means = window.mean()
+        return {field: float(means[i]) for i, field in enumerate(self.fields)
+                if (fields is None or field in fields) and not np.isnan(means[i])}
+
+    def window_stats(self, seconds: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """Mean, standard deviation, min and max per field over one window"""
+        with self._lock:
+            window = self.windows[float(seconds)]
+            window.evict(now or time.time())
+            stats = {
+                "mean": window.mean(),
+                "std": np.sqrt(window.variance()),
+                "min": window.minimum(),
+                "max": window.maximum()
+            }
+            count = len(window)
+
+        return {
+            "window_seconds": seconds,
+            "count": count,
+            "fields": {
+                field: {name: _finite(values[i]) for name, values in stats.items()}
+                for i, field in enumerate(self.fields)
+            }
+        }
+
+    def ewma_values(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Current EWMA per half-life and field"""
+        with self._lock:
+            return {
+                f"{half_life:g}s": {field: _finite(ewma.value[i]) for i, field in enumerate(self.fields)}
+                for half_life, ewma in self.ewmas.items()
+            }
+
+def _finite(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
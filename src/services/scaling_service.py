@@ -1,6 +1,4 @@
 import joblib
-import pickle
-import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Any, Optional
@@ -9,128 +7,69 @@ import asyncio
 
 from src.api.models.schemas import SystemMetrics, ScalingDecision
 from src.config.settings import settings
+from src.services.model_registry import ModelRegistry, ModelBundle, get_model_registry
+from src.services.forecast_cache import ForecastCache
+from src.services.forecast_engine import ForecastEngine
+from src.services.state_store import StateStore, get_state_store
 from src.api.websocket import broadcast_scaling_decision, broadcast_scaling_execution
+from src.utils.instrumentation import FORECAST_DURATION
 import logging
 
 logger = logging.getLogger(__name__)
 
+SERVICE_NAME = "web-service"
+RECENT_HISTORY = 10  # entries in scaling_history and the status summary
+
 class ScalingService:
-    def __init__(self):
-        self.primary_model = None
-        self.secondary_model = None
-        self.scaling_history = []
-        self.active_instances = 4
-        
-    def _load_primary_model(self):
-        """Load primary model components"""
-        if self.primary_model is None:
-            try:
-                prophet_model = joblib.load(f"{settings.MODEL_PATH}{settings.PRIMARY_MODEL_FILE}")
-                rf_model = joblib.load(f"{settings.MODEL_PATH}rf_model.pkl")
-                
-                self.primary_model = {
-                    'prophet': prophet_model,
-                    'random_forest': rf_model
-                }
-                logger.info("✅ Primary models loaded successfully")
-            except Exception as e:
-                logger.error(f"❌ Error loading primary models: {e}")
-                raise
+    def __init__(self, registry: Optional[ModelRegistry] = None,
+                 state: Optional[StateStore] = None):
+        self.registry = registry or get_model_registry()
+        self.state = state or get_state_store()
+        self.forecast_cache = ForecastCache()
+        self.forecast_engine = ForecastEngine()
     
-    def _load_secondary_model(self):
-        """Load secondary model"""
-        if self.secondary_model is None:
-            try:
-                with open(f"{settings.MODEL_PATH}{settings.SECONDARY_MODEL_FILE}", 'rb') as f:
-                    model_data = pickle.load(f)
-                
-                # Create simplified API model
-                class APISecondaryModel:
-                    def __init__(self, model_data):
-                        self.metrics_scaler = model_data['metrics_scaler']
-                        self.resid_scaler = model_data['resid_scaler']
-                        self.iso_forest = model_data['iso_forest']
-                        self.available_features = model_data['available_features']
-                        self.sequence_length = model_data.get('sequence_length', 12)
-                        self.window_resid = []
-                    
-                    def predict(self, input_data, source_ip=None):
-                        try:
-                            input_df = pd.DataFrame([input_data])
-                            
-                            for feature in self.available_features:
-                                if feature not in input_df.columns:
-                                    input_df[feature] = 0.0
-                            
-                            input_scaled = self.metrics_scaler.transform(
-                                input_df[self.available_features].fillna(method='ffill').fillna(0.0))
-                            
-                            iso_score_raw = float(self.iso_forest.decision_function(input_scaled)[0])
-                            iso_anom_score = -iso_score_raw
-                            
-                            # Decision logic
-                            action = 'normal'
-                            confidence = 0.85
-                            reason = "No significant anomaly detected"
-                            
-                            if iso_anom_score > 0.5:
-                                action = 'security_alert'
-                                confidence = 0.9
-                                reason = "Isolation Forest detected anomaly"
-                            elif input_data.get('load-1m', 0) > 0.8:
-                                action = 'scale_up'
-                                confidence = 0.88
-                                reason = "High system load detected"
-                            elif input_data.get('load-1m', 0) < 0.2:
-                                action = 'scale_down'
-                                confidence = 0.75
-                                reason = "Low system load detected"
-                            
-                            return {
-                                'action': action,
-                                'confidence': confidence,
-                                'reason': reason,
-                                'source': 'isolation_forest',
-                                'scores': {
-                                    'iso_score_raw': iso_score_raw,
-                                    'iso_anom_score': iso_anom_score
-                                }
-                            }
-                        except Exception as e:
-                            logger.error(f"Prediction error: {e}")
-                            return {
-                                'action': 'normal',
-                                'confidence': 0.5,
-                                'reason': f"Error in prediction: {e}",
-                                'source': 'error_fallback',
-                                'scores': {}
-                            }
-                
-                self.secondary_model = APISecondaryModel(model_data)
-                logger.info("✅ Secondary model loaded successfully")
-            except Exception as e:
-                logger.error(f"❌ Error loading secondary model: {e}")
-                raise
+    @property
+    def active_instances(self) -> int:
+        """Instance count shared by every worker"""
+        return self.state.get_active_instances(SERVICE_NAME)
+    
+    @active_instances.setter
+    def active_instances(self, value: int):
+        self.state.set_active_instances(SERVICE_NAME, value)
+    
+    @property
+    def scaling_history(self) -> List[Dict[str, Any]]:
+        """The most recent scaling actions, oldest first (see get_history for paging)"""
+        return self.state.list_history(limit=RECENT_HISTORY)
     
-    def get_forecast(self, metrics: SystemMetrics, hours: int = 2) -> List[Dict[str, Any]]:
+    async def get_active_instances(self) -> int:
+        """Shared instance count, read off the event loop (the store may wait on a lock)"""
+        return await asyncio.to_thread(self.state.get_active_instances, SERVICE_NAME)
+    
+    @property
+    def primary_model(self):
+        return self.registry.primary_model
+    
+    @property
+    def secondary_model(self):
+        return self.registry.secondary_model
+    
+    async def get_forecast(self, metrics: SystemMetrics, hours: int = 2,
+                           bundle: Optional[ModelBundle] = None) -> List[Dict[str, Any]]:
         """Get load forecast using primary model"""
         try:
-            self._load_primary_model()
+            bundle = bundle or self.registry.bundle
+            if bundle.primary_model is None:
+                raise ValueError("Primary model not loaded")
             
-            # Convert metrics to features
-            features = self._extract_features(metrics)
-            
-            # Mock forecast (since models might not be available)
-            forecast = []
-            for i in range(hours):
-                forecast.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "predicted_load": 0.65 + (i * 0.1),
-                    "confidence": 0.85,
-                    "model_used": "prophet_rf_ensemble"
-                })
+            # The forecast only depends on the time bucket and model version,
+            # so it is computed once per bucket (off the event loop) and shared
+            forecast = await self.forecast_cache.get_or_compute_async(
+                SERVICE_NAME, hours, bundle.version,
+                lambda start: self._compute_forecast(bundle, hours, start)
+            )
             
-            return forecast
+            return [dict(point) for point in forecast]
         except Exception as e:
             logger.error(f"Forecast error: {e}")
             # Return mock forecast on error
@@ -143,96 +82,180 @@ class ScalingService:
                 }
             ]
     
+    def _compute_forecast(self, bundle: ModelBundle, hours: int,
+                          start: datetime) -> List[Dict[str, Any]]:
+        """Compute the forecast table for a time bucket"""
+        with FORECAST_DURATION.time():
+            return self.forecast_engine.forecast(bundle.primary_model, start, hours)
+    
+    def prefetch_forecasts(self, prefetch_seconds: float, now: Optional[datetime] = None) -> int:
+        """Fill the forecast cache for recently requested horizons.
+
+        Computes the current bucket when missing (e.g. after a model reload)
+        and the next bucket once it starts within ``prefetch_seconds``.
+        """
+        bundle = self.registry.bundle
+        if bundle.primary_model is None:
+            return 0
+        
+        cache = self.forecast_cache
+        now = now or datetime.now()
+        bucket = cache.bucket(now)
+        buckets = [bucket]
+        if (bucket + 1) * cache.bucket_seconds - now.timestamp() <= prefetch_seconds:
+            buckets.append(bucket + 1)
+        
+        computed = 0
+        for service, horizon in cache.hot_keys():
+            for target in buckets:
+                key = (service, horizon, target, bundle.version)
+                if key not in cache:
+                    try:
+                        # Shares the computation with any request missing the same key
+                        cache.compute_once(key, lambda: self._compute_forecast(
+                            bundle, horizon, cache.bucket_start(target)))
+                    except Exception as e:
+                        logger.warning(f"Forecast prefetch skipped: {e}")
+                        return computed
+                    computed += 1
+        
+        if computed:
+            logger.debug(f"Prefetched {computed} forecast(s) for model version {bundle.version}")
+        return computed
+    
     def detect_anomaly(self, metrics: SystemMetrics) -> float:
         """Detect anomalies using secondary model"""
+        return self.detect_anomaly_batch([metrics])[0]
+    
+    def detect_anomaly_batch(self, metrics_list: List[SystemMetrics],
+                             bundle: Optional[ModelBundle] = None) -> List[float]:
+        """Score many metric rows with a single Isolation Forest pass"""
         try:
-            self._load_secondary_model()
-            
-            # Convert metrics to features
-            features = self._extract_features(metrics)
+            bundle = bundle or self.registry.bundle
+            if bundle.secondary_model is None:
+                raise ValueError("Secondary model not loaded")
             
-            # Mock anomaly detection
-            anomaly_score = 0.1  # Low anomaly score
+            model = bundle.secondary_model
+            matrix = model.build_matrix_from_metrics(metrics_list)
             
-            return anomaly_score
+            # Higher is more anomalous
+            return (-model.score_batch(matrix)).tolist()
         except Exception as e:
             logger.error(f"Anomaly detection error: {e}")
-            return 0.0  # No anomaly on error
+            return [0.0] * len(metrics_list)  # No anomaly on error
     
     async def get_scaling_decision(self, metrics: SystemMetrics) -> ScalingDecision:
         """Get scaling decision based on ML predictions and current state"""
+        decisions = await self.get_scaling_decisions([metrics])
+        return decisions[0]
+    
+    async def get_scaling_decisions(self, metrics_list: List[SystemMetrics]) -> List[ScalingDecision]:
+        """Get scaling decisions for a batch of metrics with one model pass"""
         try:
-            # Get forecast
-            forecast = self.get_forecast(metrics, hours=1)
+            # Pin one model version for the whole batch, even across a hot reload.
+            # Models are loaded at startup and by the reload watcher, never here.
+            bundle = self.registry.bundle
             
-            # Get anomaly score
-            anomaly_score = self.detect_anomaly(metrics)
+            # Get forecast (time-driven, shared by the whole batch)
+            forecast = await self.get_forecast(metrics_list[0], hours=1, bundle=bundle)
             
-            # Calculate recommended instances
-            recommended_instances = self._calculate_instances(
-                metrics, forecast, anomaly_score
-            )
+            # Get anomaly scores for every row at once
+            anomaly_scores = self.detect_anomaly_batch(metrics_list, bundle=bundle)
             
-            # Determine scaling action
-            scaling_action = self._determine_action(recommended_instances)
+            # One read of the shared baseline for the whole batch
+            current_instances = await self.get_active_instances()
             
-            # Create decision
-            decision = ScalingDecision(
-                action=scaling_action,
-                confidence=self._calculate_confidence(forecast, anomaly_score),
-                reason=self._generate_reasoning(metrics, forecast, anomaly_score),
-                source="ml_ensemble",
-                scores={
-                    "forecast_confidence": forecast[0].get("confidence", 0.8) if forecast else 0.8,
-                    "anomaly_score": anomaly_score
-                },
-                target_instances=recommended_instances,
-                service_name="web-service",
-                timestamp=datetime.now().isoformat()
-            )
+            decisions = []
+            for metrics, anomaly_score in zip(metrics_list, anomaly_scores):
+                # Calculate recommended instances
+                recommended_instances = self._calculate_instances(
+                    metrics, forecast, anomaly_score
+                )
+                
+                # Determine scaling action
+                scaling_action = self._determine_action(recommended_instances, current_instances)
+                
+                # Create decision
+                decisions.append(ScalingDecision(
+                    action=scaling_action,
+                    confidence=self._calculate_confidence(forecast, anomaly_score),
+                    reason=self._generate_reasoning(metrics, forecast, anomaly_score),
+                    source="ml_ensemble",
+                    scores={
+                        "forecast_confidence": forecast[0].get("confidence", 0.8) if forecast else 0.8,
+                        "anomaly_score": anomaly_score,
+                        "model_version": bundle.version,
+                        "baseline_instances": current_instances
+                    },
+                    target_instances=recommended_instances,
+                    service_name=SERVICE_NAME,
+                    timestamp=datetime.now().isoformat()
+                ))
             
-            # Broadcast scaling decision event
-            try:
-                await broadcast_scaling_decision({
-                    "action": decision.action,
-                    "target_instances": decision.target_instances,
-                    "reason": decision.reason,
-                    "confidence": decision.confidence,
-                    "timestamp": decision.timestamp,
-                    "source": decision.source
-                })
-            except Exception as e:
-                logger.warning(f"Failed to broadcast scaling decision: {e}")
+            # Broadcast scaling decision events
+            for decision in decisions:
+                try:
+                    await broadcast_scaling_decision({
+                        "service_name": decision.service_name,
+                        "action": decision.action,
+                        "target_instances": decision.target_instances,
+                        "reason": decision.reason,
+                        "confidence": decision.confidence,
+                        "timestamp": decision.timestamp,
+                        "source": decision.source,
+                        "model_version": bundle.version
+                    })
+                except Exception as e:
+                    logger.warning(f"Failed to broadcast scaling decision: {e}")
             
-            return decision
+            return decisions
         except Exception as e:
             logger.error(f"Scaling decision error: {e}")
-            # Return fallback decision
-            return ScalingDecision(
-                action="maintain",
-                confidence=0.5,
-                reason="Error in decision making, maintaining current state",
-                source="fallback",
-                scores={},
-                target_instances=self.active_instances,
-                service_name="web-service",
-                timestamp=datetime.now().isoformat()
-            )
+            # Return fallback decisions
+            current_instances = await self.get_active_instances()
+            return [
+                ScalingDecision(
+                    action="maintain",
+                    confidence=0.5,
+                    reason="Error in decision making, maintaining current state",
+                    source="fallback",
+                    scores={},
+                    target_instances=current_instances,
+                    service_name=SERVICE_NAME,
+                    timestamp=datetime.now().isoformat()
+                )
+                for _ in metrics_list
+            ]
     
     async def execute_scaling(self, decision: ScalingDecision) -> bool:
         """Execute scaling decision"""
         try:
-            # Update active instances
-            self.active_instances = decision.target_instances or self.active_instances
-            
-            # Record in history
-            self.scaling_history.append({
-                "timestamp": decision.timestamp,
-                "action": decision.action,
-                "reason": decision.reason,
-                "target_instances": decision.target_instances,
-                "confidence": decision.confidence
-            })
+            # Decisions carry the instance count they were made against; if another
+            # worker has scaled since, the decision is stale and is not applied
+            baseline = decision.scores.get("baseline_instances") if decision.scores else None
+            while True:
+                expected = int(baseline) if baseline is not None else await self.get_active_instances()
+                target_instances = decision.target_instances or expected
+                
+                # Update active instances and record in history atomically; in a
+                # thread, since the store may wait up to STATE_DB_TIMEOUT for the lock
+                applied = await asyncio.to_thread(
+                    self.state.compare_and_set_instances, SERVICE_NAME, expected, target_instances, {
+                        "timestamp": decision.timestamp,
+                        "service_name": decision.service_name or SERVICE_NAME,
+                        "action": decision.action,
+                        "reason": decision.reason,
+                        "target_instances": target_instances,
+                        "previous_instances": expected,
+                        "confidence": decision.confidence
+                    })
+                # Decisions without a baseline (manual ones) retry against the fresh count
+                if applied or baseline is not None:
+                    break
+            if not applied:
+                logger.warning(f"Skipped stale scaling decision: {decision.action} was based on "
+                               f"{expected} instances, now {await self.get_active_instances()}")
+                return False
             
             logger.info(f"Scaling executed: {decision.action} "
                        f"(instances: {decision.target_instances})")
@@ -240,6 +263,7 @@ class ScalingService:
             # Broadcast scaling execution event
             try:
                 await broadcast_scaling_execution({
+                    "service_name": decision.service_name,
                     "action": decision.action,
                     "target_instances": decision.target_instances,
                     "reason": decision.reason,
@@ -254,6 +278,21 @@ class ScalingService:
             logger.error(f"Scaling execution error: {e}")
             return False
     
+    def get_history(self, limit: int = 10, cursor: Optional[int] = None,
+                    action: Optional[str] = None, service: Optional[str] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+        """One page of scaling history, newest first"""
+        history, next_cursor = self.state.query_history(
+            limit, cursor=cursor, action=action, service=service,
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None
+        )
+        return {
+            "count": len(history),
+            "history": history,
+            "next_cursor": next_cursor
+        }
+    
     def get_status(self) -> Dict[str, Any]:
         """Get current scaling status"""
         return {
@@ -312,11 +351,14 @@ class ScalingService:
         
         return instances
     
-    def _determine_action(self, recommended_instances: int) -> str:
+    def _determine_action(self, recommended_instances: int,
+                          current_instances: Optional[int] = None) -> str:
         """Determine scaling action"""
-        if recommended_instances > self.active_instances:
+        if current_instances is None:
+            current_instances = self.active_instances
+        if recommended_instances > current_instances:
             return "scale_up"
-        elif recommended_instances < self.active_instances:
+        elif recommended_instances < current_instances:
             return "scale_down"
         else:
             return "maintain"
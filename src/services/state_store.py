@@ -0,0 +1,332 @@
+import os
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FIELDS = ("timestamp", "service_name", "action", "reason",
+                  "target_instances", "previous_instances", "confidence")
+
+# Compact the history after this many appends rather than on every write
+COMPACT_EVERY = 100
+
+def history_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """History row with every column, timestamped now if the entry is not"""
+    record = {field: entry.get(field) for field in HISTORY_FIELDS}
+    record["timestamp"] = record["timestamp"] or datetime.now().isoformat()
+    return record
+
+class StateStore(ABC):
+    """Scaling state shared by every API worker.
+
+    Holds the active instance count per service, updated only through
+    compare-and-set so concurrent workers cannot overwrite each other, and
+    an append-only history of executed scaling actions.
+    """
+
+    def __init__(self, initial_instances: Optional[int] = None,
+                 history_max_entries: Optional[int] = None,
+                 history_retention_days: Optional[float] = None):
+        self.initial_instances = settings.INITIAL_INSTANCES if initial_instances is None else initial_instances
+        self.history_max_entries = history_max_entries or settings.STATE_HISTORY_MAX_ENTRIES
+        self.history_retention_days = (settings.STATE_HISTORY_RETENTION_DAYS
+                                       if history_retention_days is None else history_retention_days)
+
+    @abstractmethod
+    def get_active_instances(self, service: str) -> int:
+        """Current instance count of ``service``"""
+
+    @abstractmethod
+    def compare_and_set_instances(self, service: str, expected: int, new: int,
+                                  history_entry: Optional[Dict[str, Any]] = None) -> bool:
+        """Set the instance count only if it is still ``expected``.
+
+        When a history entry is given it is appended in the same atomic step.
+        """
+
+    def set_active_instances(self, service: str, new: int):
+        """Unconditionally set the instance count (e.g. after a manual change)"""
+        while not self.compare_and_set_instances(service, self.get_active_instances(service), new):
+            pass
+
+    @abstractmethod
+    def append_history(self, entry: Dict[str, Any]) -> int:
+        """Append a history entry, returning its id"""
+
+    @abstractmethod
+    def list_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """History entries, oldest first (the newest ``limit`` if given)"""
+
+    @abstractmethod
+    def query_history(self, limit: int, cursor: Optional[int] = None,
+                      action: Optional[str] = None, service: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None
+                      ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """One page of history entries, newest first.
+
+        ``cursor`` is the id returned as the next cursor of the previous page;
+        only entries with a smaller id are returned. ``since`` and ``until``
+        are ISO timestamps (inclusive). Returns the page and the cursor of the
+        next one, or None when there are no more entries.
+        """
+
+    @abstractmethod
+    def compact_history(self, now: Optional[datetime] = None) -> int:
+        """Drop entries beyond the retention period or entry limit, returning how many"""
+
+    def _retention_cutoff(self, now: Optional[datetime] = None) -> Optional[str]:
+        if not self.history_retention_days:
+            return None
+        return ((now or datetime.now()) - timedelta(days=self.history_retention_days)).isoformat()
+
+class InMemoryStateStore(StateStore):
+    """Process-local state store, for tests and single-worker deployments"""
+
+    def __init__(self, initial_instances: Optional[int] = None, **kwargs):
+        super().__init__(initial_instances, **kwargs)
+        self._instances: Dict[str, int] = {}
+        # Bounded: the oldest entries fall off once the limit is reached
+        self._history: deque = deque(maxlen=self.history_max_entries)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def get_active_instances(self, service: str) -> int:
+        with self._lock:
+            return self._instances.get(service, self.initial_instances)
+
+    def compare_and_set_instances(self, service: str, expected: int, new: int,
+                                  history_entry: Optional[Dict[str, Any]] = None) -> bool:
+        with self._lock:
+            if self._instances.get(service, self.initial_instances) != expected:
+                return False
+            self._instances[service] = new
+            if history_entry is not None:
+                self._append(history_entry)
+            return True
+
+    def append_history(self, entry: Dict[str, Any]) -> int:
+        with self._lock:
+            return self._append(entry)
+
+    def _append(self, entry: Dict[str, Any]) -> int:
+        record = history_record(entry)
+        record["id"] = self._next_id
+        self._next_id += 1
+        self._history.append(record)
+        if record["id"] % COMPACT_EVERY == 0:
+            self._compact()
+        return record["id"]
+
+    def list_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            history = list(self._history)[-limit:] if limit else self._history
+            return [dict(entry) for entry in history]
+
+    def query_history(self, limit: int, cursor: Optional[int] = None,
+                      action: Optional[str] = None, service: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None
+                      ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        page = []
+        with self._lock:
+            for entry in reversed(self._history):
+                # Timestamps come from the caller and need not follow id
+                # order, so every entry is checked (as the SQLite backend does)
+                if ((cursor is not None and entry["id"] >= cursor)
+                        or (action is not None and entry["action"] != action)
+                        or (service is not None and entry["service_name"] != service)
+                        or (since is not None and entry["timestamp"] < since)
+                        or (until is not None and entry["timestamp"] > until)):
+                    continue
+                page.append(dict(entry))
+                if len(page) > limit:
+                    break
+
+        next_cursor = page[limit - 1]["id"] if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    def compact_history(self, now: Optional[datetime] = None) -> int:
+        with self._lock:
+            return self._compact(now)
+
+    def _compact(self, now: Optional[datetime] = None) -> int:
+        cutoff = self._retention_cutoff(now)
+        if cutoff is None:
+            return 0
+        kept = [entry for entry in self._history if entry["timestamp"] >= cutoff]
+        removed = len(self._history) - len(kept)
+        if removed:
+            self._history = deque(kept, maxlen=self.history_max_entries)
+        return removed
+
+class SQLiteStateStore(StateStore):
+    """State store in a SQLite database shared by all workers on a host.
+
+    WAL mode lets readers proceed while a worker writes. Instance counts
+    change through a conditional UPDATE, and history rows are appended to an
+    indexed table in the same transaction.
+    """
+
+    def __init__(self, path: Optional[str] = None, initial_instances: Optional[int] = None, **kwargs):
+        super().__init__(initial_instances, **kwargs)
+        self.path = path or settings.STATE_DB_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread and process (connections must not cross a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=settings.STATE_DB_TIMEOUT,
+                                   isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scaling_state (
+                service_name TEXT PRIMARY KEY,
+                active_instances INTEGER NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS scaling_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                service_name TEXT,
+                action TEXT,
+                reason TEXT,
+                target_instances INTEGER,
+                previous_instances INTEGER,
+                confidence REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_timestamp ON scaling_history (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_history_service ON scaling_history (service_name, id);
+            CREATE INDEX IF NOT EXISTS idx_history_action ON scaling_history (action, id);
+        """)
+
+    def get_active_instances(self, service: str) -> int:
+        row = self._connection().execute(
+            "SELECT active_instances FROM scaling_state WHERE service_name = ?", (service,)
+        ).fetchone()
+        return row["active_instances"] if row else self.initial_instances
+
+    def compare_and_set_instances(self, service: str, expected: int, new: int,
+                                  history_entry: Optional[Dict[str, Any]] = None) -> bool:
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so the check and the
+        # update cannot interleave with another worker's
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO scaling_state (service_name, active_instances, updated_at) "
+                "VALUES (?, ?, ?)", (service, self.initial_instances, time.time())
+            )
+            updated = conn.execute(
+                "UPDATE scaling_state SET active_instances = ?, version = version + 1, updated_at = ? "
+                "WHERE service_name = ? AND active_instances = ?",
+                (new, time.time(), service, expected)
+            ).rowcount == 1
+            if updated and history_entry is not None:
+                self._insert_history(conn, history_entry)
+            conn.execute("COMMIT")
+            return updated
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append_history(self, entry: Dict[str, Any]) -> int:
+        return self._insert_history(self._connection(), entry)
+
+    def _insert_history(self, conn: sqlite3.Connection, entry: Dict[str, Any]) -> int:
+        cursor = conn.execute(
+            f"INSERT INTO scaling_history ({', '.join(HISTORY_FIELDS)}) "
+            f"VALUES ({', '.join('?' for _ in HISTORY_FIELDS)})",
+            tuple(history_record(entry).values())
+        )
+        if cursor.lastrowid % COMPACT_EVERY == 0:
+            self._compact(conn)
+        return cursor.lastrowid
+
+    def list_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        conn = self._connection()
+        if limit:
+            rows = conn.execute(
+                "SELECT * FROM (SELECT * FROM scaling_history ORDER BY id DESC LIMIT ?) ORDER BY id",
+                (limit,)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM scaling_history ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def query_history(self, limit: int, cursor: Optional[int] = None,
+                      action: Optional[str] = None, service: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None
+                      ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        # Keyset pagination on id: each page is an index range scan, however
+        # deep into the history the cursor points
+        clauses, params = [], []
+        for clause, value in (("id < ?", cursor), ("action = ?", action),
+                              ("service_name = ?", service), ("timestamp >= ?", since),
+                              ("timestamp <= ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+
+        rows = self._connection().execute(
+            f"SELECT * FROM scaling_history {where}ORDER BY id DESC LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+        page = [dict(row) for row in rows[:limit]]
+        next_cursor = page[-1]["id"] if len(rows) > limit else None
+        return page, next_cursor
+
+    def compact_history(self, now: Optional[datetime] = None) -> int:
+        return self._compact(self._connection(), now)
+
+    def _compact(self, conn: sqlite3.Connection, now: Optional[datetime] = None) -> int:
+        removed = conn.execute(
+            "DELETE FROM scaling_history WHERE id <= "
+            "(SELECT id FROM scaling_history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.history_max_entries,)
+        ).rowcount
+        cutoff = self._retention_cutoff(now)
+        if cutoff is not None:
+            removed += conn.execute(
+                "DELETE FROM scaling_history WHERE timestamp < ?", (cutoff,)
+            ).rowcount
+        if removed:
+            logger.info(f"🧹 Compacted {removed} scaling history entries")
+        return removed
+
+_state_store: Optional[StateStore] = None
+_state_store_lock = threading.Lock()
+
+def get_state_store() -> StateStore:
+    """Get the process-wide state store configured by STATE_BACKEND"""
+    global _state_store
+    if _state_store is None:
+        with _state_store_lock:
+            if _state_store is None:
+                if settings.STATE_BACKEND == "memory":
+                    _state_store = InMemoryStateStore()
+                else:
+                    _state_store = SQLiteStateStore()
+                logger.info(f"Using {settings.STATE_BACKEND} scaling state store")
+    return _state_store
@@ -0,0 +1,164 @@
+import numpy as np
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Average path length of an unsuccessful BST search over n samples.
+
+    Same normalisation constant c(n) that scikit-learn's IsolationForest uses.
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+
+    result[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    result[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+class CompiledIsolationForest:
+    """Array-based evaluator for a fitted scikit-learn IsolationForest.
+
+    All trees are flattened into contiguous arrays (split feature, threshold,
+    children and per-leaf path length) and a batch is walked through every
+    tree at once with NumPy gathers, avoiding sklearn's per-call validation
+    and per-tree Python loop. Scores match ``decision_function``.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray, path_length: np.ndarray,
+                 roots: np.ndarray, max_depth: int, n_features: int,
+                 normalizer: float, offset: float):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.path_length = path_length
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.normalizer = normalizer
+        self.offset = offset
+
+    @classmethod
+    def from_sklearn(cls, iso_forest) -> "CompiledIsolationForest":
+        """Flatten a fitted IsolationForest into contiguous arrays"""
+        features, thresholds, lefts, rights, path_lengths, roots = [], [], [], [], [], []
+        max_depth = 0
+        base = 0
+
+        for estimator, estimator_features in zip(iso_forest.estimators_,
+                                                 iso_forest.estimators_features_):
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            is_leaf = left == -1
+
+            # Node ids are assigned depth-first, so parents precede children
+            depth = np.zeros(n_nodes, dtype=np.int64)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[left[node]] = depth[node] + 1
+                    depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            # Map tree-local feature ids back to input columns
+            feature = np.asarray(estimator_features, dtype=np.int64)[np.maximum(tree.feature, 0)]
+            feature[is_leaf] = 0
+
+            # Leaves point at themselves so extra walk steps are no-ops
+            node_ids = np.arange(n_nodes, dtype=np.int64)
+            left = np.where(is_leaf, node_ids, left) + base
+            right = np.where(is_leaf, node_ids, right) + base
+
+            path_length = np.where(
+                is_leaf, depth + average_path_length(tree.n_node_samples), 0.0)
+
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(left)
+            rights.append(right)
+            path_lengths.append(path_length)
+            roots.append(base)
+            base += n_nodes
+
+        max_samples = getattr(iso_forest, "_max_samples", None) or iso_forest.max_samples_
+        normalizer = len(iso_forest.estimators_) * float(average_path_length([max_samples])[0])
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            left=np.ascontiguousarray(np.concatenate(lefts)),
+            right=np.ascontiguousarray(np.concatenate(rights)),
+            path_length=np.ascontiguousarray(np.concatenate(path_lengths)),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=max_depth,
+            n_features=iso_forest.n_features_in_,
+            normalizer=normalizer,
+            offset=float(iso_forest.offset_)
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf index reached in every tree, shape (n_samples, n_trees)"""
+        # sklearn evaluates splits on float32 inputs
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        """Opposite of the anomaly score, as IsolationForest.score_samples"""
+        depths = self.path_length[self.apply(X)].sum(axis=1)
+        if self.normalizer == 0:
+            return -np.ones(depths.shape[0])
+        return -np.power(2.0, -depths / self.normalizer)
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Same as IsolationForest.decision_function (negative is anomalous)"""
+        return self.score_samples(X) - self.offset
+
+def compile_scaler(scaler) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """Return a plain NumPy transform for common fitted scalers, or None"""
+    name = type(scaler).__name__
+
+    if name == "StandardScaler":
+        mean = scaler.mean_ if getattr(scaler, "with_mean", True) and scaler.mean_ is not None else None
+        scale = scaler.scale_ if getattr(scaler, "with_std", True) and scaler.scale_ is not None else None
+
+        def transform(X: np.ndarray) -> np.ndarray:
+            if mean is not None:
+                X = X - mean
+            if scale is not None:
+                X = X / scale
+            return X
+        return transform
+
+    if name == "MinMaxScaler" and not getattr(scaler, "clip", False):
+        scale, minimum = scaler.scale_, scaler.min_
+        return lambda X: X * scale + minimum
+
+    return None
+
+def compile_isolation_forest(iso_forest, n_check: int = 64, seed: int = 0) -> Optional[CompiledIsolationForest]:
+    """Compile an IsolationForest and verify it against sklearn on random rows.
+
+    Returns None when the model cannot be compiled or the scores disagree, in
+    which case callers should keep using the sklearn estimator.
+    """
+    try:
+        compiled = CompiledIsolationForest.from_sklearn(iso_forest)
+        X = np.random.default_rng(seed).normal(size=(n_check, compiled.n_features)) * 3
+        if not np.allclose(compiled.decision_function(X), iso_forest.decision_function(X)):
+            logger.warning("Compiled Isolation Forest disagrees with sklearn, not using it")
+            return None
+        return compiled
+    except Exception as e:
+        logger.warning(f"Could not compile Isolation Forest: {e}")
+        return None
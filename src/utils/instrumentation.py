@@ -0,0 +1,254 @@
+"""
+Instrumentation registry exposed in the Prometheus text format.
+
+Counters, gauges and fixed-bucket histograms without a client library
+dependency. Metrics live in the process that records them: with several
+workers each one serves its own values at /metrics.
+"""
+
+import math
+import time
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric(ABC):
+    """A metric family; labelled children are created on first use"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """Value holder for one label combination"""
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(suffix, label text, value) for every child"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}"
+                     for suffix, labels, value in self.samples())
+        return lines
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield "", _label_text(self.labelnames, key), child.value
+
+class Gauge(Metric):
+    """Value that goes up and down, or is read from a callback at scrape time"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the (unlabelled) value from ``function`` on every scrape"""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            yield "", "", self._function()
+            return
+        for key, child in list(self._children.items()):
+            yield "", _label_text(self.labelnames, key), child.value
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+class Histogram(Metric):
+    """Distribution over fixed upper bounds, rendered as cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        """Context manager observing the duration of its block in seconds"""
+        return self._unlabelled().time()
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                labels = _label_text(self.labelnames + ("le",), key + (le,))
+                yield "_bucket", labels, cumulative
+            labels = _label_text(self.labelnames, key)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+class MetricsRegistry:
+    """Named metrics rendered together for a scrape"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.type}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry and the service's hot-path metrics
+registry = MetricsRegistry(prefix="autoscaler_")
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status",
+    ["method", "route", "status"])
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template",
+    ["method", "route"])
+MODEL_LOAD_DURATION = registry.histogram(
+    "model_load_duration_seconds", "Time to load a model artifact from disk",
+    ["model"], buckets=LOAD_BUCKETS)
+ANOMALY_SCORE_DURATION = registry.histogram(
+    "anomaly_score_duration_seconds", "Latency of one Isolation Forest scoring pass over a batch of rows")
+FORECAST_DURATION = registry.histogram(
+    "forecast_duration_seconds", "Latency of computing one forecast table")
+WS_FANOUT_DURATION = registry.histogram(
+    "ws_broadcast_fanout_duration_seconds", "Time to queue one broadcast for every recipient on this worker",
+    ["stream"])
+METRICS_COLLECTION_DURATION = registry.histogram(
+    "metrics_collection_duration_seconds", "Time to sample system metrics once")
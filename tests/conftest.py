@@ -1,5 +1,13 @@
+import os
 import pytest
 import asyncio
+
+# Keep test runs from writing state, metrics and logs under data/ and logs/
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("METRICS_PERSISTENCE_ENABLED", "false")
+os.environ.setdefault("EVENT_BUS_BACKEND", "memory")
+os.environ.setdefault("LOG_FILE", "")
+
 from fastapi.testclient import TestClient
 from src.api.main import app
 
@@ -19,6 +19,16 @@ def test_health_endpoint():
     assert "status" in data
     assert "timestamp" in data
     assert "models_loaded" in data
+    assert "model_version" in data
+    assert "model_fingerprint" in data
+
+def test_health_response_schema():
+    """Test the health response model documents the registry fields"""
+    schema = app.openapi()
+    response = schema["paths"]["/health/"]["get"]["responses"]["200"]
+    ref = response["content"]["application/json"]["schema"]["$ref"].split("/")[-1]
+    properties = schema["components"]["schemas"][ref]["properties"]
+    assert {"status", "models_loaded", "model_version", "model_fingerprint"} <= set(properties)
 
 def test_primary_forecast():
     response = client.get("/predict/primary?hours=2")
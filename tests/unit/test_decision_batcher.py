@@ -0,0 +1,53 @@
+import pytest
+import asyncio
+from src.services.decision_batcher import DecisionBatcher
+
+class FakeScalingService:
+    """Returns the input back as the decision and records batch sizes"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    async def get_scaling_decision(self, metrics):
+        return (await self.get_scaling_decisions([metrics]))[0]
+
+    async def get_scaling_decisions(self, metrics_list):
+        self.batch_sizes.append(len(metrics_list))
+        return [f"decision-{metrics}" for metrics in metrics_list]
+
+class TestDecisionBatcher:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_a_batch(self):
+        """Test concurrent submits are decided in one pass with per-caller results"""
+        service = FakeScalingService()
+        batcher = DecisionBatcher(service, max_batch_size=16, max_wait_ms=20)
+        await batcher.start()
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        await batcher.stop()
+
+        assert results == [f"decision-{i}" for i in range(10)]
+        assert service.batch_sizes == [10]
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_splits_batches(self):
+        """Test batches never exceed max_batch_size"""
+        service = FakeScalingService()
+        batcher = DecisionBatcher(service, max_batch_size=4, max_wait_ms=20)
+        await batcher.start()
+
+        await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        await batcher.stop()
+
+        assert max(service.batch_sizes) <= 4
+        assert sum(service.batch_sizes) == 10
+
+    @pytest.mark.asyncio
+    async def test_submit_without_worker_decides_inline(self):
+        """Test submit falls back to a direct decision when not started"""
+        service = FakeScalingService()
+        batcher = DecisionBatcher(service)
+
+        assert await batcher.submit(1) == "decision-1"
+        assert service.batch_sizes == [1]
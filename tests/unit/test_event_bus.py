@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from src.api.websocket import ConnectionManager
+from src.services import event_bus
+from src.services.event_bus import (MemoryBroker, MemoryEventBus, RedisEventBus,
+                                    UnixSocketEventBus, _write_frame)
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+class TestMemoryEventBus:
+
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_other_workers(self):
+        """Test a broadcast on one manager is delivered by the others, never echoed"""
+        broker = MemoryBroker()
+        workers = [ConnectionManager() for _ in range(3)]
+        received = {id(worker): [] for worker in workers}
+        for worker in workers:
+            worker.deliver = received[id(worker)].append
+            await worker.attach_bus(MemoryEventBus(broker))
+
+        await workers[0].broadcast({"type": "alert", "data": {}})
+
+        assert received[id(workers[0])] == [{"type": "alert", "data": {}}]
+        assert received[id(workers[1])] == received[id(workers[2])] == [{"type": "alert", "data": {}}]
+        for worker in workers:
+            await worker.detach_bus()
+
+class TestUnixSocketEventBus:
+
+    @pytest.mark.asyncio
+    async def test_relay_and_hub_failover(self, tmp_path):
+        """Test frames reach every other worker and a new hub is elected when it stops"""
+        path = str(tmp_path / "events.sock")
+        received = [[], [], []]
+        buses = [UnixSocketEventBus(path=path, reconnect_delay=0.05) for _ in range(3)]
+        for bus, inbox in zip(buses, received):
+            await bus.start(inbox.append)
+            await bus.wait_connected()
+        assert sum(bus.is_hub for bus in buses) == 1
+
+        buses[1].publish({"n": 1})
+        await wait_for(lambda: received[0] and received[2])
+        assert received == [[{"n": 1}], [], [{"n": 1}]]
+
+        hub = next(bus for bus in buses if bus.is_hub)
+        await hub.stop()
+        survivors = [bus for bus in buses if bus is not hub]
+        await wait_for(lambda: sum(bus.is_hub for bus in survivors) == 1 and
+                       all(bus._connected.is_set() for bus in survivors))
+
+        survivors[0].publish({"n": 2})
+        inbox = received[buses.index(survivors[1])]
+        await wait_for(lambda: {"n": 2} in inbox)
+        for bus in survivors:
+            await bus.stop()
+
+    @pytest.mark.asyncio
+    async def test_bad_frames_and_handler_errors_keep_receiving(self, tmp_path):
+        """Test a frame without a message or a failing handler does not stop the bus"""
+        path = str(tmp_path / "events.sock")
+        received = []
+
+        def handler(message):
+            if message.get("fail"):
+                raise RuntimeError("delivery failed")
+            received.append(message)
+
+        sender, receiver = UnixSocketEventBus(path=path), UnixSocketEventBus(path=path)
+        await sender.start(lambda message: None)
+        await sender.wait_connected()
+        await receiver.start(handler)
+        await receiver.wait_connected()
+
+        _write_frame(sender._writer, b'{"origin":"elsewhere"}', sender.max_buffer)
+        sender.publish({"fail": True})
+        sender.publish({"n": 1})
+        await wait_for(lambda: received)
+
+        assert received == [{"n": 1}]
+        assert receiver._task is not None and not receiver._task.done()
+        for bus in (receiver, sender):
+            await bus.stop()
+
+class FakePubSub:
+    """Pub/sub whose first subscription drops with a connection error"""
+
+    def __init__(self, attempts):
+        self.attempts = attempts
+
+    async def subscribe(self, channel):
+        self.attempts.append(channel)
+
+    async def listen(self):
+        if len(self.attempts) == 1:
+            raise ConnectionError("connection reset")
+        yield {"type": "message", "data": b'{"origin":"elsewhere","message":{"n":1}}'}
+        await asyncio.Event().wait()
+
+    async def reset(self):
+        pass
+
+class FakeRedis:
+    def __init__(self):
+        self.attempts = []
+
+    def pubsub(self):
+        return FakePubSub(self.attempts)
+
+    async def close(self):
+        pass
+
+class TestRedisEventBus:
+
+    @pytest.mark.asyncio
+    async def test_resubscribes_after_connection_drops(self, monkeypatch):
+        """Test the listener retries with backoff instead of dying with the connection"""
+        fake = FakeRedis()
+        monkeypatch.setattr(event_bus, "aioredis", type("aioredis", (), {"from_url": staticmethod(lambda url: fake)}))
+        received = []
+        bus = RedisEventBus(reconnect_delay=0.01)
+        await bus.start(received.append)
+
+        await wait_for(lambda: received)
+        await bus.stop()
+
+        assert received == [{"n": 1}]
+        assert len(fake.attempts) == 2
@@ -0,0 +1,146 @@
+import time
+import asyncio
+import pytest
+import threading
+from datetime import datetime, timedelta
+from src.services.forecast_cache import ForecastCache
+
+NOW = datetime(2024, 1, 15, 10, 30)
+
+class TestForecastCache:
+
+    def test_same_bucket_is_computed_once(self):
+        """Test requests within one bucket share a computed forecast"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+        calls = []
+        compute = lambda start: calls.append(start) or [{"timestamp": start.isoformat()}]
+
+        first = cache.get_or_compute("web-service", 2, 1, compute, now=NOW)
+        second = cache.get_or_compute("web-service", 2, 1, compute, now=NOW + timedelta(minutes=20))
+
+        assert first == second
+        assert calls == [datetime(2024, 1, 15, 10, 0)]
+        assert cache.get_stats()["hits"] == 1
+
+    def test_new_bucket_or_version_recomputes(self):
+        """Test bucket rollover and model version are part of the key"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+        calls = []
+        compute = lambda start: calls.append(start) or []
+
+        cache.get_or_compute("web-service", 2, 1, compute, now=NOW)
+        cache.get_or_compute("web-service", 2, 1, compute, now=NOW + timedelta(hours=1))
+        cache.get_or_compute("web-service", 2, 2, compute, now=NOW)
+
+        assert len(calls) == 3
+
+    def test_concurrent_misses_compute_once(self):
+        """Test callers missing the same key wait for one computation"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute(start):
+            calls.append(start)
+            started.set()
+            release.wait(5)
+            return [{"timestamp": start.isoformat()}]
+
+        results = []
+        callers = [threading.Thread(target=lambda: results.append(
+            cache.get_or_compute("web-service", 2, 1, compute, now=NOW))) for _ in range(5)]
+        callers[0].start()
+        started.wait(5)
+        for caller in callers[1:]:
+            caller.start()
+        deadline = time.monotonic() + 5
+        while cache.get_stats()["coalesced"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for caller in callers:
+            caller.join(5)
+
+        assert len(calls) == 1
+        assert len(results) == 5 and all(result == results[0] for result in results)
+
+    @pytest.mark.asyncio
+    async def test_async_misses_leave_event_loop_free(self):
+        """Test coroutines missing one key share a threaded computation without blocking the loop"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+        calls = []
+
+        def compute(start):
+            calls.append(start)
+            time.sleep(0.2)
+            return [{"timestamp": start.isoformat()}]
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(*[
+            cache.get_or_compute_async("web-service", 2, 1, compute, now=NOW) for _ in range(5)])
+        ticking.cancel()
+
+        assert len(calls) == 1
+        assert all(result == results[0] for result in results)
+        assert cache.get_stats()["coalesced"] == 4
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_computation(self):
+        """Test a waiter giving up leaves the shared computation to finish for the others"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+
+        def compute(start):
+            time.sleep(0.1)
+            return [{"timestamp": start.isoformat()}]
+
+        leader = asyncio.create_task(cache.get_or_compute_async("web-service", 2, 1, compute, now=NOW))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_compute_async("web-service", 2, 1, compute, now=NOW))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+
+        assert await leader == [{"timestamp": "2024-01-15T10:00:00"}]
+        assert cache.get(("web-service", 2, cache.bucket(NOW), 1)) is not None
+
+    def test_failed_computation_is_retried(self):
+        """Test an exception reaches the caller and is not cached"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+
+        def fail(start):
+            raise ValueError("model error")
+
+        with pytest.raises(ValueError):
+            cache.get_or_compute("web-service", 2, 1, fail, now=NOW)
+        assert cache.get_or_compute("web-service", 2, 1, lambda start: [], now=NOW) == []
+
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted first"""
+        cache = ForecastCache(max_entries=2, ttl=60, bucket_seconds=3600)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test expired entries are treated as misses"""
+        cache = ForecastCache(max_entries=2, ttl=-1, bucket_seconds=3600)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+    def test_hot_keys(self):
+        """Test requested (service, horizon) pairs are tracked for prefetching"""
+        cache = ForecastCache(max_entries=8, ttl=60, bucket_seconds=3600)
+        cache.get_or_compute("web-service", 2, 1, lambda start: [], now=NOW)
+        assert cache.hot_keys() == [("web-service", 2)]
@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sklearn.ensemble import RandomForestRegressor
+from src.services.forecast_engine import ForecastEngine, RF_FEATURES, build_future_frame
+
+START = datetime(2024, 12, 31, 22, 0)
+
+class FakeProphet:
+    """Prophet stand-in recording the frames it is asked to predict"""
+
+    def __init__(self):
+        self.extra_regressors = {'hour_sin': {'mu': 0.0}, 'Lagged_Features': {'mu': 500.0}}
+        self.frames = []
+
+    def predict(self, df):
+        self.frames.append(df)
+        yhat = 1000.0 + 100.0 * np.arange(len(df))
+        return pd.DataFrame({'ds': df['ds'], 'yhat': yhat,
+                             'yhat_lower': yhat - 50.0, 'yhat_upper': yhat + 50.0})
+
+@pytest.fixture
+def primary_model():
+    frame = build_future_frame(datetime(2024, 1, 1), 24 * 14)
+    frame['Lagged_Features'] = 1000.0
+    rf_model = RandomForestRegressor(n_estimators=5, random_state=0)
+    rf_model.fit(frame[RF_FEATURES], np.full(len(frame), 1000.0))
+    return {'prophet': FakeProphet(), 'random_forest': rf_model}
+
+class TestForecastEngine:
+
+    def test_future_frame_features(self):
+        """Test calendar and cyclical features of the future frame"""
+        frame = build_future_frame(START, 4)
+        assert frame['hour_of_day'].tolist() == [22, 23, 0, 1]
+        assert frame['is_month_end'].tolist() == [1, 1, 0, 0]
+        assert frame['is_payday'].tolist() == [1, 1, 0, 0]
+        assert frame['is_fiscal_year_end'].tolist() == [1, 1, 0, 0]
+        assert frame['hour_sin'].iloc[2] == pytest.approx(0.0)
+        assert frame['hour_cos'].iloc[2] == pytest.approx(1.0)
+
+    def test_forecast_is_spaced_hourly(self, primary_model):
+        """Test one point per hour after the start of the bucket"""
+        forecast = ForecastEngine(capacity=1000.0).forecast(primary_model, START, 3)
+        assert [point["timestamp"] for point in forecast] == [
+            "2024-12-31T23:00:00", "2025-01-01T00:00:00", "2025-01-01T01:00:00"
+        ]
+        assert all(point["model_used"] == "prophet_rf_ensemble" for point in forecast)
+
+    def test_single_vectorized_prophet_pass(self, primary_model):
+        """Test Prophet predicts the whole horizon once with its regressors"""
+        ForecastEngine().forecast(primary_model, START, 6)
+        frames = primary_model['prophet'].frames
+        assert len(frames) == 1
+        assert list(frames[0].columns) == ['ds', 'hour_sin', 'Lagged_Features']
+        assert (frames[0]['Lagged_Features'] == 500.0).all()
+
+    def test_ensemble_weighting_and_capacity(self, primary_model):
+        """Test predictions are blended and normalized by capacity"""
+        engine = ForecastEngine(prophet_weight=1.0, capacity=1000.0)
+        forecast = engine.forecast(primary_model, START, 2)
+        assert forecast[0]["predicted_active_users"] == pytest.approx(1100.0)
+        assert forecast[0]["predicted_load"] == pytest.approx(1.1)
+        assert forecast[1]["yhat_upper"] == pytest.approx(1250.0)
+        assert 0.0 <= forecast[0]["confidence"] <= 1.0
+
+    def test_mock_models_are_rejected(self):
+        """Test placeholder artifacts raise so callers fall back"""
+        with pytest.raises(ValueError):
+            ForecastEngine().forecast({'prophet': {"type": "mock_prophet"},
+                                       'random_forest': {"type": "mock_random_forest"}}, START, 2)
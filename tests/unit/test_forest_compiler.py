@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from src.utils.forest_compiler import (
+    CompiledIsolationForest, average_path_length, compile_isolation_forest, compile_scaler
+)
+
+@pytest.fixture
+def training_data():
+    return np.random.default_rng(0).normal(size=(500, 6))
+
+class TestCompiledIsolationForest:
+
+    def test_average_path_length(self):
+        """Test c(n) edge cases"""
+        result = average_path_length([0, 1, 2, 256])
+        assert result[0] == 0.0
+        assert result[1] == 0.0
+        assert result[2] == 1.0
+        assert result[3] == pytest.approx(10.2447, abs=1e-3)
+
+    @pytest.mark.parametrize("params", [
+        {},
+        {"max_features": 0.5},
+        {"max_samples": 64, "contamination": 0.1},
+        {"bootstrap": True},
+    ])
+    def test_matches_sklearn_scores(self, training_data, params):
+        """Test compiled scores match sklearn decision_function"""
+        iso_forest = IsolationForest(n_estimators=50, random_state=0, **params).fit(training_data)
+        compiled = CompiledIsolationForest.from_sklearn(iso_forest)
+
+        X = np.random.default_rng(1).normal(size=(200, 6)) * 2
+        np.testing.assert_allclose(compiled.decision_function(X), iso_forest.decision_function(X))
+        np.testing.assert_allclose(compiled.score_samples(X), iso_forest.score_samples(X))
+
+    def test_single_row(self, training_data):
+        """Test a single sample is scored without batching"""
+        iso_forest = IsolationForest(n_estimators=10, random_state=0).fit(training_data)
+        compiled = compile_isolation_forest(iso_forest)
+        assert compiled is not None
+        assert compiled.decision_function(training_data[:1]).shape == (1,)
+
+class TestCompileScaler:
+
+    @pytest.mark.parametrize("scaler", [StandardScaler(), StandardScaler(with_mean=False), MinMaxScaler()])
+    def test_matches_sklearn_transform(self, training_data, scaler):
+        """Test compiled scaler matches sklearn transform"""
+        scaler.fit(training_data)
+        transform = compile_scaler(scaler)
+        np.testing.assert_allclose(transform(training_data), scaler.transform(training_data))
+
+    def test_unknown_scaler(self):
+        """Test unsupported scalers are not compiled"""
+        assert compile_scaler(object()) is None
@@ -0,0 +1,139 @@
+import pytest
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+from src.api.main import app
+from src.api.middleware.metrics import record_request_metrics
+from src.api.middleware.timing import RequestTimingMiddleware
+from src.services.model_registry import APISecondaryModel, ModelBundle, ModelRegistry
+from src.services.scaling_service import ScalingService
+from src.utils.instrumentation import MetricsRegistry, registry, HTTP_REQUESTS, ANOMALY_SCORE_DURATION
+
+FEATURES = ['load-1m', 'cpu-user']
+
+@pytest.fixture
+def model_registry(monkeypatch):
+    """App state serving a small trained secondary model"""
+    data = np.random.default_rng(0).random((100, len(FEATURES)))
+    scaler = StandardScaler().fit(data)
+    model_registry = ModelRegistry()
+    model_registry.bundle = ModelBundle(secondary_model=APISecondaryModel({
+        'metrics_scaler': scaler,
+        'resid_scaler': None,
+        'iso_forest': IsolationForest(n_estimators=10, random_state=0).fit(scaler.transform(data)),
+        'available_features': FEATURES
+    }))
+    monkeypatch.setattr(app.state, "model_registry", model_registry, raising=False)
+    monkeypatch.setattr(app.state, "scaling_service", ScalingService(registry=model_registry), raising=False)
+    return model_registry
+
+class TestMetricsRegistry:
+
+    def test_counter_and_gauge_exposition(self):
+        """Test counters and gauges render HELP, TYPE and labelled samples"""
+        metrics = MetricsRegistry(prefix="test_")
+        requests = metrics.counter("requests_total", "Requests", ["route"])
+        requests.labels("/a").inc()
+        requests.labels(route="/a").inc(2)
+        metrics.gauge("depth", "Queue depth").set_function(lambda: 7)
+
+        lines = metrics.render().splitlines()
+        assert lines == [
+            "# HELP test_requests_total Requests",
+            "# TYPE test_requests_total counter",
+            'test_requests_total{route="/a"} 3',
+            "# HELP test_depth Queue depth",
+            "# TYPE test_depth gauge",
+            "test_depth 7",
+        ]
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test observations land in fixed buckets rendered cumulatively with +Inf"""
+        metrics = MetricsRegistry()
+        latency = metrics.histogram("latency_seconds", "Latency", buckets=[0.1, 1.0])
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+
+        samples = [line for line in metrics.render().splitlines() if not line.startswith("#")]
+        assert samples == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+        ]
+
+    def test_time_observes_duration(self):
+        """Test the timer context manager records one observation"""
+        latency = MetricsRegistry().histogram("work_seconds", "Work")
+        with latency.time():
+            pass
+        assert latency.labels().count == 1
+
+    def test_label_mismatch_and_type_conflicts_raise(self):
+        """Test misuse is reported instead of producing invalid output"""
+        metrics = MetricsRegistry()
+        counter = metrics.counter("events_total", "Events", ["kind"])
+        with pytest.raises(ValueError):
+            counter.inc()
+        with pytest.raises(ValueError):
+            metrics.gauge("events_total", "Events")
+        assert metrics.counter("events_total", "Events", ["kind"]) is counter
+
+    def test_label_values_are_escaped(self):
+        """Test quotes and newlines in label values keep the format parseable"""
+        metrics = MetricsRegistry()
+        metrics.counter("c_total", "C", ["path"]).labels('a"b\nc').inc()
+        assert 'c_total{path="a\\"b\\nc"} 1' in metrics.render()
+
+class TestMetricsEndpoint:
+
+    def test_middleware_labels_by_route_template(self):
+        """Test one timing pass feeds every observer, labelled by route template"""
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"item_id": item_id}
+
+        observed = []
+        app.add_middleware(RequestTimingMiddleware, observers=[
+            record_request_metrics, lambda *request: observed.append(request)])
+        before = HTTP_REQUESTS.labels("GET", "/items/{item_id}", 200).value
+        TestClient(app).get("/items/1")
+        TestClient(app).get("/items/2")
+
+        assert HTTP_REQUESTS.labels("GET", "/items/{item_id}", 200).value == before + 2
+        assert [request[:3] for request in observed] == [("GET", "/items/{item_id}", 200)] * 2
+
+    def test_metrics_endpoint(self, client):
+        """Test /metrics serves the global registry in Prometheus text format"""
+        client.get("/health/live")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'autoscaler_http_requests_total{method="GET",route="/health/live",status="200"}' in response.text
+        assert "# TYPE autoscaler_ws_broadcast_fanout_duration_seconds histogram" in response.text
+        assert registry.get("ws_connections") is not None
+
+    def test_anomaly_requests_are_timed(self, client, model_registry, sample_metrics):
+        """Test live anomaly scoring, not only warm-up, records scoring latency"""
+        before = ANOMALY_SCORE_DURATION.labels().count
+        response = client.post("/predictions/anomaly", json=sample_metrics)
+
+        assert response.status_code == 200
+        assert ANOMALY_SCORE_DURATION.labels().count == before + 1
+
+    def test_outlier_is_flagged_by_both_anomaly_endpoints(self, client, model_registry, sample_metrics):
+        """Test single-row and batch anomaly detection agree on an outlying row"""
+        typical = {**sample_metrics, "load_1m": 0.5, "cpu_user": 0.5}
+        outlier = {**sample_metrics, "load_1m": 50.0, "cpu_user": 5000.0}
+        single = client.post("/predictions/anomaly", json=outlier).json()
+        batch = client.post("/predictions/anomaly/batch", json={"metrics": [outlier, typical]}).json()
+
+        assert single["anomaly_detected"] is True
+        assert [result["anomaly_detected"] for result in batch["results"]] == [True, False]
+        assert batch["results"][0]["anomaly_score"] == pytest.approx(single["anomaly_score"])
@@ -0,0 +1,144 @@
+import os
+import logging
+import logging.handlers
+import queue
+import threading
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from src.api.middleware.logging import AccessLog, access_logger
+from src.api.middleware.timing import RequestTimingMiddleware
+from src.config import logging_config
+from src.config.logging_config import DroppingQueueHandler
+from src.config.settings import settings
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.get_ident())
+
+@pytest.fixture
+def access_records():
+    handler = ListHandler()
+    access_logger.addHandler(handler)
+    yield handler.records
+    access_logger.removeHandler(handler)
+
+def make_client(sample_rates=None):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    @app.get("/health/live")
+    async def live():
+        return {"status": "alive"}
+
+    @app.get("/boom")
+    async def boom():
+        raise HTTPException(status_code=503, detail="down")
+
+    app.add_middleware(RequestTimingMiddleware, observers=[AccessLog(sample_rates=sample_rates or {})])
+    return TestClient(app)
+
+class TestAccessLog:
+
+    def test_logs_route_template_status_and_latency(self, access_records):
+        """Test the access log uses the route template rather than the raw path"""
+        make_client().get("/items/42")
+
+        assert len(access_records) == 1
+        method, route, status, latency = access_records[0].args
+        assert (method, route, status) == ("GET", "/items/{item_id}", 200)
+        assert latency >= 0
+
+    def test_unmatched_routes_share_one_label(self, access_records):
+        """Test 404s are not labelled with arbitrary client paths"""
+        make_client().get("/nope/123")
+        assert access_records[0].args[1:3] == ("unmatched", 404)
+
+    def test_sampling_by_route_prefix(self, access_records):
+        """Test sampled routes are skipped but server errors are always logged"""
+        client = make_client(sample_rates={"/health": 0.0, "/boom": 0.0})
+        for _ in range(5):
+            client.get("/health/live")
+        client.get("/boom")
+        client.get("/items/1")
+
+        assert [record.args[1] for record in access_records] == ["/boom", "/items/{item_id}"]
+
+    def test_longest_prefix_wins(self):
+        """Test a more specific sample rate overrides a broader one"""
+        access_log = AccessLog(sample_rates={"/health": 0.1, "/health/live": 0.5})
+        assert access_log.sample_rate("/health/live") == 0.5
+        assert access_log.sample_rate("/health/") == 0.1
+        assert access_log.sample_rate("/healthz") == 1.0
+
+class TestLoggingPipeline:
+
+    def test_dropping_queue_handler_never_blocks(self):
+        """Test records beyond the queue size are dropped and counted"""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+        logger = logging.getLogger("test.dropping")
+        logger.addHandler(handler)
+        logger.propagate = False
+        for i in range(5):
+            logger.warning("record %d", i)
+        logger.removeHandler(handler)
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_handlers_run_on_listener_thread(self, monkeypatch):
+        """Test configured handlers are moved behind the queue"""
+        monkeypatch.setattr(settings, "LOG_FILE", "")
+        capture = ListHandler()
+        console = {"class": "logging.NullHandler"}
+        original = logging_config.get_logging_config
+
+        def config():
+            result = original()
+            result["handlers"]["console"] = console
+            return result
+
+        monkeypatch.setattr(logging_config, "get_logging_config", config)
+        listener = logging_config.setup_logging()
+        try:
+            listener.handlers = listener.handlers + (capture,)
+            assert isinstance(logging.getLogger("src").handlers[0], DroppingQueueHandler)
+            logging.getLogger("src.test").info("hello")
+        finally:
+            logging_config.stop_logging()
+            monkeypatch.undo()
+            logging_config.setup_logging()
+
+        assert [record.getMessage() for record in capture.records] == ["hello"]
+        assert threading.get_ident() not in capture.threads
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+    def test_forked_child_writes_its_records(self, tmp_path, monkeypatch):
+        """Test a worker forked after setup_logging still gets its records written"""
+        log_file = tmp_path / "app.log"
+        monkeypatch.setattr(settings, "LOG_FILE", str(log_file))
+        logging_config.setup_logging()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    logging.getLogger("src.test").info("from the child")
+                    logging_config.stop_logging()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+        finally:
+            logging_config.stop_logging()
+            monkeypatch.undo()
+            logging_config.setup_logging()
+
+        assert "from the child" in log_file.read_text()
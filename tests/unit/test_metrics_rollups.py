@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+from src.services.metrics_store import METRIC_FIELDS, MetricsRingBuffer
+from src.services.metrics_rollups import MetricsRollups, RollupTier
+from src.config.settings import settings
+
+class TestRollupTier:
+
+    def test_buckets_keep_summary_stats(self):
+        """Test samples are folded into count/sum/min/max/last per bucket"""
+        tier = RollupTier("1m", 60, capacity=4, fields=["load_1m", "requests_per_ip"])
+        for t, value in [(0, 1.0), (30, 3.0), (59, 2.0), (60, 5.0)]:
+            tier.add(float(t), np.array([value, np.nan]))
+
+        window = tier.window()
+        assert window["timestamp"].tolist() == [0.0, 60.0]
+        assert window["count"][:, 0].tolist() == [3, 1]
+        assert window["sum"][0, 0] == 6.0
+        assert window["min"][0, 0] == 1.0
+        assert window["max"][0, 0] == 3.0
+        assert window["last"][0, 0] == 2.0
+        assert window["count"][:, 1].tolist() == [0, 0]
+
+    def test_retention_per_tier(self):
+        """Test a tier only keeps its newest buckets"""
+        tier = RollupTier("1m", 60, capacity=3, fields=["load_1m"])
+        for t in range(0, 600, 30):
+            tier.add(float(t), np.array([float(t)]))
+
+        assert len(tier) == 3
+        assert tier.window()["timestamp"].tolist() == [420.0, 480.0, 540.0]
+
+    def test_rows_are_bucket_means(self):
+        """Test rollup rows report the mean of each bucket"""
+        tier = RollupTier("1m", 60, capacity=4)
+        for t, value in [(0.0, 1.0), (30.0, 3.0)]:
+            row = np.full(len(METRIC_FIELDS), value)
+            row[METRIC_FIELDS.index("requests_per_ip")] = np.nan
+            tier.add(t, row)
+
+        rows = tier.rows()
+        assert rows[0].load_1m == 2.0
+        assert rows[0].requests_per_ip is None
+
+class TestMetricsRollups:
+
+    @pytest.fixture
+    def rollups(self):
+        raw = MetricsRingBuffer(capacity=120, fields=["load_1m"])
+        return MetricsRollups(raw, raw_interval=30, tiers=[
+            RollupTier("1m", 60, 1440, ["load_1m"]),
+            RollupTier("1h", 3600, 2160, ["load_1m"])
+        ])
+
+    def test_select_coarsest_tier_meeting_resolution(self, rollups):
+        """Test tier choice follows the requested resolution"""
+        assert rollups.tier_name(rollups.select(3600, 10)) == "raw"
+        assert rollups.tier_name(rollups.select(3600, 300)) == "1m"
+        assert rollups.tier_name(rollups.select(7 * 86400, 3600)) == "1h"
+
+    def test_select_falls_back_to_tier_covering_lookback(self, rollups):
+        """Test long lookbacks skip tiers that do not retain enough history"""
+        # Raw keeps one hour, so a 6 hour query at 30s resolution needs 1m buckets
+        assert rollups.tier_name(rollups.select(6 * 3600, 30)) == "1m"
+
+    def test_add_feeds_every_tier(self, rollups):
+        """Test one sample reaches the raw buffer and all rollups"""
+        rollups.add(1000.0, {"load_1m": 0.5})
+        assert [tier["entries"] for tier in rollups.status()] == [1, 1, 1]
+
+class TestMetricsHistoryEndpoint:
+
+    @pytest.mark.parametrize("hours", ["1e9", "0", "-1"])
+    def test_out_of_range_lookback_is_rejected(self, client, hours):
+        """Test lookbacks beyond the longest retention or not positive are a client error"""
+        assert client.get(f"/monitoring/history?hours={hours}").status_code == 422
+
+    def test_longest_retention_is_accepted(self, client):
+        """Test the full hourly-tier retention can still be queried"""
+        hours = settings.METRICS_ROLLUP_HOUR_RETENTION
+        assert client.get(f"/monitoring/history?hours={hours}").status_code == 200
@@ -0,0 +1,138 @@
+import time
+import pytest
+import numpy as np
+from src.services.metrics_store import METRIC_FIELDS, MetricsRingBuffer
+from src.services.metrics_rollups import RollupTier
+from src.services.metrics_segments import MetricsSegmentStore
+from src.services.monitoring_service import MonitoringService
+from src.config.settings import settings
+
+def make_store(tmp_path, **kwargs):
+    options = dict(fields=["load_1m", "cpu_user"], rotate_seconds=60,
+                   fsync_interval=0, retention_seconds=3600)
+    options.update(kwargs)
+    return MetricsSegmentStore(path=str(tmp_path), **options)
+
+class TestMetricsSegmentStore:
+
+    def test_round_trip(self, tmp_path):
+        """Test appended samples are read back in order"""
+        store = make_store(tmp_path)
+        for t in range(5):
+            store.append(1000.0 + t, {"load_1m": float(t), "cpu_user": None})
+
+        timestamps, matrix = store.load()
+        assert timestamps.tolist() == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+        assert matrix[:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert np.isnan(matrix[:, 1]).all()
+        assert store.load(since=1002.0)[0].tolist() == [1003.0, 1004.0]
+
+    def test_rotation_and_retention(self, tmp_path):
+        """Test segments rotate by time and expired ones are deleted"""
+        store = make_store(tmp_path, retention_seconds=120)
+        for t in range(0, 600, 30):
+            store.append(float(t), {"load_1m": 1.0})
+        store.close()
+
+        starts = [start for start, _ in store.segment_files()]
+        assert starts == [420.0, 480.0, 540.0]
+
+    def test_torn_record_is_ignored(self, tmp_path):
+        """Test a partially written trailing record does not break replay"""
+        store = make_store(tmp_path)
+        store.append(1000.0, {"load_1m": 1.0})
+        store.close()
+        with open(store.segment_files()[0][1], "ab") as f:
+            f.write(b"\x00" * 5)
+
+        assert len(make_store(tmp_path).load()[0]) == 1
+
+    def test_single_writer_across_processes(self, tmp_path):
+        """Test only the writer-lock holder persists, and another takes over on close"""
+        first, second = make_store(tmp_path), make_store(tmp_path)
+        first.append(1000.0, {"load_1m": 1.0})
+        second.append(1000.5, {"load_1m": 1.0})
+        assert first.is_writer and not second.is_writer
+
+        first.close()
+        second.append(1001.0, {"load_1m": 2.0})
+        assert second.is_writer
+        timestamps, matrix = second.load()
+        assert timestamps.tolist() == [1000.0, 1001.0]
+        second.close()
+
+    def test_reopened_segment_drops_torn_record(self, tmp_path):
+        """Test appending after a torn record keeps later records aligned"""
+        store = make_store(tmp_path)
+        store.append(1000.0, {"load_1m": 1.0})
+        store.close()
+        with open(store.segment_files()[0][1], "ab") as f:
+            f.write(b"\x00" * 5)
+
+        store = make_store(tmp_path)
+        store.append(1001.0, {"load_1m": 2.0})
+        timestamps, matrix = store.load()
+        assert timestamps.tolist() == [1000.0, 1001.0]
+        assert matrix[:, 0].tolist() == [1.0, 2.0]
+
+    def test_retired_segments_follow_retention(self, tmp_path):
+        """Test each layout change retires a segment under its own name until it expires"""
+        for fields in (["load_1m"], ["load_1m", "cpu_user"], ["load_1m"], ["load_1m", "cpu_user"]):
+            store = make_store(tmp_path, fields=fields, retention_seconds=120)
+            store.append(1.0, {"load_1m": 1.0})
+            store.close()
+
+        retired = set(store.segment_files(include_retired=True)) - set(store.segment_files())
+        assert len(retired) == 3
+        assert store.load()[0].tolist() == [1.0]
+
+        store.append(600.0, {"load_1m": 1.0})
+        store.close()
+        assert store.segment_files(include_retired=True) == store.segment_files()
+
+class TestBulkReplay:
+
+    def test_rollup_extend_matches_add(self):
+        """Test bulk loading a tier gives the same buckets as per-sample adds"""
+        rng = np.random.default_rng(0)
+        timestamps = np.sort(rng.uniform(0, 600, size=200))
+        matrix = rng.normal(size=(200, 2))
+        matrix[rng.random((200, 2)) < 0.2] = np.nan
+
+        one_by_one = RollupTier("1m", 60, capacity=8, fields=["a", "b"])
+        for timestamp, row in zip(timestamps, matrix):
+            one_by_one.add(timestamp, row)
+
+        bulk = RollupTier("1m", 60, capacity=8, fields=["a", "b"])
+        for timestamp, row in zip(timestamps[:50], matrix[:50]):
+            bulk.add(timestamp, row)
+        bulk.extend(timestamps[50:], matrix[50:])
+
+        expected, actual = one_by_one.window(), bulk.window()
+        for key in expected:
+            np.testing.assert_allclose(expected[key], actual[key])
+
+    def test_ring_buffer_extend_keeps_newest(self):
+        """Test bulk appends wrap around like single appends"""
+        store = MetricsRingBuffer(capacity=4, fields=["load_1m"])
+        store.append_values(0.0, {"load_1m": 0.0})
+        store.extend_values(np.arange(1.0, 7.0), np.arange(1.0, 7.0)[:, None])
+        assert store.window()["load_1m"].tolist() == [3.0, 4.0, 5.0, 6.0]
+
+    @pytest.mark.asyncio
+    async def test_monitoring_service_replays_on_initialize(self, tmp_path, monkeypatch):
+        """Test a restarted service rebuilds its window from disk"""
+        monkeypatch.setattr(settings, "METRICS_PERSISTENCE_ENABLED", True)
+        monkeypatch.setattr(settings, "METRICS_SEGMENT_PATH", str(tmp_path))
+        first = MonitoringService()
+        await first.initialize()
+        now = time.time()
+        for t in range(10):
+            first.segments.append(now - 100 + t * 10, dict.fromkeys(METRIC_FIELDS, float(t)))
+        first.close()
+
+        second = MonitoringService()
+        await second.initialize()
+        assert len(second.metrics_store) == 10
+        assert second.get_average_metrics(minutes=5)["load_1m"] == pytest.approx(4.5)
+        second.close()
@@ -0,0 +1,136 @@
+import pytest
+import warnings
+import pickle
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+from src.api.models.schemas import SystemMetrics
+from src.services.model_registry import APISecondaryModel, ModelRegistry
+from src.services.scaling_service import ScalingService
+from src.services.state_store import InMemoryStateStore
+from src.config.settings import settings
+
+FEATURES = ['load-1m', 'load-5m', 'cpu-user', 'requests_per_ip']
+
+@pytest.fixture
+def secondary_model():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((200, len(FEATURES))), columns=FEATURES)
+    scaler = StandardScaler().fit(df)
+    iso_forest = IsolationForest(n_estimators=20, random_state=0).fit(scaler.transform(df))
+    return APISecondaryModel({
+        'metrics_scaler': scaler,
+        'resid_scaler': None,
+        'iso_forest': iso_forest,
+        'available_features': FEATURES
+    })
+
+class TestAPISecondaryModel:
+
+    def test_build_matrix_uses_model_column_order(self, secondary_model):
+        """Test feature matrix follows available_features and fills gaps"""
+        matrix = secondary_model.build_matrix([
+            {'cpu-user': 3.0, 'load-1m': 1.0},
+            {'load-5m': 2.0, 'requests_per_ip': float('nan')}
+        ])
+        assert matrix.shape == (2, 4)
+        assert matrix[0].tolist() == [1.0, 0.0, 3.0, 0.0]
+        assert matrix[1].tolist() == [0.0, 2.0, 0.0, 0.0]
+
+    def test_score_batch_matches_dataframe_path(self, secondary_model):
+        """Test batch scoring matches per-row DataFrame scoring"""
+        rows = [{feature: float(i + j) / 10 for j, feature in enumerate(FEATURES)} for i in range(5)]
+        batch_scores = secondary_model.score_batch(secondary_model.build_matrix(rows))
+
+        for row, batch_score in zip(rows, batch_scores):
+            scaled = secondary_model.metrics_scaler.transform(pd.DataFrame([row])[FEATURES])
+            expected = secondary_model.iso_forest.decision_function(scaled)[0]
+            assert batch_score == pytest.approx(expected)
+
+    def test_uncompiled_scoring_passes_feature_names(self, secondary_model):
+        """Test the sklearn scaler is given the DataFrame input it was fitted with"""
+        secondary_model.compiled_scaler = None
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            scores = secondary_model.score_batch(np.zeros((2, len(FEATURES))))
+        assert scores.shape == (2,)
+
+    def test_outlier_crosses_anomaly_threshold(self, secondary_model):
+        """Test an outlying row scores above the threshold and a typical one below"""
+        scores = secondary_model.score_batch(np.array([[50.0] * len(FEATURES), [0.5] * len(FEATURES)]))
+        outlier, typical = -scores
+        assert outlier > settings.ANOMALY_THRESHOLD > typical
+        assert secondary_model.predict({feature: 50.0 for feature in FEATURES})['action'] == 'security_alert'
+
+    def test_predict_returns_scores(self, secondary_model):
+        """Test single-row prediction still reports Isolation Forest scores"""
+        result = secondary_model.predict({'load-1m': 0.5})
+        assert result['source'] == 'isolation_forest'
+        assert 'iso_anom_score' in result['scores']
+
+def write_artifacts(model_dir, secondary_model):
+    joblib.dump({"type": "mock_prophet"}, model_dir / settings.PRIMARY_MODEL_FILE)
+    joblib.dump({"type": "mock_random_forest"}, model_dir / "rf_model.pkl")
+    secondary_path = model_dir / settings.SECONDARY_MODEL_FILE
+    with open(secondary_path, 'wb') as f:
+        pickle.dump({
+            'metrics_scaler': secondary_model.metrics_scaler,
+            'resid_scaler': None,
+            'iso_forest': secondary_model.iso_forest,
+            'available_features': secondary_model.available_features
+        }, f)
+
+class TestModelRegistry:
+
+    def test_load_missing_models(self, tmp_path):
+        """Test registry starts without models when artifacts are missing"""
+        registry = ModelRegistry(model_path=f"{tmp_path}/")
+        registry.load()
+        status = registry.status()
+        assert status['models_loaded'] == {"primary_model": False, "secondary_model": False}
+        assert status['loaded_at'] is not None
+
+    def test_reload_swaps_changed_artifacts(self, tmp_path, secondary_model):
+        """Test changed artifacts are loaded as a new version"""
+        write_artifacts(tmp_path, secondary_model)
+        registry = ModelRegistry(model_path=f"{tmp_path}/")
+        registry.load()
+        old_bundle = registry.bundle
+        assert registry.version == 1
+        assert registry.reload_if_changed() is False
+
+        joblib.dump({"type": "mock_random_forest", "retrained": True}, tmp_path / "rf_model.pkl")
+
+        assert registry.reload_if_changed() is True
+        assert registry.version == 2
+        assert registry.bundle is not old_bundle
+        assert old_bundle.secondary_model is not None  # in-flight users keep the old models
+
+    def test_reload_rejects_broken_artifacts(self, tmp_path, secondary_model):
+        """Test a broken artifact keeps the live version"""
+        write_artifacts(tmp_path, secondary_model)
+        registry = ModelRegistry(model_path=f"{tmp_path}/")
+        registry.load()
+
+        (tmp_path / settings.SECONDARY_MODEL_FILE).write_bytes(b"not a pickle")
+
+        assert registry.reload_if_changed() is False
+        assert registry.version == 1
+        assert registry.secondary_model is not None
+        assert registry.status()['last_reload_error'] is not None
+
+    @pytest.mark.asyncio
+    async def test_decisions_never_load_artifacts(self, tmp_path, sample_metrics):
+        """Test decisions use the loaded bundle instead of retrying missing artifacts per batch"""
+        registry = ModelRegistry(model_path=f"{tmp_path}/")
+        registry.load()
+        reads = []
+        registry._read_artifact = lambda path: reads.append(path)
+        service = ScalingService(registry=registry, state=InMemoryStateStore(initial_instances=4))
+
+        for _ in range(3):
+            decisions = await service.get_scaling_decisions([SystemMetrics(**sample_metrics)])
+            assert decisions[0].scores["model_version"] == registry.version
+        assert reads == []
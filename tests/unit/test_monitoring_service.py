@@ -0,0 +1,101 @@
+import time
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from src.api.models.schemas import SystemMetrics
+from src.services.monitoring_service import MonitoringService, MetricsCollector
+from src.services.metrics_store import MetricsRingBuffer
+
+def make_metrics(timestamp, load=0.5):
+    return SystemMetrics(
+        timestamp=timestamp.isoformat(), load_1m=load, load_5m=load, load_15m=load,
+        cpu_user=10.0, cpu_system=5.0, cpu_iowait=1.0, sys_mem_available=2048,
+        sys_mem_total=4096, disk_io_time=1.0, disk_io_read=2.0, disk_io_write=3.0
+    )
+
+class TestMetricsCollection:
+
+    def test_collect_metrics_does_not_block(self):
+        """Test sampling uses CPU deltas instead of sleeping"""
+        service = MonitoringService()
+        start = time.perf_counter()
+        metrics = service.collect_metrics()
+        assert time.perf_counter() - start < 0.5
+        assert service.latest_metrics is metrics
+
+    def test_get_latest_metrics_reuses_snapshot(self):
+        """Test readers get the published sample without collecting again"""
+        service = MonitoringService()
+        metrics = service.get_latest_metrics()
+        assert service.get_latest_metrics() is metrics
+
+    @pytest.mark.asyncio
+    async def test_collector_publishes_samples(self):
+        """Test the background collector samples on its interval"""
+        service = MonitoringService()
+        collector = MetricsCollector(service, interval=0.01)
+        await collector.start()
+        await asyncio.sleep(0.1)
+        await collector.stop()
+
+        assert service.latest_metrics is not None
+        assert len(service.metrics_history) >= 2
+
+class TestMetricsRingBuffer:
+
+    def test_overwrites_oldest_when_full(self):
+        """Test the buffer keeps the newest samples in time order"""
+        store = MetricsRingBuffer(capacity=4)
+        for i in range(6):
+            store.append_values(float(i), {"load_1m": float(i)})
+
+        window = store.window()
+        assert len(store) == 4
+        assert window["timestamp"].tolist() == [2.0, 3.0, 4.0, 5.0]
+        assert window["load_1m"].tolist() == [2.0, 3.0, 4.0, 5.0]
+
+    def test_window_search_across_wraparound(self):
+        """Test time windows spanning the physical end of the arrays"""
+        store = MetricsRingBuffer(capacity=5)
+        for i in range(8):
+            store.append_values(float(i), {"load_1m": float(i)})
+
+        assert store.window(since=4.0)["load_1m"].tolist() == [5.0, 6.0, 7.0]
+        assert store.window(since=3.5, until=5.0)["timestamp"].tolist() == [4.0, 5.0]
+        assert store.count(since=7.0) == 0
+        assert store.count() == 5
+
+    def test_mean_ignores_missing_values(self):
+        """Test optional fields missing from some samples"""
+        store = MetricsRingBuffer(capacity=8)
+        store.append_values(1.0, {"load_1m": 1.0, "requests_per_ip": 4.0})
+        store.append_values(2.0, {"load_1m": 3.0})
+
+        means = store.mean()
+        assert means["load_1m"] == 2.0
+        assert means["requests_per_ip"] == 4.0
+
+    def test_rows_round_trip(self):
+        """Test samples are rebuilt as SystemMetrics"""
+        store = MetricsRingBuffer(capacity=8)
+        now = datetime(2024, 1, 15, 10, 30)
+        store.append(make_metrics(now, load=0.7))
+
+        rows = store.rows()
+        assert rows[0].timestamp == now.isoformat()
+        assert rows[0].load_1m == 0.7
+        assert rows[0].requests_per_ip is None
+
+class TestMetricsQueries:
+
+    def test_history_and_average_windows(self):
+        """Test get_metrics_history and get_average_metrics only use recent samples"""
+        service = MonitoringService()
+        now = datetime.now()
+        service.record_metrics(make_metrics(now - timedelta(hours=2), load=10.0))
+        service.record_metrics(make_metrics(now - timedelta(minutes=2), load=1.0))
+        service.record_metrics(make_metrics(now - timedelta(minutes=1), load=3.0))
+
+        assert len(service.get_metrics_history(hours=1)) == 2
+        assert len(service.metrics_history) == 3
+        assert service.get_average_metrics(minutes=5)["load_1m"] == 2.0
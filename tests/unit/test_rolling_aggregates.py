@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+from src.services.rolling_aggregates import EWMA, RollingAggregator, SlidingWindow
+
+class TestSlidingWindow:
+
+    def test_matches_brute_force(self):
+        """Test incremental stats match recomputing over the window"""
+        rng = np.random.default_rng(0)
+        values = rng.normal(5e9, 1e6, size=(300, 2))
+        window = SlidingWindow(seconds=50, n_fields=2)
+
+        for t, row in enumerate(values):
+            window.push(float(t), row)
+            expected = values[max(0, t - 49):t + 1]
+            np.testing.assert_allclose(window.mean(), expected.mean(axis=0))
+            np.testing.assert_allclose(window.variance(), expected.var(axis=0), rtol=1e-6)
+            np.testing.assert_array_equal(window.minimum(), expected.min(axis=0))
+            np.testing.assert_array_equal(window.maximum(), expected.max(axis=0))
+
+    def test_missing_values_are_skipped(self):
+        """Test NaN samples do not count towards a field"""
+        window = SlidingWindow(seconds=60, n_fields=2)
+        window.push(1.0, np.array([1.0, np.nan]))
+        window.push(2.0, np.array([3.0, 4.0]))
+
+        assert window.mean().tolist() == [2.0, 4.0]
+        assert window.minimum().tolist() == [1.0, 4.0]
+
+    def test_evict_empties_window(self):
+        """Test reads after the window has passed"""
+        window = SlidingWindow(seconds=10, n_fields=1)
+        window.push(1.0, np.array([1.0]))
+        window.evict(20.0)
+
+        assert len(window) == 0
+        assert np.isnan(window.mean()[0])
+        assert np.isnan(window.maximum()[0])
+
+class TestEWMA:
+
+    def test_half_life(self):
+        """Test the average moves halfway towards a new value after one half-life"""
+        ewma = EWMA(half_life=60, n_fields=1)
+        ewma.push(0.0, np.array([0.0]))
+        ewma.push(60.0, np.array([10.0]))
+        assert ewma.value[0] == pytest.approx(5.0)
+
+class TestRollingAggregator:
+
+    def test_window_stats_and_ewma(self):
+        """Test aggregates are reported per window and half-life"""
+        aggregator = RollingAggregator(["load_1m", "cpu_user"], windows=[60], half_lives=[30])
+        for t in range(5):
+            aggregator.update(1000.0 + t, {"load_1m": float(t), "cpu_user": None})
+
+        stats = aggregator.window_stats(60, now=1005.0)
+        assert stats["count"] == 5
+        assert stats["fields"]["load_1m"]["mean"] == 2.0
+        assert stats["fields"]["load_1m"]["max"] == 4.0
+        assert stats["fields"]["cpu_user"]["mean"] is None
+        assert aggregator.mean(60, now=1005.0) == {"load_1m": 2.0}
+        assert 0.0 < aggregator.ewma_values()["30s"]["load_1m"] < 2.0
@@ -0,0 +1,85 @@
+import os
+import time
+import signal
+import socket
+import pytest
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from src.api import server
+from src.config.settings import settings
+
+def record(events_path, event):
+    with open(events_path, "a") as f:
+        f.write(f"{event} {os.getpid()}\n")
+
+def lifespan_app(events_path):
+    """App recording "start <pid>" and "stop <pid>" from its lifespan"""
+    @asynccontextmanager
+    async def lifespan(app):
+        record(events_path, "start")
+        yield
+        record(events_path, "stop")
+
+    return FastAPI(lifespan=lifespan)
+
+def read_events(events_path, event):
+    if not events_path.exists():
+        return []
+    return [int(line.split()[1]) for line in events_path.read_text().splitlines()
+            if line.startswith(event)]
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+def bind_local_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    sock.set_inheritable(True)
+    return sock
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+class TestPreforkServer:
+
+    def test_dead_worker_is_replaced_and_shutdown_is_graceful(self, tmp_path, monkeypatch):
+        """Test a killed worker is re-forked and Ctrl-C shuts every worker down gracefully"""
+        events = tmp_path / "events"
+        monkeypatch.setattr(settings, "PRELOAD_MODELS", False)
+        monkeypatch.setattr(server, "_bind_socket", bind_local_socket)
+        monkeypatch.setattr(server, "RESTART_BACKOFF", 0.0)
+        # Workers flush their logs last, on the way out
+        monkeypatch.setattr(server, "stop_logging", lambda: record(events, "exit"))
+
+        master = os.fork()
+        if master == 0:
+            try:
+                # Stand-in for the terminal's foreground process group
+                os.setpgid(0, 0)
+                server.serve_preforked(2, app=lifespan_app(events))
+            finally:
+                os._exit(0)
+
+        try:
+            wait_for(lambda: len(read_events(events, "start")) == 2)
+            crashed = read_events(events, "start")[0]
+            os.kill(crashed, signal.SIGKILL)
+            wait_for(lambda: len(read_events(events, "start")) == 3)
+
+            os.killpg(master, signal.SIGINT)  # Ctrl-C
+            deadline = time.monotonic() + 10
+            while os.waitpid(master, os.WNOHANG) == (0, 0):
+                assert time.monotonic() < deadline, "master did not exit"
+                time.sleep(0.05)
+        finally:
+            try:
+                os.kill(master, signal.SIGKILL)
+                os.waitpid(master, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+
+        survivors = sorted(pid for pid in read_events(events, "start") if pid != crashed)
+        assert sorted(read_events(events, "stop")) == survivors
+        assert sorted(read_events(events, "exit")) == survivors
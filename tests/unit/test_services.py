@@ -4,6 +4,7 @@ from unittest.mock import Mock, patch
 from src.services.scaling_service import ScalingService
 from src.services.monitoring_service import MonitoringService
 from src.api.models.schemas import SystemMetrics
+from src.config.settings import settings
 from datetime import datetime
 
 class TestScalingService:
@@ -47,7 +48,7 @@ class TestMonitoringService:
         """Test MonitoringService initialization"""
         service = MonitoringService()
         assert service.metrics_history == []
-        assert service.anomaly_threshold == 0.95
+        assert service.anomaly_threshold == settings.ANOMALY_THRESHOLD
         assert service.collection_interval == 30
     
     def test_simulate_user_count(self):
@@ -0,0 +1,183 @@
+import pytest
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from src.api.main import app
+from src.api.models.schemas import ScalingDecision
+from src.services.scaling_service import ScalingService, SERVICE_NAME
+from src.services.state_store import InMemoryStateStore, SQLiteStateStore
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStateStore(initial_instances=4)
+    return SQLiteStateStore(path=str(tmp_path / "state.db"), initial_instances=4)
+
+def make_decision(action, target, baseline=None):
+    return ScalingDecision(
+        action=action, confidence=0.9, reason="test", source="test",
+        scores={} if baseline is None else {"baseline_instances": baseline},
+        target_instances=target, service_name=SERVICE_NAME,
+        timestamp=datetime.now().isoformat()
+    )
+
+class TestStateStore:
+
+    def test_compare_and_set(self, store):
+        """Test the instance count only changes from the expected value"""
+        assert store.get_active_instances("web") == 4
+        assert store.compare_and_set_instances("web", 4, 6)
+        assert not store.compare_and_set_instances("web", 4, 8)
+        assert store.get_active_instances("web") == 6
+
+    def test_history_written_with_successful_update_only(self, store):
+        """Test history rows are appended atomically with the count"""
+        store.compare_and_set_instances("web", 4, 6, {"action": "scale_up", "target_instances": 6})
+        store.compare_and_set_instances("web", 4, 2, {"action": "scale_down", "target_instances": 2})
+
+        history = store.list_history()
+        assert [entry["action"] for entry in history] == ["scale_up"]
+        assert history[0]["id"] == 1
+
+    def test_list_history_limit(self, store):
+        """Test the newest entries are returned oldest first"""
+        for i in range(5):
+            store.append_history({"timestamp": str(i), "action": "maintain"})
+        assert [entry["timestamp"] for entry in store.list_history(limit=2)] == ["3", "4"]
+
+    def test_query_history_pages_with_cursor(self, store):
+        """Test pages are newest first and the cursor continues where one stopped"""
+        for i in range(7):
+            store.append_history({"timestamp": f"2026-01-0{i + 1}T00:00:00",
+                                  "action": "scale_up" if i % 2 else "maintain"})
+
+        page, cursor = store.query_history(3)
+        assert [entry["id"] for entry in page] == [7, 6, 5]
+        page, cursor = store.query_history(3, cursor=cursor)
+        assert [entry["id"] for entry in page] == [4, 3, 2]
+        page, cursor = store.query_history(3, cursor=cursor)
+        assert [entry["id"] for entry in page] == [1]
+        assert cursor is None
+
+    def test_query_history_filters(self, store):
+        """Test action, service and time range filters"""
+        for i in range(6):
+            store.append_history({"timestamp": f"2026-01-0{i + 1}T00:00:00",
+                                  "service_name": "api" if i < 3 else "web",
+                                  "action": "scale_up" if i % 2 else "maintain"})
+
+        page, _ = store.query_history(10, action="scale_up", service="web")
+        assert [entry["id"] for entry in page] == [6, 4]
+        page, _ = store.query_history(10, since="2026-01-02T00:00:00", until="2026-01-04T00:00:00")
+        assert [entry["id"] for entry in page] == [4, 3, 2]
+
+    def test_out_of_order_timestamps(self, store):
+        """Test both backends filter and compact by timestamp regardless of insertion order"""
+        for day in (5, 6, 1, 7):
+            store.append_history({"timestamp": f"2026-01-0{day}T00:00:00"})
+
+        page, _ = store.query_history(10, since="2026-01-05T00:00:00")
+        assert [entry["id"] for entry in page] == [4, 2, 1]
+
+        store.history_retention_days = 3
+        store.compact_history(datetime(2026, 1, 7))
+        assert [entry["id"] for entry in store.list_history()] == [1, 2, 4]
+
+    def test_compact_history(self, tmp_path):
+        """Test compaction keeps the newest entries within the retention period"""
+        now = datetime(2026, 1, 31)
+        for store in (InMemoryStateStore(history_max_entries=10, history_retention_days=3),
+                      SQLiteStateStore(path=str(tmp_path / "state.db"),
+                                       history_max_entries=10, history_retention_days=3)):
+            for day in range(30, 0, -1):
+                store.append_history({"timestamp": (now - timedelta(days=day)).isoformat()})
+            store.compact_history(now)
+
+            assert [entry["id"] for entry in store.list_history()] == [28, 29, 30]
+
+    def test_sqlite_shared_between_connections(self, tmp_path):
+        """Test concurrent workers never lose an update"""
+        path = str(tmp_path / "state.db")
+        SQLiteStateStore(path=path, initial_instances=0)
+        successes = []
+
+        def worker():
+            store = SQLiteStateStore(path=path, initial_instances=0)
+            for _ in range(20):
+                current = store.get_active_instances("web")
+                if store.compare_and_set_instances("web", current, current + 1):
+                    successes.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert SQLiteStateStore(path=path).get_active_instances("web") == len(successes)
+
+class TestSharedScalingState:
+
+    @pytest.mark.asyncio
+    async def test_stale_decision_is_not_applied(self):
+        """Test a decision made against an outdated instance count is skipped"""
+        state = InMemoryStateStore(initial_instances=4)
+        worker_a = ScalingService(state=state)
+        worker_b = ScalingService(state=state)
+
+        assert await worker_a.execute_scaling(make_decision("scale_up", 6, baseline=4))
+        assert not await worker_b.execute_scaling(make_decision("scale_up", 8, baseline=4))
+        assert worker_b.active_instances == 6
+        assert len(worker_b.scaling_history) == 1
+
+    @pytest.mark.asyncio
+    async def test_manual_decision_uses_current_count(self):
+        """Test decisions without a baseline apply to the current count"""
+        state = InMemoryStateStore(initial_instances=4)
+        service = ScalingService(state=state)
+
+        assert await service.execute_scaling(make_decision("scale_down", 3))
+        assert service.scaling_history[0]["previous_instances"] == 4
+
+    def test_scaling_history_is_bounded(self):
+        """Test the service's history summary never loads the whole table"""
+        state = InMemoryStateStore(initial_instances=4)
+        for i in range(15):
+            state.append_history({"action": "scale_up", "target_instances": i})
+
+        history = ScalingService(state=state).scaling_history
+        assert [entry["target_instances"] for entry in history] == list(range(5, 15))
+
+    @pytest.mark.asyncio
+    async def test_contended_store_does_not_block_event_loop(self, tmp_path):
+        """Test waiting for another worker's write lock leaves the event loop free"""
+        path = str(tmp_path / "state.db")
+        service = ScalingService(state=SQLiteStateStore(path=path, initial_instances=4))
+        other_worker = SQLiteStateStore(path=path)._connection()
+        other_worker.execute("BEGIN IMMEDIATE")
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        execution = asyncio.create_task(service.execute_scaling(make_decision("scale_up", 6, baseline=4)))
+        await asyncio.sleep(0.2)
+        other_worker.execute("COMMIT")
+
+        assert await execution
+        ticking.cancel()
+        assert ticks >= 10
+
+    def test_health_reports_shared_instance_count(self, client, monkeypatch):
+        """Test /health and /scaling/status read the same shared count"""
+        state = InMemoryStateStore(initial_instances=4)
+        monkeypatch.setattr(app.state, "scaling_service", ScalingService(state=state), raising=False)
+        state.compare_and_set_instances(SERVICE_NAME, 4, 7)
+
+        assert client.get("/health").json()["active_instances"] == 7
+        assert client.get("/scaling/status").json()["active_instances"] == 7
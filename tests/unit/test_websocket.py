@@ -0,0 +1,362 @@
+import asyncio
+import json
+import pytest
+import src.api.websocket as ws_module
+from src.api.websocket import ClientConnection, ConnectionManager, Frame, MetricsStream, MetricsBroadcaster
+
+class FakeWebSocket:
+    """WebSocket stand-in whose sends can be held back to simulate a slow client"""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed_with = None
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.unblocked.wait()
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        await self.unblocked.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+async def drain():
+    for _ in range(100):
+        await asyncio.sleep(0)
+
+class TestClientConnection:
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_keeps_newest(self):
+        """Test a full queue discards its oldest message"""
+        client = ClientConnection(FakeWebSocket(), "c", on_error=lambda ws: None,
+                                  queue_size=3, policy="drop_oldest")
+        for i in range(5):
+            assert client.enqueue(Frame({"type": "alert", "n": i}))
+        assert [frame.message["n"] for frame in client.queue] == [2, 3, 4]
+        assert client.dropped_messages == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesce_replaces_same_kind(self):
+        """Test a full queue replaces the queued message of the same type"""
+        client = ClientConnection(FakeWebSocket(), "c", on_error=lambda ws: None,
+                                  queue_size=3, policy="coalesce")
+        client.enqueue(Frame({"type": "scaling_event", "n": 0}))
+        client.enqueue(Frame({"type": "system_metrics", "n": 1}))
+        client.enqueue(Frame({"type": "alert", "n": 2}))
+        client.enqueue(Frame({"type": "system_metrics", "n": 3}))
+        assert [frame.message["n"] for frame in client.queue] == [0, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy_rejects(self):
+        """Test a full queue reports the client for disconnection"""
+        client = ClientConnection(FakeWebSocket(), "c", on_error=lambda ws: None,
+                                  queue_size=1, policy="disconnect")
+        assert client.enqueue(Frame({"type": "alert"}))
+        assert not client.enqueue(Frame({"type": "alert"}))
+
+class TestConnectionManager:
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_delay_others(self):
+        """Test broadcast returns immediately and fast clients still receive"""
+        manager = ConnectionManager()
+        fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+        await manager.connect(fast, "fast")
+        await manager.connect(slow, "slow")
+
+        await asyncio.wait_for(manager.broadcast({"type": "alert", "data": {}}), timeout=1)
+        await drain()
+
+        assert [message["type"] for message in fast.sent] == ["connection_established", "alert"]
+        assert slow.sent == []
+        depths = {info["client_id"]: info["queue_depth"] for info in manager.get_connection_info()}
+        assert depths == {"fast": 0, "slow": 1}
+        manager.disconnect(fast)
+        manager.disconnect(slow)
+
+    @pytest.mark.asyncio
+    async def test_slow_client_disconnected_by_policy(self, monkeypatch):
+        """Test the disconnect policy closes a client whose queue overflows"""
+        from src.config.settings import settings
+        monkeypatch.setattr(settings, "WS_SLOW_CONSUMER_POLICY", "disconnect")
+        monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 2)
+        manager = ConnectionManager()
+        slow = FakeWebSocket(blocked=True)
+        await manager.connect(slow, "slow")
+
+        for _ in range(3):
+            await manager.broadcast({"type": "alert", "data": {}})
+        await drain()
+
+        assert manager.get_connection_count() == 0
+        assert slow.closed_with == 1008
+
+class TestEncoding:
+
+    @pytest.mark.asyncio
+    async def test_broadcast_serializes_once(self, monkeypatch):
+        """Test one broadcast is encoded once however many clients receive it"""
+        calls = []
+        encode = ws_module.encode_message
+        monkeypatch.setattr(ws_module, "encode_message",
+                            lambda message, encoding: calls.append(encoding) or encode(message, encoding))
+        manager = ConnectionManager()
+        sockets = [FakeWebSocket() for _ in range(5)]
+        for i, websocket in enumerate(sockets):
+            await manager.connect(websocket, f"c{i}")
+        await drain()
+        calls.clear()
+
+        await manager.broadcast({"type": "alert", "data": {"n": 1}})
+        await drain()
+
+        assert calls == ["json"]
+        assert all(websocket.sent[-1]["data"] == {"n": 1} for websocket in sockets)
+        for websocket in sockets:
+            manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_msgpack_falls_back_to_json(self, monkeypatch):
+        """Test clients asking for msgpack get JSON when it is not installed"""
+        monkeypatch.setattr(ws_module, "msgpack", None)
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "c", encoding="msgpack")
+        await drain()
+
+        assert websocket.sent[0]["encoding"] == "json"
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_msgpack_binary_frames(self):
+        """Test msgpack clients receive binary frames"""
+        msgpack = pytest.importorskip("msgpack")
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "c", encoding="msgpack")
+        await drain()
+
+        assert msgpack.unpackb(websocket.sent[0])["encoding"] == "msgpack"
+        manager.disconnect(websocket)
+
+class TestSubscriptions:
+
+    @pytest.mark.asyncio
+    async def test_clients_receive_only_subscribed_events(self):
+        """Test broadcasts reach clients by event topic, service and severity"""
+        manager = ConnectionManager()
+        everything, decisions, web_only, critical = (FakeWebSocket() for _ in range(4))
+        for websocket in (everything, decisions, web_only, critical):
+            await manager.connect(websocket)
+        manager.subscribe(decisions, events=["scaling_decision"])
+        manager.subscribe(web_only, events=["scaling_event"], services=["web"])
+        manager.subscribe(critical, events=["alert"], severity="critical")
+        await drain()
+        for websocket in (everything, decisions, web_only, critical):
+            websocket.sent.clear()
+
+        await manager.broadcast_scaling_event("scaling_decision", {"service_name": "web"})
+        await manager.broadcast_scaling_event("scaling_execution", {"service_name": "api"})
+        await manager.broadcast_alert({"type": "high_load", "severity": "warning"})
+        await manager.broadcast_alert({"type": "outage", "severity": "critical"})
+        await drain()
+
+        def received(websocket):
+            return [message.get("event_type") or message["data"]["type"] for message in websocket.sent]
+
+        assert received(everything) == ["scaling_decision", "scaling_execution", "high_load", "outage"]
+        assert received(decisions) == ["scaling_decision"]
+        assert received(web_only) == ["scaling_decision"]
+        assert received(critical) == ["outage"]
+        for websocket in (everything, decisions, web_only, critical):
+            manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_disconnect_removes_from_index(self):
+        """Test disconnected clients leave the topic index"""
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        manager.subscribe(websocket, events=["alert"])
+        manager.disconnect(websocket)
+
+        assert manager._event_index == {}
+        assert manager._service_index == {}
+
+class TestMetricsStream:
+
+    def test_deltas_and_snapshots(self):
+        """Test only fields that moved beyond epsilon are sent, with periodic snapshots"""
+        stream = MetricsStream(epsilon=0.01, snapshot_every=2)
+        stream.publish({"cpu": 50.0, "memory": 1000.0})
+        frame, known = stream.frame_for(None, full=False)
+        assert frame.message["snapshot"] and frame.message["data"] == {"cpu": 50.0, "memory": 1000.0}
+
+        stream.publish({"cpu": 50.1, "memory": 1500.0})
+        frame, known = stream.frame_for(known, full=False)
+        assert not frame.message["snapshot"] and frame.message["data"] == {"memory": 1500.0}
+
+        stream.publish({"cpu": 50.2, "memory": 1500.0})
+        frame, known = stream.frame_for(known, full=False)
+        assert frame is None
+
+    def test_clients_in_step_share_frames(self):
+        """Test clients with the same known values get the same frame object"""
+        stream = MetricsStream(epsilon=0.0)
+        stream.publish({"cpu": 1.0})
+        first, known = stream.frame_for(None, full=True)
+        second, same_known = stream.frame_for(None, full=True)
+        assert first is second and known is same_known
+
+        stream.publish({"cpu": 2.0})
+        assert stream.frame_for(known, False)[0] is stream.frame_for(same_known, False)[0]
+
+class TestConflatedMetrics:
+
+    @pytest.mark.asyncio
+    async def test_slow_client_receives_latest_only(self):
+        """Test metrics published while a client is busy are conflated"""
+        manager = ConnectionManager()
+        websocket = FakeWebSocket(blocked=True)
+        await manager.connect(websocket)
+        for cpu in range(5):
+            await manager.broadcast_system_metrics({"cpu": float(cpu)})
+        websocket.unblocked.set()
+        await drain()
+
+        metrics = [message for message in websocket.sent if message["type"] == "system_metrics"]
+        assert [message["data"] for message in metrics] == [{"cpu": 4.0}]
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_snapshot_on_connect(self):
+        """Test a client connecting after a publish gets a full snapshot"""
+        manager = ConnectionManager()
+        await manager.broadcast_system_metrics({"cpu": 10.0, "memory": 5.0})
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        await drain()
+
+        assert websocket.sent[1]["type"] == "system_metrics"
+        assert websocket.sent[1]["snapshot"] and websocket.sent[1]["data"] == {"cpu": 10.0, "memory": 5.0}
+        manager.disconnect(websocket)
+
+class TestMetricsBroadcaster:
+
+    @pytest.mark.asyncio
+    async def test_publishes_only_when_useful(self):
+        """Test ticks are skipped without subscribers, for repeated snapshots and while draining"""
+        manager = ConnectionManager()
+        snapshot = {"cpu": 1.0}
+        broadcaster = MetricsBroadcaster(lambda: snapshot, connections=manager, interval=1)
+        assert not await broadcaster.tick()
+
+        websocket = FakeWebSocket(blocked=True)
+        await manager.connect(websocket)
+        assert await broadcaster.tick()
+        assert not await broadcaster.tick()
+
+        snapshot = {"cpu": 2.0}
+        assert not await broadcaster.tick()
+        assert broadcaster.skipped == 1
+
+        websocket.unblocked.set()
+        await drain()
+        assert await broadcaster.tick()
+        await drain()
+        assert websocket.sent[-1]["data"] == {"cpu": 2.0}
+        manager.disconnect(websocket)
+
+class TestConnectionLifecycle:
+
+    @pytest.mark.asyncio
+    async def test_connection_cap(self):
+        """Test clients beyond the per-worker limit are closed with 1013"""
+        manager = ConnectionManager(max_connections=1)
+        first, second = FakeWebSocket(), FakeWebSocket()
+        assert await manager.connect(first)
+        assert not await manager.connect(second)
+
+        assert second.closed_with == 1013
+        assert manager.stats()["rejected_connections"] == 1
+        manager.disconnect(first)
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_round_trip_and_reaping(self):
+        """Test pongs record latency and silent clients are reaped"""
+        manager = ConnectionManager()
+        alive, silent = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(alive, "alive")
+        await manager.connect(silent, "silent")
+
+        manager.send_heartbeats()
+        await drain()
+        heartbeat = alive.sent[-1]
+        assert heartbeat["type"] == "heartbeat"
+        assert manager.record_pong(alive, heartbeat["seq"]) is not None
+        manager.touch(alive)
+
+        manager.clients[silent].last_received -= 120
+        assert manager.reap_idle(timeout=90) == 1
+        await drain()
+
+        assert silent.closed_with == 1001
+        info = manager.get_connection_info()
+        assert [client["client_id"] for client in info] == ["alive"]
+        assert info[0]["rtt_ms"] is not None
+        manager.disconnect(alive)
+
+class TestReplay:
+
+    @pytest.mark.asyncio
+    async def test_resume_sends_missed_events(self):
+        """Test a reconnecting client gets the subscribed events after its token"""
+        manager = ConnectionManager()
+        await manager.broadcast_scaling_event("scaling_decision", {"n": 1})
+        token = manager.replay.token()
+        await manager.broadcast_scaling_event("scaling_decision", {"n": 2})
+        await manager.broadcast_alert({"type": "high_load"})
+        await manager.broadcast_scaling_event("scaling_execution", {"n": 3})
+
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        manager.subscribe(websocket, events=["scaling_event"])
+        await manager.resume(websocket, token=token)
+        await drain()
+
+        replay = websocket.sent[-1]
+        assert replay["type"] == "replay" and replay["complete"]
+        assert [event["data"]["n"] for event in replay["events"]] == [2, 3]
+        assert [event["seq"] for event in replay["events"]] == [2, 4]
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_incomplete_replay(self, monkeypatch):
+        """Test replays are flagged incomplete for evicted events or another stream"""
+        from src.config.settings import settings
+        monkeypatch.setattr(settings, "WS_REPLAY_BUFFER_SIZE", 2)
+        manager = ConnectionManager()
+        for n in range(4):
+            await manager.broadcast_alert({"type": "alert", "n": n})
+
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        await manager.resume(websocket, since=0)
+        await manager.resume(websocket, token="otherstream:3")
+        await drain()
+
+        evicted, other_stream = websocket.sent[-2], websocket.sent[-1]
+        assert not evicted["complete"] and [e["data"]["n"] for e in evicted["events"]] == [2, 3]
+        assert not other_stream["complete"]
+        with pytest.raises(ValueError):
+            await manager.resume(websocket, token="garbage")
+        manager.disconnect(websocket)